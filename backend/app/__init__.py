@@ -1,7 +1,9 @@
 # MARK: Import
 # Dependency
+import time
 from flask import Flask
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 
 # Modules
 from config import EvIELTSConfig
@@ -10,6 +12,17 @@ from app.utils.logger import ev_logger
 # Routes
 from app.api.routes import api_bp, api_v2_bp, api_v3_bp
 
+# MARK: RunPhase
+def _run_phase(name: str, function) -> float:
+    # Run the startup phase and measure it
+    start = time.perf_counter()
+    ev_logger.info(f"Start {name} ...")
+    function()
+    duration = time.perf_counter() - start
+    ev_logger.info(f"{name} successfully started in {duration:.2f} seconds √")
+
+    return duration
+
 # MARK: CreateApp
 def create_app():
     # Create the Flask app
@@ -21,23 +34,53 @@ def create_app():
 
     # Enable CORS for all routes
     CORS(app)
-    
+
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix = '/api')
     app.register_blueprint(api_v2_bp, url_prefix = '/api/v2')
     app.register_blueprint(api_v3_bp, url_prefix = '/api/v3')
 
-    # Load the ASR model
-    ev_logger.info('Start ASR service ...')
+    # The services are created by the routes import, only the heavy resources are loaded here
     from app.services.asr_service import asr_service
-    ev_logger.info('ASR service successfully started √')
-    ev_logger.info('Start ChatGPT service ...')
-    from app.services.chat_gpt_service import chatgpt_service
-    ev_logger.info('ChatGPT service successfully started √')
-    ev_logger.info('Start IELTS service ...')
+    from app.services.callback_service import callback_service
     from app.services.ielts_services import ielts_service
-    ielts_service.update_prompt()
-    ev_logger.info('IELTS service successfully started √')
-    
+    from app.services.settings_service import settings_service
+    from app.services.vad_service import vad_service
+
+    # Define the prompt phase, the prompt files are found from the app root
+    def load_prompt():
+        with app.app_context():
+            ielts_service.update_prompt()
+
+    start = time.perf_counter()
+
+    # Apply the shared settings first, so the startup load use the saved model, and watch the changes from the other workers
+    durations = {'Settings service': _run_phase('Settings service', lambda: settings_service.start(app))}
+
+    # Define the independent startup phases
+    phases = {
+        'IELTS prompt': load_prompt,
+        'Silero VAD': vad_service.load,
+    }
+
+    # Load the local Whisper model on the first request if lazy
+    if EvIELTSConfig.asr_lazy_load:
+        ev_logger.info('ASR model is loaded on the first request')
+    else:
+        phases['ASR model'] = asr_service.load
+
+    if EvIELTSConfig.startup_parallel:
+        # Load the resources in parallel, the pool is closed before gunicorn fork the workers
+        with ThreadPoolExecutor(max_workers = len(phases), thread_name_prefix = 'ev-startup') as executor:
+            futures = {name: executor.submit(_run_phase, name, function) for name, function in phases.items()}
+            durations.update({name: future.result() for name, future in futures.items()})
+    else:
+        durations.update({name: _run_phase(name, function) for name, function in phases.items()})
+
+    # Start the Englishvit callback delivery
+    durations['Callback service'] = _run_phase('Callback service', callback_service.start)
+
+    ev_logger.info(f"App started in {time.perf_counter() - start:.2f} seconds: {', '.join(f'{name} {duration:.2f}s' for name, duration in durations.items())} √")
+
     # Return the app instance
-    return app
\ No newline at end of file
+    return app
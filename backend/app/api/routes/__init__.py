@@ -15,6 +15,7 @@ from app.models.response_metadata_model import EvResponseMetadataModel
 from app.api.routes.evaluation import *
 from app.api.routes.health import *
 from app.api.routes.information import *
+from app.api.routes.jobs import *
 from app.api.routes.overall_feedback import *
 from app.api.routes.settings import *
 from app.api.routes.transcribe import *
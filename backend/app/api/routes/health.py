@@ -6,9 +6,19 @@ from flask import jsonify
 from app.api.routes import api_bp, api_v2_bp
 
 # Services
+from app.services.audio_service import audio_service
+from app.services.cache_service import cache_service
+from app.services.idempotency_service import idempotency_service
+from app.services.settings_service import settings_service
+from app.services.information_service import information_service
+from app.services.callback_service import callback_service
 from app.services.asr_service import asr_service
+from app.services.stream_service import stream_service
+from app.services.vad_service import vad_service
 from app.services.chat_gpt_service import chatgpt_service
 from app.services.ielts_services import ielts_service
+from app.services.job_service import job_service
+from app.services.openai_client_service import openai_client_service
 
 # Modules
 from app.models.response_model import EvResponseModel
@@ -25,6 +35,11 @@ def health():
         # Check if the ASR model is loaded
         asr_model = asr_service.health_check()
         chatgpt_model = chatgpt_service.health_check()
+        audio_model = audio_service.health_check()
+        openai_model = openai_client_service.health_check()
+        callback_model = callback_service.health_check()
+        stream_model = stream_service.health_check()
+        vad_model = vad_service.health_check()
 
         # Define the response model data
         response_data = EvResponseModel(
@@ -36,6 +51,11 @@ def health():
             data = {
                 'asr': asr_model,
                 'chatgpt': chatgpt_model,
+                'audio': audio_model,
+                'openai': openai_model,
+                'callback': callback_model,
+                'stream': stream_model,
+                'vad': vad_model,
             }
         )
 
@@ -68,6 +88,15 @@ def health_v2():
     try:
         # Check if the ASR model is loaded
         ielts_model = ielts_service.health_check()
+        audio_model = audio_service.health_check()
+        openai_model = openai_client_service.health_check()
+        callback_model = callback_service.health_check()
+        job_model = job_service.health_check()
+        cache_model = cache_service.health_check()
+        idempotency_model = idempotency_service.health_check()
+        settings_model = settings_service.health_check()
+        information_model = information_service.health_check()
+        vad_model = vad_service.health_check()
 
         # Define the response model data
         response_data = EvResponseModel(
@@ -78,6 +107,15 @@ def health_v2():
             ),
             data = {
                 'ielts': ielts_model,
+                'audio': audio_model,
+                'openai': openai_model,
+                'callback': callback_model,
+                'jobs': job_model,
+                'cache': cache_model,
+                'idempotency': idempotency_model,
+                'settings': settings_model,
+                'information': information_model,
+                'vad': vad_model,
             }
         )
 
@@ -1,7 +1,6 @@
 # MARK: Import
 # Dependencies
 import os
-import json
 from flask import jsonify, request, current_app
 
 # Routes
@@ -9,6 +8,8 @@ from app.api.routes import api_bp
 
 # Services
 from app.services.ielts_services import ielts_service
+from app.services.settings_service import settings_service
+from app.services.information_service import information_service
 
 # Modules
 from app.models.response_model import EvResponseModel
@@ -35,30 +36,8 @@ def information(type: str):
 
             # If GET request, return the information
             if request.method == 'GET':
-                # Check if the file exists
-                if os.path.exists(file_path):
-                    # Open the file and return the data
-                    with open(file_path, 'r') as f:
-                        # Load the data from the file
-                        data_list = json.load(f)
-
-                        # Define the response model data
-                        response_data = EvResponseModel(
-                            metadata = EvResponseMetadataModel(
-                                code = 200,
-                                status = 'Success',
-                                message = 'Information retrieved successfully',
-                            ),
-                            data = {
-                                'information': data_list,
-                            }
-                        )
-                        # Return the information response
-                        return jsonify(response_data.model_dump()), 200, {'ContentType' : 'application/json'}
-                    
-                raise EvServerException(
-                    message = "File not found",
-                )
+                # Return the cached information
+                return information_service.response(file_path)
 
             # If POST request, update the information
             elif request.method == 'POST':
@@ -79,14 +58,8 @@ def information(type: str):
                     # Get the json data from the request
                     new_data = request.get_json(force=True)
 
-                    # Write the new data to the file
-                    with open(file_path, 'w') as f:
-                        # Dump the data to the file
-                        json.dump(
-                            new_data, 
-                            f, 
-                            indent = 4,
-                        )
+                    # Replace the file atomically and notify every worker
+                    version = information_service.write(file_path, new_data)
 
                     # Define the response model data
                     response_data = EvResponseModel(
@@ -97,6 +70,7 @@ def information(type: str):
                         ),
                         data = {
                             'information': new_data,
+                            'version': version,
                         }
                     )
 
@@ -116,30 +90,8 @@ def information(type: str):
 
             # If GET request, return the information
             if request.method == 'GET':
-                # Check if the file exists
-                if os.path.exists(file_path):
-                    # Open the file and return the data
-                    with open(file_path, 'r') as f:
-                        # Load the data from the file
-                        data_list = json.load(f)
-
-                        # Define the response model data
-                        response_data = EvResponseModel(
-                            metadata = EvResponseMetadataModel(
-                                code = 200,
-                                status = 'Success',
-                                message = 'Information retrieved successfully',
-                            ),
-                            data = {
-                                'information': data_list,
-                            }
-                        )
-                        # Return the information response
-                        return jsonify(response_data.model_dump()), 200, {'ContentType' : 'application/json'}
-                    
-                raise EvServerException(
-                    message = "File not found",
-                )
+                # Return the cached information
+                return information_service.response(file_path)
 
             # If POST request, update the information
             elif request.method == 'POST':
@@ -160,14 +112,8 @@ def information(type: str):
                     # Get the json data from the request
                     new_data = request.get_json(force=True)
 
-                    # Write the new data to the file
-                    with open(file_path, 'w') as f:
-                        # Dump the data to the file
-                        json.dump(
-                            new_data, 
-                            f, 
-                            indent = 4,
-                        )
+                    # Replace the file atomically and notify every worker
+                    version = information_service.write(file_path, new_data)
 
                     # Define the response model data
                     response_data = EvResponseModel(
@@ -178,6 +124,7 @@ def information(type: str):
                         ),
                         data = {
                             'information': new_data,
+                            'version': version,
                         }
                     )
 
@@ -235,10 +182,8 @@ def information(type: str):
                             }
                         )
                     
-                    # Get the user credit from the service
-                    ielts_service.update_credit(
-                        user_credit = int(request.form['credit']),
-                    )
+                    # Update the user credit of every worker
+                    settings_service.set('user_credit', int(request.form['credit']))
 
                     # Define the response model data
                     response_data = EvResponseModel(
@@ -0,0 +1,268 @@
+# MARK: Import
+# Dependencies
+import os
+from flask import jsonify, request
+
+# Routes
+from app.api.routes import api_v3_bp
+
+# Services
+from app.services.audio_service import audio_service
+from app.services.callback_service import callback_service
+from app.services.idempotency_service import idempotency_service
+from app.services.ielts_services import ielts_service
+from app.services.job_service import job_service
+
+# Modules
+from app.utils.exception import EvClientException, EvNotFoundException, EvException
+from app.models.response_model import EvResponseModel
+from app.models.response_metadata_model import EvResponseMetadataModel
+
+# MARK: RunEvaluationJob
+def _run_evaluation_job(audio_data: bytes, audio_extension: str, question: str, test_id: str, authorization: str, use_cache: bool = True) -> dict:
+    '''
+    Custom function to run the evaluation job in the background worker. The job do
+    the same process as `/api/v2/evaluation`, normalize the audio, evaluate using
+    ChatGPT and send the result to the Englishvit API.
+
+    Args:
+    - audio_data: bytes: Content of the uploaded audio file.
+    - audio_extension: str: Extension of the uploaded audio file.
+    - question: str: Interviewer question.
+    - test_id: str: Englishvit test id.
+    - authorization: str: Authorization header for the Englishvit API.
+    - use_cache: bool: Use the cached evaluation of the same audio and question.
+
+    Returns:
+    - dict: The evaluation result.
+    '''
+    # Normalize the audio file in memory
+    audio_buffer = audio_service.decode(
+        audio_data = audio_data,
+        audio_extension = audio_extension,
+    )
+
+    # Evaluate using ChatGPT
+    result = ielts_service.evaluate(
+        audio_buffer = audio_buffer,
+        question = question,
+        use_cache = use_cache,
+    )
+
+    # Send the result to backend
+    if authorization != '':
+        # Define the headers
+        headers = {
+            'Authorization': authorization,
+        }
+
+        # Define the data
+        data = {
+            'finished': 1,
+            'transcribe': result.transcript,
+            'words_timestamp': result.word_timestamp,
+            'fluency_feedback': result.evaluation.fluency.json(),
+            'pronunciation_feedback': result.evaluation.pronunciation.json(),
+            'grammar_feedback': result.evaluation.grammar.json(),
+            'lexical_feedback': result.evaluation.lexical.json(),
+        }
+
+        # Send the result to the Englishvit API in the background
+        callback_service.dispatch(
+            path = f"test/update/{test_id}",
+            data = data,
+            headers = headers,
+            audio_buffer = audio_buffer,
+        )
+
+    # Return the evaluation data
+    return result.model_dump()
+
+# MARK: EvaluationJob
+@api_v3_bp.route('/jobs/evaluation', methods = ['POST'])
+@idempotency_service.idempotent
+def evaluation_job():
+    '''
+    Function to submit the evaluation process as a background job. The function take
+    the same request as `/api/v2/evaluation` and return the job id immediately. The
+    client can poll `/api/v3/jobs/<job_id>` or define `callback_url` to receive the
+    finished job. The `callback_url` host must be in `JOB_CALLBACK_ALLOWED_HOSTS`.
+    '''
+    try:
+        # Check if the request has files and if the file is present
+        if not request.files or 'file' not in request.files:
+            # Define the error message
+            message = 'Invalid request, audio file is required'
+
+            # Throw an exception
+            raise EvClientException(
+                message = message,
+            )
+
+        # Check if the request has a text `question` and `test_id` field
+        if 'test_id' not in request.form or 'question' not in request.form:
+            # Define the error message
+            message = 'Invalid request test_id and question is required'
+
+            # Throw an exception
+            raise EvClientException(
+                message = message,
+            )
+
+        # Define list of allowed audio file extensions
+        allowed_extensions = ['wav', 'mp3', 'm4a']
+
+        # Get the audio file from the request
+        audio_file = request.files['file']
+
+        # Check if the file is allowed
+        if audio_file.filename.split('.')[-1].lower() not in allowed_extensions:
+            # Define the error message
+            message = 'Invalid file type. Allowed types are: wav, mp3, m4a'
+
+            # Throw an exception
+            raise EvClientException(
+                message = message,
+            )
+
+        # Check if the file size is greater than 50MB
+        if audio_file.content_length > 50 * 1024 * 1024:
+            # Define the error message
+            message = 'File size exceeds the limit of 50MB'
+
+            # Throw an exception
+            raise EvClientException(
+                message = message,
+            )
+
+        # Get the optional callback URL, its host must be in `EvIELTSConfig.job_callback_allowed_hosts`
+        callback_url = request.form.get('callback_url', None)
+
+        # Submit the evaluation job, the job is rejected with 503 if the queue is full
+        job = job_service.submit(
+            job_type = 'evaluation',
+            job_function = _run_evaluation_job,
+            job_arguments = {
+                'audio_data': audio_file.read(),
+                'audio_extension': os.path.splitext(audio_file.filename)[1][1:].lower(),
+                'question': request.form['question'],
+                'test_id': request.form['test_id'],
+                'authorization': request.headers.get('Authorization', ''),
+                'use_cache': 'no-cache' not in request.headers.get('Cache-Control', ''),
+            },
+            callback_url = callback_url,
+        )
+
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = 202,
+                status = 'Success',
+                message = 'Evaluation job submitted',
+            ),
+            data = job.model_dump()
+        )
+
+        # Return the job
+        return jsonify(response_data.model_dump()), 202, {'ContentType' : 'application/json'}
+
+    except EvException as error:
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = error.status_code,
+                status = 'Error',
+                message = error.message,
+            ),
+            data = {
+                'message': error.message,
+                'information': error.information,
+            }
+        )
+
+        # Return the error message
+        return jsonify(response_data.model_dump()), error.status_code, {'ContentType' : 'application/json'}
+
+    except Exception as error:
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = 500,
+                status = 'Error',
+                message = 'Internal server error',
+            ),
+            data = {
+                'message': 'Internal server error',
+                'information': str(error),
+            }
+        )
+
+        # Return the error message
+        return jsonify(response_data.model_dump()), 500, {'ContentType' : 'application/json'}
+
+# MARK: Job
+@api_v3_bp.route('/jobs/<job_id>', methods = ['GET'])
+def job(job_id: str):
+    '''
+    Function to get the status and the result of the background job.
+    '''
+    try:
+        # Get the job
+        job = job_service.get(job_id)
+
+        # Check if the job is found
+        if job is None:
+            # Define the error message
+            message = f'Job not found: {job_id}'
+
+            # Throw an exception
+            raise EvNotFoundException(
+                message = message,
+            )
+
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = 200,
+                status = 'Success',
+                message = 'Job retrieved successfully',
+            ),
+            data = job.model_dump()
+        )
+
+        # Return the job
+        return jsonify(response_data.model_dump()), 200, {'ContentType' : 'application/json'}
+
+    except EvException as error:
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = error.status_code,
+                status = 'Error',
+                message = error.message,
+            ),
+            data = {
+                'message': error.message,
+                'information': error.information,
+            }
+        )
+
+        # Return the error message
+        return jsonify(response_data.model_dump()), error.status_code, {'ContentType' : 'application/json'}
+
+    except Exception as error:
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = 500,
+                status = 'Error',
+                message = 'Internal server error',
+            ),
+            data = {
+                'message': 'Internal server error',
+                'information': str(error),
+            }
+        )
+
+        # Return the error message
+        return jsonify(response_data.model_dump()), 500, {'ContentType' : 'application/json'}
\ No newline at end of file
@@ -1,17 +1,17 @@
 # MARK: Import
 # Dependencies
-import requests
 from flask import jsonify, request
 
 # Routes
 from app.api.routes import api_bp, api_v2_bp, api_v3_bp
 
 # Services
+from app.services.callback_service import callback_service
 from app.services.chat_gpt_service import chatgpt_service
 from app.services.ielts_services import ielts_service
 
 # Modules
-from app.utils.exception import EvClientException, EvAPIException, EvException
+from app.utils.exception import EvClientException, EvException
 from app.models.response_model import EvResponseModel
 from app.models.response_metadata_model import EvResponseMetadataModel
 
@@ -62,26 +62,13 @@ def overall_feedback():
                 'pronunciation_feedback': result.pronunciation.readable_feedback,
             }
 
-            # Send the request to the Englishvit API
-            response = requests.post(
-                f"https://englishvit.com/api/user/ielts-ai/session/update/{request.form['session_id']}", 
-                data = data, 
+            # Send the result to the Englishvit API in the background
+            callback_service.dispatch(
+                path = f"session/update/{request.form['session_id']}",
+                data = data,
                 headers = headers,
             )
 
-            # Check if the response is not successful
-            if response.status_code != 200:
-                # Define the error message
-                message = f'Failed to send the evaluation data to the server: {response.text}'
-
-                # Throw an exception
-                raise EvAPIException(
-                    message = message,
-                    information = {
-                        'message': message,
-                    }
-                )
-
         # Define the response model data
         response_data = EvResponseModel(
             metadata = EvResponseMetadataModel(
@@ -187,23 +174,13 @@ def overall_feedback():
                 },
             }
 
-            # Send the request to the Englishvit API
-            response = requests.post(
-                f"https://englishvit.com/api/user/ielts-ai/session/update/{request.form['session_id']}", 
-                data = data, 
+            # Send the result to the Englishvit API in the background
+            callback_service.dispatch(
+                path = f"session/update/{request.form['session_id']}",
+                data = data,
                 headers = headers,
             )
 
-            # Check if the response is not successful
-            if response.status_code != 200:
-                # Define the error message
-                message = f'Failed to send the evaluation data to the server: {response.text}'
-
-                # Throw an exception
-                raise EvAPIException(
-                    message = message,
-                )
-
         # Define the response model data
         response_data = EvResponseModel(
             metadata = EvResponseMetadataModel(
@@ -321,23 +298,13 @@ def overall_feedback():
                 'pronunciation_feedback': result.pronunciation.model_dump_json(),
             }
 
-            # Send the request to the Englishvit API
-            response = requests.post(
-                f"https://englishvit.com/api/user/ielts-ai/session/update/{request.form['session_id']}", 
-                data = data, 
+            # Send the result to the Englishvit API in the background
+            callback_service.dispatch(
+                path = f"session/update/{request.form['session_id']}",
+                data = data,
                 headers = headers,
             )
 
-            # Check if the response is not successful
-            if response.status_code != 200:
-                # Define the error message
-                message = f'Failed to send the evaluation data to the server: {response.text}'
-
-                # Throw an exception
-                raise EvAPIException(
-                    message = message,
-                )
-
         # Define the response model data
         response_data = EvResponseModel(
             metadata = EvResponseMetadataModel(
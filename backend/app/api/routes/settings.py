@@ -8,12 +8,12 @@ from app.api.routes import api_bp, api_v2_bp
 
 # Services
 from app.services.chat_gpt_service import chatgpt_service
-from app.services.asr_service import asr_service
-from app.services.ielts_services import ielts_service
+from app.services.settings_service import settings_service
 
 # Modules
 from config import EvIELTSConfig
 from app.utils.exception import EvClientException, EvServerException, EvException
+from app.utils.file import write_atomic
 from app.models.response_model import EvResponseModel
 from app.models.response_metadata_model import EvResponseMetadataModel
 
@@ -44,17 +44,17 @@ def settings(type: str):
                 )
             
             # Get the model name from the request
-            model_name = request.form['model_name'],
+            model_name = request.form['model_name']
 
-            # Update the ASR model
-            asr_service.update_model(model_name = model_name)
+            # Update the ASR model of every worker, the model is loaded in the background
+            settings_service.set('asr_model', model_name)
 
             # Define the response model data
             response_data = EvResponseModel(
                 metadata = EvResponseMetadataModel(
-                    code = 200,
+                    code = 202,
                     status = 'Success',
-                    message = 'ASR model updated successfully',
+                    message = 'ASR model update started, check the progress in /api/health',
                 ),
                 data = {
                     'model': model_name,
@@ -62,7 +62,7 @@ def settings(type: str):
             )
 
             # Return the settings response
-            return jsonify(response_data.model_dump()), 200, {'ContentType' : 'application/json'}
+            return jsonify(response_data.model_dump()), 202, {'ContentType' : 'application/json'}
         
         # Check if type is setting asr initial prompt
         elif type == 'asr-initial-prompt':
@@ -80,10 +80,10 @@ def settings(type: str):
                 )
             
             # Get the model name from the request
-            initial_prompt = request.form['initial_prompt'],
+            initial_prompt = request.form['initial_prompt']
 
-            # Update the ASR initial prompt
-            asr_service.update_initial_prompt(initial_prompt = initial_prompt)
+            # Update the ASR initial prompt of every worker
+            settings_service.set('asr_initial_prompt', initial_prompt)
 
             # Define the response model data
             response_data = EvResponseModel(
@@ -116,10 +116,10 @@ def settings(type: str):
                 )
             
             # Get the model name from the request
-            model_name = request.form['model_name'],
+            model_name = request.form['model_name']
 
-            # Update the ChatGPT model
-            chatgpt_service.update_model(model_name = model_name)
+            # Update the ChatGPT model of every worker
+            settings_service.set('chatgpt_model', model_name)
 
             # Define the response model data
             response_data = EvResponseModel(
@@ -144,13 +144,13 @@ def settings(type: str):
             grammar_prompt = request.form.get('grammar_prompt', None)
             pronunciation_prompt = request.form.get('pronunciation_prompt', None)
 
-            # Update the ChatGPT prompt
-            chatgpt_service.update_prompt(
-                fluency_prompt = fluency_prompt,
-                lexical_prompt = lexical_prompt,
-                grammar_prompt = grammar_prompt,
-                pronunciation_prompt = pronunciation_prompt,
-            )
+            # Update the ChatGPT prompt of every worker
+            settings_service.set('chatgpt_prompt', {
+                'fluency_prompt': fluency_prompt,
+                'lexical_prompt': lexical_prompt,
+                'grammar_prompt': grammar_prompt,
+                'pronunciation_prompt': pronunciation_prompt,
+            })
 
             # Get the prompt from the ChatGPT service
             chatgpt_prompt = chatgpt_service.get_prompt()
@@ -220,11 +220,11 @@ def settings(type: str):
             chatgpt_feedback_model_name = request.form.get('chatgpt_feedback_model_name', None)
             chatgpt_whisper_model_name = request.form.get('chatgpt_whisper_model_name', None)
 
-            # Update the IELTS model
-            ielts_service.update_model(
-                chatgpt_feedback_model_name = chatgpt_feedback_model_name,
-                chatgpt_whisper_model_name = chatgpt_whisper_model_name,
-            )
+            # Update the IELTS model of every worker
+            settings_service.set('ielts_model', {
+                'chatgpt_feedback_model_name': chatgpt_feedback_model_name,
+                'chatgpt_whisper_model_name': chatgpt_whisper_model_name,
+            })
 
             # Define the response model data
             response_data = EvResponseModel(
@@ -255,10 +255,10 @@ def settings(type: str):
                 )
             
             # Get the model name from the request
-            initial_prompt = request.form['initial_prompt'],
+            initial_prompt = request.form['initial_prompt']
 
-            # Update the initial prompt
-            ielts_service.update_initial_prompt(initial_prompt = initial_prompt)
+            # Update the initial prompt of every worker
+            settings_service.set('ielts_initial_prompt', initial_prompt)
 
             # Define the response model data
             response_data = EvResponseModel(
@@ -310,13 +310,11 @@ def settings(type: str):
                 # Read the content of the text file
                 text_content = text_file.read().decode('utf-8')
 
-                # Write the new data to the file
-                with open(file_path, 'w') as f:
-                    # Replace the content of the file with the new text content
-                    f.write(text_content)
+                # Replace the file atomically
+                write_atomic(file_path, text_content)
 
-                # Update the evaluation feedback prompt
-                ielts_service.update_prompt()
+                # Read the prompt file again in every worker
+                settings_service.set('ielts_prompt', os.path.basename(file_path))
 
                 # Define the response model data
                 response_data = EvResponseModel(
@@ -374,13 +372,11 @@ def settings(type: str):
                 # Read the content of the text file
                 text_content = text_file.read().decode('utf-8')
 
-                # Write the new data to the file
-                with open(file_path, 'w') as f:
-                    # Replace the content of the file with the new text content
-                    f.write(text_content)
+                # Replace the file atomically
+                write_atomic(file_path, text_content)
 
-                # Update the evaluation feedback prompt
-                ielts_service.update_prompt()
+                # Read the prompt file again in every worker
+                settings_service.set('ielts_prompt', os.path.basename(file_path))
 
                 # Define the response model data
                 response_data = EvResponseModel(
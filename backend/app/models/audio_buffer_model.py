@@ -0,0 +1,13 @@
+# MARK: Import
+# Dependency
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+# MARK: EvAudioBufferModel
+class EvAudioBufferModel(BaseModel):
+    # Configuration
+    model_config = ConfigDict(arbitrary_types_allowed = True)
+
+    # Properties
+    samples: np.ndarray
+    sample_rate: int
\ No newline at end of file
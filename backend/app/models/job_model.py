@@ -0,0 +1,15 @@
+# MARK: Import
+# Dependencies
+from datetime import datetime
+from pydantic import BaseModel
+
+# MARK: EvJobModel
+class EvJobModel(BaseModel):
+    # Properties
+    job_id: str
+    job_type: str
+    status: str
+    result: dict | None = None
+    error: dict | None = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,163 @@
+# MARK: Import
+# Dependencies
+import torch
+import whisper
+from abc import ABC, abstractmethod
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvServerException
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: EvASRBackend
+class EvASRBackend(ABC):
+    '''
+    Base class of the ASR backend. The backend load the model and transcribe the
+    audio buffer, the result must follow the `whisper.transcribe` result, a dict
+    with `text`, `segments` (with `words`) and `language`.
+    '''
+    # MARK: Properties
+    name = "base"
+    supports_batch = False
+    available_models = []
+
+    # MARK: Load
+    @abstractmethod
+    def load(self, model_name: str):
+        raise NotImplementedError
+
+    # MARK: Transcribe
+    @abstractmethod
+    def transcribe(self, model, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        raise NotImplementedError
+
+# MARK: EvWhisperBackend
+class EvWhisperBackend(EvASRBackend):
+    # MARK: Properties
+    name = "whisper"
+    supports_batch = True
+    available_models = ["tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en", "large", "turbo"]
+
+    # MARK: Load
+    def load(self, model_name: str):
+        return whisper.load_model(model_name, device = "cpu")
+
+    # MARK: Transcribe
+    def transcribe(self, model, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        return model.transcribe(
+            audio_buffer.samples,
+            language = "en",
+            word_timestamps = True,
+            initial_prompt = initial_prompt,
+            fp16 = False,
+        )
+
+# MARK: EvQuantizedWhisperBackend
+class EvQuantizedWhisperBackend(EvWhisperBackend):
+    # MARK: Properties
+    name = "whisper-int8"
+
+    # MARK: Load
+    def load(self, model_name: str):
+        # Load the fp32 model
+        model = whisper.load_model(model_name, device = "cpu")
+
+        # Whisper `Linear` only cast the dtype on forward, use the torch one so it can be quantized
+        for module in model.modules():
+            if isinstance(module, whisper.model.Linear):
+                module.__class__ = torch.nn.Linear
+
+        # Quantize the linear layers to int8
+        return torch.ao.quantization.quantize_dynamic(
+            model,
+            {torch.nn.Linear},
+            dtype = torch.qint8,
+        )
+
+# MARK: EvFasterWhisperBackend
+class EvFasterWhisperBackend(EvASRBackend):
+    # MARK: Properties
+    name = "faster-whisper"
+    available_models = ["tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en", "large-v1", "large-v2", "large-v3", "large", "turbo", "distil-small.en", "distil-medium.en", "distil-large-v2", "distil-large-v3"]
+
+    # MARK: Load
+    def load(self, model_name: str):
+        # Import here, CTranslate2 is only needed by this backend
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            model_name,
+            device = "cpu",
+            compute_type = EvIELTSConfig.asr_compute_type,
+            cpu_threads = EvIELTSConfig.asr_cpu_threads,
+        )
+
+    # MARK: Transcribe
+    def transcribe(self, model, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        # Transcribe the audio, the segments is a generator
+        segments, info = model.transcribe(
+            audio_buffer.samples,
+            language = "en",
+            word_timestamps = True,
+            initial_prompt = initial_prompt,
+            temperature = 0.0,
+        )
+
+        # Convert the segments to the whisper result
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                "id": segment.id,
+                "seek": segment.seek,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+                "words": [
+                    {
+                        "word": word.word,
+                        "start": word.start,
+                        "end": word.end,
+                        "probability": word.probability,
+                    }
+                    for word in (segment.words or [])
+                ],
+            })
+
+        # Return the whisper result
+        return {
+            "text": "".join(segment["text"] for segment in result_segments),
+            "segments": result_segments,
+            "language": info.language,
+        }
+
+# MARK: GetASRBackend
+def get_asr_backend(name: str) -> EvASRBackend:
+    '''
+    Custom function to get the ASR backend by name.
+
+    Args:
+    - name: str: Name of the backend, `whisper`, `whisper-int8` or `faster-whisper`.
+
+    Returns:
+    - EvASRBackend: The ASR backend.
+    '''
+    # Define available backends
+    backends = {
+        EvWhisperBackend.name: EvWhisperBackend,
+        EvQuantizedWhisperBackend.name: EvQuantizedWhisperBackend,
+        EvFasterWhisperBackend.name: EvFasterWhisperBackend,
+    }
+
+    # Check if the backend is available
+    if name not in backends:
+        raise EvServerException(
+            message = f"Invalid ASR backend '{name}'",
+        )
+
+    # Return the backend
+    return backends[name]()
\ No newline at end of file
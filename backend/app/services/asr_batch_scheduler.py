@@ -0,0 +1,300 @@
+# MARK: Import
+# Dependencies
+import os
+import time
+import queue
+import datetime
+import threading
+import torch
+import whisper
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from whisper.audio import N_FRAMES, N_SAMPLES, HOP_LENGTH, SAMPLE_RATE
+from whisper.decoding import DecodingOptions, decode
+from whisper.timing import add_word_timestamps
+from whisper.tokenizer import get_tokenizer
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvServerException
+from app.utils.logger import ev_logger
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: EvASRBatchScheduler
+class EvASRBatchScheduler:
+    '''
+    Custom scheduler that decode the concurrent short audio in one batch. The
+    batch is decoded once with temperature 0, the job that fail the thresholds of
+    `whisper.transcribe` (compression ratio or average log probability) is
+    transcribed again with `fallback_transcribe`, which use the temperature
+    fallback of the backend.
+
+    Important: The batched job is decoded without timestamps, so its result has
+    one segment for the whole audio instead of the segments of `whisper.transcribe`.
+    The text and the word timestamps are the same format.
+
+    Args:
+    - model_provider: function: Return the loaded model.
+    - model_lock: threading.Lock: Lock of the model.
+    - fallback_transcribe: function: Transcribe one audio with `(model, audio_buffer, initial_prompt)`.
+    '''
+    # MARK: Properties
+    def __init__(self, model_provider, model_lock: threading.Lock, fallback_transcribe):
+        # Properties
+        self.model_provider = model_provider
+        self.model_lock = model_lock
+        self.fallback_transcribe = fallback_transcribe
+        self.compression_ratio_threshold = 2.4
+        self.logprob_threshold = -1.0
+        self.no_speech_threshold = 0.6
+        self.max_batch_size = EvIELTSConfig.asr_batch_max_size
+        self.max_wait = EvIELTSConfig.asr_batch_max_wait_ms / 1000.0
+        self.max_duration = N_SAMPLES / SAMPLE_RATE
+        self.timeout = EvIELTSConfig.asr_batch_timeout
+        self.batch_count = 0
+        self.item_count = 0
+        self.fallback_count = 0
+        self.queue = queue.Queue()
+        self.thread = None
+        self.thread_pid = None
+        self.lock = threading.Lock()
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": int(self.max_wait * 1000),
+            "batch_count": self.batch_count,
+            "item_count": self.item_count,
+            "average_batch_size": (self.item_count / self.batch_count) if self.batch_count else 0.0,
+            "fallback_count": self.fallback_count,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: CanBatch
+    def can_batch(self, audio_buffer: EvAudioBufferModel) -> bool:
+        # Only audio that fit in one Whisper window can be batched
+        return len(audio_buffer.samples) <= N_SAMPLES
+
+    # MARK: EnsureStarted
+    def _ensure_started(self):
+        with self.lock:
+            # Start the scheduler thread, again after fork because threads are not copied
+            if self.thread is None or self.thread_pid != os.getpid() or not self.thread.is_alive():
+                self.queue = queue.Queue()
+                self.thread = threading.Thread(
+                    target = self._run,
+                    name = 'ev-asr-batch-scheduler',
+                    daemon = True,
+                )
+                self.thread_pid = os.getpid()
+                self.thread.start()
+
+    # MARK: Submit
+    def submit(self, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> Future:
+        # Make sure the scheduler is running
+        self._ensure_started()
+
+        # Queue the job
+        future = Future()
+        self.queue.put((audio_buffer, initial_prompt, future))
+
+        # Return the future result
+        return future
+
+    # MARK: Transcribe
+    def transcribe(self, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        '''
+        Custom function to transcribe the audio in the next batch and wait for it. The
+        wait is limited by `EvIELTSConfig.asr_batch_timeout`, so the request is not
+        blocked forever if the scheduler thread hang.
+
+        Args:
+        - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+        - initial_prompt: str: The initial prompt of the model.
+
+        Returns:
+        - dict: The whisper transcription result.
+        '''
+        future = self.submit(audio_buffer = audio_buffer, initial_prompt = initial_prompt)
+
+        try:
+            return future.result(timeout = self.timeout)
+        except FutureTimeoutError:
+            # Don't transcribe the job if it is still waiting in the queue
+            future.cancel()
+            raise EvServerException(
+                message = f"Batch transcription exceeds {self.timeout:.0f} seconds",
+            )
+
+    # MARK: Run
+    def _run(self):
+        batch = []
+        try:
+            while True:
+                # Wait for the first job
+                batch = [self.queue.get()]
+
+                # Collect more jobs until the batch is full or the window is closed
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout = remaining))
+                    except queue.Empty:
+                        break
+
+                # Skip the job cancelled by the timeout of its request
+                batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+
+                # Group the jobs by initial prompt, because the decoding options are shared
+                groups = {}
+                for item in batch:
+                    groups.setdefault(item[1], []).append(item)
+
+                # Run every group
+                for initial_prompt, items in groups.items():
+                    self._run_batch(initial_prompt, items)
+
+        except BaseException as error:
+            ev_logger.info(f"ASR batch scheduler stopped x")
+            ev_logger.info(f"Error: {error}")
+
+            # Fail the running and the queued jobs, the next job start a new thread
+            self._fail_pending(batch, error)
+            raise
+
+    # MARK: FailPending
+    def _fail_pending(self, batch: list, error: BaseException):
+        items = list(batch)
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        for item in items:
+            if not item[2].done():
+                item[2].set_exception(EvServerException(message = f"ASR batch scheduler stopped: {error}"))
+
+    # MARK: RunBatch
+    def _run_batch(self, initial_prompt: str, items: list):
+        try:
+            # Transcribe the batch
+            with self.model_lock:
+                results = self._transcribe_batch(
+                    model = self.model_provider(),
+                    audio_buffers = [item[0] for item in items],
+                    initial_prompt = initial_prompt,
+                )
+
+            # Update the counter
+            with self.lock:
+                self.batch_count += 1
+                self.item_count += len(items)
+
+            # Split the results back to every job
+            for item, result in zip(items, results):
+                item[2].set_result(result)
+
+        except Exception as error:
+            ev_logger.info(f"Failed to transcribe batch of {len(items)} audio x")
+            ev_logger.info(f"Error: {error}")
+
+            # Fail every job in the batch
+            for item in items:
+                if not item[2].done():
+                    item[2].set_exception(error)
+
+    # MARK: TranscribeBatch
+    def _transcribe_batch(self, model, audio_buffers: list, initial_prompt: str) -> list:
+        # Compute the mel spectrogram of every audio, padded to one Whisper window
+        mels = []
+        num_frames = []
+        for audio_buffer in audio_buffers:
+            mel = whisper.log_mel_spectrogram(
+                torch.from_numpy(audio_buffer.samples),
+                model.dims.n_mels,
+                padding = N_SAMPLES,
+            )
+            num_frames.append(min(mel.shape[-1] - N_FRAMES, N_FRAMES))
+            mels.append(whisper.pad_or_trim(mel, N_FRAMES))
+
+        # Run the encoder and decoder on the padded batch
+        mel_batch = torch.stack(mels).to(model.device)
+        decoding_results = decode(
+            model,
+            mel_batch,
+            DecodingOptions(
+                language = "en",
+                prompt = initial_prompt,
+                temperature = 0.0,
+                without_timestamps = True,
+                fp16 = False,
+            ),
+        )
+
+        # Define the tokenizer for the word timestamps
+        tokenizer = get_tokenizer(
+            model.is_multilingual,
+            num_languages = model.num_languages,
+            language = "en",
+            task = "transcribe",
+        )
+
+        # Build the same result as `whisper.transcribe` for every audio
+        results = []
+        for index, decoding_result in enumerate(decoding_results):
+            # If no speech detected, like the `whisper.transcribe` threshold
+            if decoding_result.no_speech_prob > self.no_speech_threshold and decoding_result.avg_logprob < self.logprob_threshold:
+                results.append({
+                    "text": "",
+                    "segments": [],
+                    "language": "en",
+                })
+                continue
+
+            # If the greedy decoding failed, transcribe again with the temperature fallback
+            if decoding_result.compression_ratio > self.compression_ratio_threshold or decoding_result.avg_logprob < self.logprob_threshold:
+                with self.lock:
+                    self.fallback_count += 1
+                results.append(self.fallback_transcribe(model, audio_buffers[index], initial_prompt))
+                continue
+
+            # Decode the text without strip, like the segment text of `whisper.transcribe`
+            tokens = [token for token in decoding_result.tokens if token < tokenizer.eot]
+            text = tokenizer.decode(tokens)
+
+            # Define the segment
+            segment = {
+                "id": 0,
+                "seek": 0,
+                "start": 0.0,
+                "end": num_frames[index] * HOP_LENGTH / SAMPLE_RATE,
+                "text": text,
+                "tokens": tokens,
+                "temperature": decoding_result.temperature,
+                "avg_logprob": decoding_result.avg_logprob,
+                "compression_ratio": decoding_result.compression_ratio,
+                "no_speech_prob": decoding_result.no_speech_prob,
+            }
+
+            # Add the word timestamps
+            add_word_timestamps(
+                segments = [segment],
+                model = model,
+                tokenizer = tokenizer,
+                mel = mels[index].to(model.device),
+                num_frames = num_frames[index],
+                last_speech_timestamp = 0.0,
+            )
+
+            results.append({
+                "text": text,
+                "segments": [segment],
+                "language": "en",
+            })
+
+        # Return the results in the same order
+        return results
\ No newline at end of file
@@ -0,0 +1,267 @@
+# MARK: Import
+# Dependencies
+import os
+import signal
+import datetime
+import itertools
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvException, EvAPIException, EvServerException
+from app.utils.logger import ev_logger
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: GetHostAddress
+def get_host_address(index: int):
+    '''
+    Custom function to get the address of the model host. Unix socket address will
+    be suffixed with the host index, and `host:port` address will use the next port
+    for each host.
+
+    Args:
+    - index: int: Index of the model host.
+
+    Returns:
+    - str | tuple: Address of the model host.
+    '''
+    # Get the base address
+    address = EvIELTSConfig.asr_inference_address
+
+    # If the address is TCP address
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        return (host, int(port) + index)
+
+    # Return the unix socket address
+    return f'{address}.{index}'
+
+# MARK: GetAuthkey
+def get_authkey() -> bytes:
+    '''
+    Custom function to get the authentication key of the model hosts. The
+    connection unpickle the payload of the peer, so the key is required and has
+    no default value.
+
+    Returns:
+    - bytes: The authentication key.
+    '''
+    if EvIELTSConfig.asr_inference_authkey == '':
+        raise EvServerException(
+            message = "ASR_INFERENCE_AUTHKEY is required for the ASR inference server",
+        )
+
+    return EvIELTSConfig.asr_inference_authkey.encode('utf-8')
+
+# MARK: EvASRInferenceClient
+class EvASRInferenceClient:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.addresses = [get_host_address(index) for index in range(EvIELTSConfig.asr_inference_hosts)]
+        self.authkey = get_authkey()
+        self.timeout = EvIELTSConfig.asr_inference_timeout
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    # MARK: NextAddress
+    def _next_address(self):
+        # Round robin over the model hosts
+        with self.lock:
+            index = next(self.counter) % len(self.addresses)
+
+        return self.addresses[index]
+
+    # MARK: Request
+    def _request(self, address, payload: dict):
+        # Connect to the model host
+        with Client(address, authkey = self.authkey) as connection:
+            # Send the job
+            connection.send(payload)
+
+            # Wait for the result
+            if not connection.poll(self.timeout):
+                raise EvAPIException(
+                    message = f"ASR inference server '{address}' timeout after {self.timeout} seconds",
+                )
+            response = connection.recv()
+
+        # If the model host failed
+        if 'error' in response:
+            raise EvAPIException(
+                message = response['error'],
+            )
+
+        # Return the result
+        return response['result']
+
+    # MARK: HealthCheck
+    def health_check(self):
+        # Check every model host
+        hosts = []
+        for address in self.addresses:
+            try:
+                hosts.append(self._request(address, {'action': 'health_check'}))
+            except Exception as error:
+                hosts.append({
+                    "model_ready": False,
+                    "address": str(address),
+                    "error": str(error),
+                })
+
+        return hosts
+
+    # MARK: UpdateModel
+    def update_model(self, model_name: str):
+        # Update the model in every model host
+        for address in self.addresses:
+            self._request(address, {'action': 'update_model', 'model_name': model_name})
+
+    # MARK: Transcribe
+    def transcribe(self, audio_buffer: EvAudioBufferModel, initial_prompt: str):
+        try:
+            # Submit the job to the next model host
+            return self._request(self._next_address(), {
+                'action': 'transcribe',
+                'audio_buffer': audio_buffer,
+                'initial_prompt': initial_prompt,
+            })
+
+        except EvException as error:
+            # If the error is EvException
+            raise error
+
+        except Exception as error:
+            ev_logger.info("Failed to reach ASR inference server x")
+            ev_logger.info(f"Error: {error}")
+
+            # If something went wrong
+            raise EvAPIException(
+                message = f"Failed to reach ASR inference server: {str(error)}",
+            )
+
+# MARK: HandleConnection
+def _handle_connection(connection, asr_service):
+    try:
+        # Receive the job
+        payload = connection.recv()
+        action = payload.get('action')
+
+        # Run the job
+        if action == 'transcribe':
+            result = asr_service.transcribe(
+                payload['audio_buffer'],
+                initial_prompt = payload.get('initial_prompt'),
+            )
+        elif action == 'update_model':
+            asr_service.update_model(model_name = payload['model_name'])
+            result = asr_service.health_check()
+        elif action == 'health_check':
+            result = asr_service.health_check()
+        else:
+            raise EvAPIException(
+                message = f"Invalid ASR inference action '{action}'",
+            )
+
+        # Send the result
+        connection.send({'result': result})
+
+    except EvException as error:
+        connection.send({'error': error.message})
+
+    except Exception as error:
+        connection.send({'error': f"ASR inference failed: {str(error)}"})
+
+    finally:
+        connection.close()
+
+# MARK: CreateHostService
+def _create_host_service():
+    # Import here, the ASR service import this module
+    from app.services.asr_service import EvASRService
+
+    # The shared `asr_service` of this process is created in the server mode by the app import,
+    # the host use its own local service, so the jobs are not sent back to the model hosts
+    return EvASRService(inference_mode = 'local')
+
+# MARK: Serve
+def _serve(listener: Listener, asr_service):
+    # Serve the jobs, every connection in its own thread
+    while True:
+        try:
+            connection = listener.accept()
+        except Exception as error:
+            ev_logger.info("Failed to accept ASR inference connection x")
+            ev_logger.info(f"Error: {error}")
+            continue
+
+        threading.Thread(
+            target = _handle_connection,
+            args = (connection, asr_service),
+            daemon = True,
+        ).start()
+
+# MARK: RunHost
+def _run_host(index: int):
+    '''
+    Custom function to run one model host. The model host own the Whisper weights
+    and serve the jobs from the Flask workers, every connection is handled in a
+    thread so concurrent jobs can share the same model.
+
+    Args:
+    - index: int: Index of the model host.
+    '''
+    # Load the Whisper weights in the local service of this host
+    asr_service = _create_host_service()
+    asr_service.load()
+
+    # Get the address and remove the old unix socket
+    address = get_host_address(index)
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+
+    ev_logger.info(f"ASR inference host {index} listening on '{address}' √")
+
+    # Serve the jobs
+    with Listener(address, authkey = get_authkey()) as listener:
+        _serve(listener, asr_service)
+
+# MARK: RunInferenceServer
+def run_inference_server():
+    '''
+    Custom function to run the ASR inference server. The server start
+    `EvIELTSConfig.asr_inference_hosts` model host processes, each with its own
+    copy of the Whisper weights, and wait until they exit.
+    '''
+    # Refuse to start without the authentication key
+    get_authkey()
+
+    # Use spawn so the model hosts don't inherit the parent state
+    context = multiprocessing.get_context('spawn')
+
+    # Start the model hosts
+    hosts = []
+    for index in range(EvIELTSConfig.asr_inference_hosts):
+        host = context.Process(
+            target = _run_host,
+            args = (index,),
+            name = f'ev-asr-host-{index}',
+        )
+        host.start()
+        hosts.append(host)
+
+    ev_logger.info(f"ASR inference server started with {len(hosts)} host at {datetime.datetime.now()} √")
+
+    # Stop the model hosts when the server is stopped
+    def _stop(signum, frame):
+        for host in hosts:
+            host.terminate()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    # Wait for the model hosts
+    for host in hosts:
+        host.join()
\ No newline at end of file
@@ -1,57 +1,134 @@
 # MARK: Import
 # Dependencies
 import datetime
-import whisper
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 # Modules
 from config import EvIELTSConfig
 from app.utils.exception import EvException, EvClientException, EvServerException, EvAPIException
 from app.utils.logger import ev_logger
+from app.utils.audio import audio_duration, split_on_pauses
+from app.utils.transcript import shift_transcription, merge_transcriptions
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.services.asr_inference_service import EvASRInferenceClient
+from app.services.asr_batch_scheduler import EvASRBatchScheduler
+from app.services.asr_backend import get_asr_backend
+from app.services.vad_service import vad_service
 
 # MARK: EvASRService
 class EvASRService:
     # MARK: Properties
-    def __init__(self):
+    def __init__(self, inference_mode: str = None):
         # Properties
         self.model_name = EvIELTSConfig.whisper_model
         self.model = None
+        self.backend = get_asr_backend(EvIELTSConfig.asr_backend)
+        self.inference_mode = inference_mode if inference_mode is not None else EvIELTSConfig.asr_inference_mode
+        self.inference_client = None
+        self.batch_scheduler = None
+        self.model_lock = threading.Lock()
+        self.swap_lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.lazy_load = EvIELTSConfig.asr_lazy_load
+        self.target_model_name = self.model_name
+        self.loader_running = False
+        self.model_loading = None
+        self.chunking = EvIELTSConfig.chunking_enabled
+        self.chunk_max_seconds = EvIELTSConfig.chunk_max_seconds
+        self.chunk_min_audio_seconds = EvIELTSConfig.chunk_min_audio_seconds
+        self.chunk_executor = None
+        self.chunk_lock = threading.Lock()
         self.initial_prompt = "I was like, was like, I'm like, you know what I mean, kind of, um, ah, huh, and so, so um, uh, and um, like um, so like, like it's, it's like, i mean, yeah, ok so, uh so, so uh, yeah so, you know, it's uh, uh and, and uh, like, kind"
 
-        # Start download the model
-        self._start_download_model(model_name = self.model_name)
+        # If the model is hosted by the inference server
+        if self.inference_mode == 'server':
+            self.inference_client = EvASRInferenceClient()
+            ev_logger.info(f"Use ASR inference server for 'Whisper {self.model_name}' √")
+        else:
+            # Start the batch scheduler for concurrent requests, the model is loaded by `load`
+            if EvIELTSConfig.asr_batch_enabled and self.backend.supports_batch:
+                self.batch_scheduler = EvASRBatchScheduler(
+                    model_provider = lambda: self.model,
+                    model_lock = self.model_lock,
+                    fallback_transcribe = lambda model, audio_buffer, initial_prompt: self.backend.transcribe(
+                        model = model,
+                        audio_buffer = audio_buffer,
+                        initial_prompt = initial_prompt,
+                    ),
+                )
 
     # MARK: StartDownloadModel
     def _start_download_model(self, model_name: str):
         try:
-            ev_logger.info(f"Starting download 'Whisper {model_name}' ...")
+            ev_logger.info(f"Starting download 'Whisper {model_name}' with '{self.backend.name}' backend ...")
 
             # Try to load the ASR model (Whisper)
-            self.model = whisper.load_model(model_name)
+            self.model = self.backend.load(model_name)
 
-            ev_logger.info(f"Successfully download 'Whisper {model_name}' √")
+            ev_logger.info(f"Successfully download 'Whisper {model_name}' with '{self.backend.name}' backend √")
         except Exception as error:
-            ev_logger.info(f"Failed to download 'Whisper {model_name}' x")
+            ev_logger.info(f"Failed to download 'Whisper {model_name}' with '{self.backend.name}' backend x")
             ev_logger.info(f"Error: {error}")
 
+    # MARK: Load
+    def load(self):
+        '''
+        Custom function to load the local model. Called by `create_app` on startup,
+        or by the first transcription if `EvIELTSConfig.asr_lazy_load` is enabled.
+        '''
+        # If the model is hosted by the inference server
+        if self.inference_client is not None:
+            return
+
+        with self.load_lock:
+            # Load once, the concurrent requests wait for the first load
+            if self.model is None:
+                self._start_download_model(model_name = self.model_name)
+
     # MARK: CheckModel
     def check_model(self):
+        # If the model is hosted by the inference server
+        if self.inference_client is not None:
+            return all(host.get("model_ready", False) for host in self.inference_client.health_check())
+
         return self.model is not None
 
     # MARK: HealthCheck
     def health_check(self):
+        # If the model is hosted by the inference server
+        if self.inference_client is not None:
+            hosts = self.inference_client.health_check()
+            return {
+                "model_ready": all(host.get("model_ready", False) for host in hosts),
+                "model_name": self.model_name,
+                "model_type": "Whisper",
+                "model_initial_prompt": self.initial_prompt,
+                "inference_mode": self.inference_mode,
+                "inference_hosts": hosts,
+                "timestamp": datetime.datetime.now()
+            }
+
         return {
             "model_ready": self.check_model(),
             "model_name": self.model_name,
             "model_type": "Whisper",
+            "model_backend": self.backend.name,
             "model_initial_prompt": self.initial_prompt,
+            "inference_mode": self.inference_mode,
+            "model_loading": self.model_loading,
+            "lazy_load": self.lazy_load,
+            "batch": self.batch_scheduler.health_check() if self.batch_scheduler is not None else None,
+            "chunking": self._can_chunk(),
             "timestamp": datetime.datetime.now()
         }
 
     # MARK: UpdateModel
     def update_model(self, model_name: str):
         try:
-            # Define available whisper models
-            available_models = ["tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en", "large", "turbo"]
+            # Define available whisper models of the backend
+            available_models = self.backend.available_models
 
             # Check if model name is one of the available models
             if (available_models.count(model_name) == 0):
@@ -59,11 +136,42 @@ class EvASRService:
                     message = "Invalid model name",
                 )
 
-            # Update the model name propertied
-            self.model_name = model_name
+            # If the model is hosted by the inference server
+            if self.inference_client is not None:
+                # Update the model name propertied
+                self.model_name = model_name
+
+                # Update the model in the inference server
+                self.inference_client.update_model(model_name = model_name)
+                return
+
+            # If the model is not loaded yet, like the lazy load, the first load use the new model
+            if self.model is None and self.load_lock.acquire(blocking = False):
+                try:
+                    if self.model is None:
+                        self.model_name = model_name
+                        self.target_model_name = model_name
+                        ev_logger.info(f"Model is not loaded yet, load 'Whisper {model_name}' on the first load √")
+                        return
+                finally:
+                    self.load_lock.release()
 
-            # Start download new model
-            self._start_download_model(model_name = model_name)
+            with self.swap_lock:
+                # The loader always load the latest requested model
+                self.target_model_name = model_name
+
+                # If the loader is running, or the model is already loaded, like the setting applied by the other worker
+                if self.loader_running or (model_name == self.model_name and self.model is not None):
+                    return
+
+                self.loader_running = True
+
+            # Load the new model in the background, the current model keep serving
+            threading.Thread(
+                target = self._run_loader,
+                name = 'ev-asr-model-loader',
+                daemon = True,
+            ).start()
 
         except EvException as error:
             # If the error is EvException
@@ -77,6 +185,74 @@ class EvASRService:
                 message = "Failed to update model",
             )
 
+    # MARK: LoadAndSwap
+    def _load_and_swap(self, model_name: str) -> bool:
+        # Define the loading progress
+        self.model_loading = {
+            "model_name": model_name,
+            "status": "loading",
+            "started_at": datetime.datetime.now(),
+            "finished_at": None,
+            "error": None,
+        }
+
+        try:
+            ev_logger.info(f"Starting load 'Whisper {model_name}' with '{self.backend.name}' backend in background ...")
+
+            # Load the new model next to the current model
+            model = self.backend.load(model_name)
+
+            # Warm up with one second of silence, so the first request don't pay the lazy initialization
+            self.model_loading["status"] = "warming"
+            self.backend.transcribe(
+                model = model,
+                audio_buffer = EvAudioBufferModel(
+                    samples = np.zeros(EvIELTSConfig.audio_clean_sample_rate, dtype = np.float32),
+                    sample_rate = EvIELTSConfig.audio_clean_sample_rate,
+                ),
+                initial_prompt = self.initial_prompt,
+            )
+
+            # Swap the model, wait for the running transcription of the current model
+            with self.model_lock:
+                self.model = model
+                self.model_name = model_name
+
+            self.model_loading["status"] = "ready"
+            self.model_loading["finished_at"] = datetime.datetime.now()
+
+            ev_logger.info(f"Successfully swap to 'Whisper {model_name}' with '{self.backend.name}' backend √")
+            return True
+
+        except Exception as error:
+            ev_logger.info(f"Failed to load 'Whisper {model_name}', keep using '{self.model_name}' x")
+            ev_logger.info(f"Error: {error}")
+
+            self.model_loading["status"] = "failed"
+            self.model_loading["finished_at"] = datetime.datetime.now()
+            self.model_loading["error"] = str(error)
+            return False
+
+    # MARK: RunLoader
+    def _run_loader(self):
+        while True:
+            with self.swap_lock:
+                # Stop when the latest requested model is loaded
+                model_name = self.target_model_name
+                if model_name == self.model_name and self.model is not None:
+                    self.loader_running = False
+                    return
+
+            # Load the model
+            loaded = self._load_and_swap(model_name)
+
+            with self.swap_lock:
+                # Don't retry the failed model, unless another model is requested
+                if not loaded and self.target_model_name == model_name:
+                    self.target_model_name = self.model_name
+                    self.loader_running = False
+                    return
+
     # MARK: UpdateInitialPrompt
     def update_initial_prompt(self, initial_prompt: str):
         # Update initial prompt
@@ -85,39 +261,134 @@ class EvASRService:
         ev_logger.info(f"Successfully update initial prompt to '{initial_prompt}' √")
 
     # MARK: Transcribe
-    def transcribe(self, audio_file_path: str):
+    def transcribe(self, audio_buffer: EvAudioBufferModel, initial_prompt: str = None):
         try:
-            # If the model is empty
-            if self.model is None:
-                raise EvServerException(
-                    message = f"Failed transcribe '{self.model_name}' because model is empty",
-                )
+            # Use the service initial prompt if not defined
+            initial_prompt = initial_prompt if initial_prompt is not None else self.initial_prompt
 
-            # Transcribe the audio
-            result = self.model.transcribe(
-                audio_file_path,
-                language = "en",
-                word_timestamps = True,
-                initial_prompt = self.initial_prompt,
-                fp16 = False,
-            )
+            # If the answer is long, transcribe the parts in parallel
+            if self._can_chunk() and audio_duration(audio_buffer) > self.chunk_min_audio_seconds:
+                return self._transcribe_chunked(audio_buffer, initial_prompt)
 
-            # Return the transcribe and the words timestamp
-            return result
+            return self._transcribe_single(audio_buffer, initial_prompt)
 
         except EvException as error:
             # If the error is EvException
             raise error
 
         except Exception as error:
-            ev_logger.info(f"Failed to transcribe audio '{audio_file_path}' x")
+            ev_logger.info(f"Failed to transcribe audio with duration '{audio_duration(audio_buffer)}' seconds x")
 
             # If something went wrong
             raise EvAPIException(
-                message = f"Failed to transcribe audio '{audio_file_path}'",
+                message = f"Failed to transcribe audio with duration '{audio_duration(audio_buffer)}' seconds",
             )
-        
-        
+
+    # MARK: TranscribeSingle
+    def _transcribe_single(self, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        # If the model is hosted by the inference server
+        if self.inference_client is not None:
+            # Submit the job to the inference server
+            return self.inference_client.transcribe(
+                audio_buffer = audio_buffer,
+                initial_prompt = initial_prompt,
+            )
+
+        # Load the model on the first transcription
+        if self.model is None:
+            self.load()
+
+        # If the model is empty
+        if self.model is None:
+            raise EvServerException(
+                message = f"Failed transcribe '{self.model_name}' because model is empty",
+            )
+
+        # If the audio fit in one window, transcribe in the next batch
+        if self.batch_scheduler is not None and self.batch_scheduler.can_batch(audio_buffer):
+            return self.batch_scheduler.transcribe(
+                audio_buffer = audio_buffer,
+                initial_prompt = initial_prompt,
+            )
+
+        # Transcribe the audio
+        with self.model_lock:
+            result = self.backend.transcribe(
+                model = self.model,
+                audio_buffer = audio_buffer,
+                initial_prompt = initial_prompt,
+            )
+
+        # Return the transcribe and the words timestamp
+        return result
+
+    # MARK: CanChunk
+    def _can_chunk(self) -> bool:
+        # The parts only run at the same time on the inference hosts or in one batch, the local model lock run them one by one
+        return self.chunking and (self.inference_client is not None or self.batch_scheduler is not None)
+
+    # MARK: GetChunkExecutor
+    def _get_chunk_executor(self) -> ThreadPoolExecutor:
+        # Start the chunk pool on the first long answer, so it is created in the worker process
+        with self.chunk_lock:
+            if self.chunk_executor is None:
+                self.chunk_executor = ThreadPoolExecutor(
+                    max_workers = EvIELTSConfig.chunk_workers,
+                    thread_name_prefix = 'ev-asr-chunk',
+                )
+
+        return self.chunk_executor
+
+    # MARK: TranscribeChunked
+    def _transcribe_chunked(self, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        '''
+        Custom function to transcribe the long answer in parts. The audio is cut on
+        the VAD pauses into parts not longer than `EvIELTSConfig.chunk_max_seconds`,
+        the parts are transcribed at the same time, so they fit in one Whisper window
+        and are batched together, then joined on the timeline of the whole audio.
+
+        Important: Only used with `ASR_BATCH_ENABLED` or the inference server, the
+        parts of the local model without batching would wait for the model lock one
+        by one. Every part is transcribed by `_transcribe_single`, so it is never
+        split again and the chunk pool can't wait for itself.
+
+        Args:
+        - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+        - initial_prompt: str: The initial prompt of the model.
+
+        Returns:
+        - dict: The whisper transcription result of the whole audio.
+        '''
+        # Define the parts on the pauses
+        parts = split_on_pauses(audio_buffer, vad_service.detect_speech(audio_buffer), self.chunk_max_seconds)
+
+        # Transcribe every part at the same time
+        executor = self._get_chunk_executor()
+        futures = [
+            executor.submit(
+                self._transcribe_single,
+                EvAudioBufferModel(samples = audio_buffer.samples[start:end], sample_rate = audio_buffer.sample_rate),
+                initial_prompt,
+            )
+            for start, end in parts
+        ]
+
+        try:
+            # Move every part to the timeline of the whole audio
+            results = [
+                shift_transcription(future.result(), start / float(audio_buffer.sample_rate))
+                for future, (start, _) in zip(futures, parts)
+            ]
+        except Exception:
+            # Don't transcribe the rest of the failed audio
+            for future in futures:
+                future.cancel()
+            raise
+
+        ev_logger.info(f"Successfully transcribe '{audio_duration(audio_buffer):.2f}' seconds audio in '{len(parts)}' parts √")
+
+        return merge_transcriptions(results)
+
 # MARK: EvASRServiceInstance
 # Define ASR service instance
 asr_service = EvASRService()
\ No newline at end of file
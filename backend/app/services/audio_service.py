@@ -0,0 +1,235 @@
+# MARK: Import
+# Dependencies
+import io
+import time
+import datetime
+import threading
+import av
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvException, EvServerException
+from app.utils.audio import normalize_audio, read_pcm_wav
+from app.utils.logger import ev_logger
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: EvAudioService
+class EvAudioService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.decoder_workers = EvIELTSConfig.audio_decoder_workers
+        self.decode_timeout = EvIELTSConfig.audio_decode_timeout
+        self.pyav_max_bytes = EvIELTSConfig.audio_pyav_max_bytes
+        self.decode_count = 0
+        self.fallback_count = 0
+        self.fast_path_count = 0
+        self.lock = threading.Lock()
+
+        # Define the supported encodings, the value is container format, codec, extension and content type
+        self.encodings = {
+            'wav': ('wav', 'pcm_s16le', 'wav', 'audio/wav'),
+            'flac': ('flac', 'flac', 'flac', 'audio/flac'),
+            'opus': ('ogg', 'libopus', 'ogg', 'audio/ogg'),
+        }
+
+        # Start the decoder pool, the threads are kept alive between requests
+        self.executor = ThreadPoolExecutor(
+            max_workers = self.decoder_workers,
+            thread_name_prefix = 'ev-audio-decoder',
+        )
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "decoder": "PyAV",
+            "decoder_workers": self.decoder_workers,
+            "decode_count": self.decode_count,
+            "fallback_count": self.fallback_count,
+            "fast_path_count": self.fast_path_count,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: CountDecode
+    def _count_decode(self, fallback: bool = False, fast_path: bool = False):
+        with self.lock:
+            self.decode_count += 1
+            if fallback:
+                self.fallback_count += 1
+            if fast_path:
+                self.fast_path_count += 1
+
+    # MARK: DecodeWithPyAV
+    def _decode_with_pyav(self, audio_data: bytes, deadline: float) -> np.ndarray:
+        # Define the resampler to the clean format
+        resampler = av.AudioResampler(
+            format = 's16',
+            layout = 'mono' if EvIELTSConfig.audio_clean_channels == 1 else 'stereo',
+            rate = EvIELTSConfig.audio_clean_sample_rate,
+        )
+
+        # Decode and resample every frame in the process, without ffmpeg subprocess
+        chunks = []
+        with av.open(io.BytesIO(audio_data), mode = 'r') as container:
+            for frame in container.decode(audio = 0):
+                # Stop the slow decode in the worker, so the bad upload don't keep the decoder thread
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"PyAV decode exceeds {self.decode_timeout} seconds")
+
+                for resampled_frame in resampler.resample(frame):
+                    chunks.append(resampled_frame.to_ndarray().reshape(-1))
+
+        # Flush the resampler
+        for resampled_frame in resampler.resample(None):
+            chunks.append(resampled_frame.to_ndarray().reshape(-1))
+
+        # If nothing is decoded
+        if not chunks:
+            raise EvServerException(
+                message = "Failed to decode audio, no audio frame found",
+            )
+
+        # Return the float32 samples
+        return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+    # MARK: DecodeWorker
+    def _decode_worker(self, audio_data: bytes, audio_extension: str, deadline: float) -> EvAudioBufferModel:
+        try:
+            # Decode the oversized audio with the killable ffmpeg process
+            if len(audio_data) > self.pyav_max_bytes:
+                raise ValueError(f"Audio size exceeds the PyAV limit of {self.pyav_max_bytes} bytes")
+
+            # Decode the audio in the worker
+            samples = self._decode_with_pyav(audio_data, deadline)
+            self._count_decode()
+
+            # Return the audio buffer
+            return EvAudioBufferModel(
+                samples = samples,
+                sample_rate = EvIELTSConfig.audio_clean_sample_rate,
+            )
+
+        except Exception as error:
+            ev_logger.info(f"Failed to decode '{audio_extension}' audio with PyAV, fallback to ffmpeg x")
+            ev_logger.info(f"Error: {error}")
+
+            # If the time limit is already spent
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise EvServerException(
+                    message = f"Failed to decode '{audio_extension}' audio in {self.decode_timeout} seconds",
+                )
+
+            # Fallback to ffmpeg process, it is killed after the rest of the time limit
+            audio_buffer = normalize_audio(
+                audio_data = audio_data,
+                audio_extension = audio_extension,
+                timeout = remaining,
+            )
+            self._count_decode(fallback = True)
+
+            # Return the audio buffer
+            return audio_buffer
+
+    # MARK: Decode
+    def decode(self, audio_data: bytes, audio_extension: str) -> EvAudioBufferModel:
+        try:
+            # Check if the audio data is empty
+            if not audio_data:
+                raise EvServerException(
+                    message = f"Audio data is empty while decode the '{audio_extension}' audio",
+                )
+
+            # Fast path for PCM wav, skip the decoder
+            audio_buffer = read_pcm_wav(audio_data)
+            if audio_buffer is not None:
+                self._count_decode(fast_path = True)
+                return audio_buffer
+
+            # Submit the job to the decoder pool, the worker stop itself at the deadline
+            deadline = time.monotonic() + self.decode_timeout
+            future = self.executor.submit(self._decode_worker, audio_data, audio_extension, deadline)
+
+            # Wait for the decoded audio, with a short grace for the worker to stop
+            return future.result(timeout = self.decode_timeout + 5)
+
+        except EvException as error:
+            # If the error is EvException
+            raise error
+
+        except Exception as error:
+            ev_logger.info(f"Failed to decode '{audio_extension}' audio x")
+
+            # If something went wrong
+            raise EvServerException(
+                message = f"Failed to decode '{audio_extension}' audio: {str(error)}",
+            )
+
+    # MARK: Encode
+    def encode(self, audio_buffer: EvAudioBufferModel, encoding: str, output = None, chunk_size: int = 65536) -> bytes:
+        '''
+        Custom function to encode the normalized audio buffer with PyAV, used to send
+        a compressed audio like FLAC or Opus instead of 16-bit PCM wav. The samples are
+        encoded chunk by chunk, so only the encoded output grows with the audio.
+
+        Args:
+        - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+        - encoding: str: Encoding of the audio, one of `self.encodings`.
+        - output: file: Optional binary file to write the encoded audio to, instead of the memory.
+        - chunk_size: int: Number of samples per frame.
+
+        Returns:
+        - bytes: Content of the encoded audio file, or None if it is written to the `output`.
+        '''
+        try:
+            # Check if the encoding is supported
+            if encoding not in self.encodings:
+                raise EvServerException(
+                    message = f"Audio encoding '{encoding}' is not supported",
+                )
+
+            # Encode the audio into memory if there is no output file
+            container_format, codec, _, _ = self.encodings[encoding]
+            target = output if output is not None else io.BytesIO()
+            with av.open(target, mode = 'w', format = container_format) as container:
+                stream = container.add_stream(codec, rate = audio_buffer.sample_rate)
+                stream.layout = 'mono'
+                if encoding == 'opus':
+                    stream.bit_rate = EvIELTSConfig.callback_audio_bitrate
+
+                for start in range(0, len(audio_buffer.samples), chunk_size):
+                    # Convert float32 samples to 16-bit PCM
+                    pcm = (np.clip(audio_buffer.samples[start:start + chunk_size], -1.0, 1.0) * 32767.0).astype(np.int16)
+
+                    # Define the audio frame, PyAV split the frame to the codec frame size
+                    frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format = 's16', layout = 'mono')
+                    frame.sample_rate = audio_buffer.sample_rate
+                    frame.pts = start
+
+                    for packet in stream.encode(frame):
+                        container.mux(packet)
+
+                # Flush the encoder
+                for packet in stream.encode(None):
+                    container.mux(packet)
+
+            # Return the encoded audio
+            return target.getvalue() if output is None else None
+
+        except EvException as error:
+            # If the error is EvException
+            raise error
+
+        except Exception as error:
+            ev_logger.info(f"Failed to encode '{encoding}' audio x")
+
+            # If something went wrong
+            raise EvServerException(
+                message = f"Failed to encode '{encoding}' audio: {str(error)}",
+            )
+
+# MARK: EvAudioServiceInstance
+# Define audio service instance
+audio_service = EvAudioService()
\ No newline at end of file
@@ -0,0 +1,189 @@
+# MARK: Import
+# Dependencies
+import json
+import time
+import hashlib
+import datetime
+import numpy as np
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.logger import ev_logger
+from app.utils.sqlite import connect_sqlite
+
+# MARK: EvCacheService
+class EvCacheService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.enabled = EvIELTSConfig.cache_enabled
+        self.store_path = EvIELTSConfig.cache_store_path
+        self.ttl_seconds = EvIELTSConfig.cache_ttl_seconds
+        self.max_entries = EvIELTSConfig.cache_max_entries
+
+        # Create the cache table
+        with connect_sqlite(self.store_path) as connection:
+            connection.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                '''
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+            connection.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    namespace TEXT PRIMARY KEY,
+                    hit_count INTEGER NOT NULL DEFAULT 0,
+                    miss_count INTEGER NOT NULL DEFAULT 0
+                )
+                '''
+            )
+
+    # MARK: HealthCheck
+    def health_check(self):
+        # Count the entries and the hits of every worker
+        with connect_sqlite(self.store_path) as connection:
+            entry_count = connection.execute('SELECT COUNT(*) AS total FROM cache').fetchone()['total']
+            rows = connection.execute('SELECT * FROM cache_stats').fetchall()
+
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "entry_count": entry_count,
+            "stats": {row['namespace']: {'hit_count': row['hit_count'], 'miss_count': row['miss_count']} for row in rows},
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: MakeKey
+    def make_key(self, namespace: str, *parts) -> str:
+        '''
+        Custom function to define the content addressed key. Every part is hashed with
+        its length, so different parts can't produce the same key.
+
+        Args:
+        - namespace: str: Namespace of the cached result, like `transcribe`.
+        - parts: str | bytes | np.ndarray | int | float | None: Content of the request,
+        like the audio, question, model name, prompt and options.
+
+        Returns:
+        - str: The cache key.
+        '''
+        hasher = hashlib.sha256(namespace.encode('utf-8'))
+        for part in parts:
+            if isinstance(part, (int, float)):
+                # Encode the number option with its type, so `1`, `1.0` and `'1'` are different
+                content = f'{type(part).__name__}:{part!r}'.encode('utf-8')
+            elif isinstance(part, str) or part is None:
+                # Encode the text part
+                content = (part or '').encode('utf-8')
+            elif isinstance(part, (np.ndarray, np.generic)):
+                # Hash the array with its dtype and shape, only the strided array is copied
+                array = np.ascontiguousarray(part)
+                header = f'ndarray:{array.dtype.str}:{array.shape}'.encode('utf-8')
+                hasher.update(len(header).to_bytes(8, 'little'))
+                hasher.update(header)
+                content = memoryview(array.reshape(-1).view(np.uint8))
+            else:
+                # The bytes are hashed without copy
+                content = memoryview(part).cast('B')
+            hasher.update(len(content).to_bytes(8, 'little'))
+            hasher.update(content)
+
+        return f'{namespace}:{hasher.hexdigest()}'
+
+    # MARK: CountStats
+    def _count_stats(self, connection, namespace: str, hit: bool):
+        connection.execute(
+            f'''
+            INSERT INTO cache_stats (namespace, hit_count, miss_count) VALUES (?, ?, ?)
+            ON CONFLICT (namespace) DO UPDATE SET {'hit_count = hit_count + 1' if hit else 'miss_count = miss_count + 1'}
+            ''',
+            (namespace, int(hit), int(not hit)),
+        )
+
+    # MARK: Get
+    def get(self, key: str) -> dict | None:
+        '''
+        Custom function to get the cached result. The expired result is ignored, and
+        the access time of the found result is updated for the LRU eviction.
+
+        Args:
+        - key: str: The cache key from `make_key`.
+
+        Returns:
+        - dict | None: The cached result, or `None` if not found.
+        '''
+        if not self.enabled:
+            return None
+
+        try:
+            namespace = key.split(':', 1)[0]
+            now = time.time()
+
+            with connect_sqlite(self.store_path) as connection:
+                # Get the result
+                row = connection.execute(
+                    'SELECT value FROM cache WHERE key = ? AND created_at >= ?',
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+
+                # Update the access time
+                if row is not None:
+                    connection.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+
+                self._count_stats(connection, namespace, hit = row is not None)
+
+            # Return the result
+            return json.loads(row['value']) if row is not None else None
+
+        except Exception as error:
+            ev_logger.info(f"Failed to get cache '{key}' x")
+            ev_logger.info(f"Error: {error}")
+            return None
+
+    # MARK: Set
+    def set(self, key: str, value: dict):
+        '''
+        Custom function to save the result, then evict the expired results and the
+        least recently used results over `EvIELTSConfig.cache_max_entries`.
+
+        Args:
+        - key: str: The cache key from `make_key`.
+        - value: dict: The result to cache.
+        '''
+        if not self.enabled:
+            return
+
+        try:
+            now = time.time()
+
+            with connect_sqlite(self.store_path) as connection:
+                # Save the result
+                connection.execute(
+                    'INSERT OR REPLACE INTO cache (key, namespace, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                    (key, key.split(':', 1)[0], json.dumps(value, default = str), now, now),
+                )
+
+                # Evict the expired results
+                connection.execute('DELETE FROM cache WHERE created_at < ?', (now - self.ttl_seconds,))
+
+                # Evict the least recently used results
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,),
+                )
+
+        except Exception as error:
+            ev_logger.info(f"Failed to set cache '{key}' x")
+            ev_logger.info(f"Error: {error}")
+
+# MARK: EvCacheServiceInstance
+# Define cache service instance
+cache_service = EvCacheService()
@@ -0,0 +1,492 @@
+# MARK: Import
+# Dependencies
+import os
+import json
+import time
+import uuid
+import queue
+import base64
+import datetime
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.file import open_atomic, write_atomic
+from app.utils.audio import wav_chunks
+from app.utils.logger import ev_logger
+from app.utils.multipart import EvMultipartStream, EvURLEncodedStream
+from app.services.audio_service import audio_service
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: EvCallbackService
+class EvCallbackService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.base_url = EvIELTSConfig.callback_base_url.rstrip('/')
+        self.workers = EvIELTSConfig.callback_workers
+        self.pool_size = EvIELTSConfig.callback_pool_size
+        self.timeout = EvIELTSConfig.callback_timeout
+        self.max_retries = EvIELTSConfig.callback_max_retries
+        self.backoff_seconds = EvIELTSConfig.callback_backoff_seconds
+        self.spool_directory = EvIELTSConfig.callback_spool_directory
+        self.spool_interval = EvIELTSConfig.callback_spool_interval
+        self.audio_encoding = EvIELTSConfig.callback_audio_encoding
+        self.queue_max_bytes = EvIELTSConfig.callback_queue_max_bytes
+        self.queue = None
+        self.queued_bytes = 0
+        self.session = None
+        self.spool_event = None
+        self.next_retry_at = None
+        self.threads_pid = None
+        self.delivered_count = 0
+        self.failed_count = 0
+        self.spooled_count = 0
+        self.lock = threading.Lock()
+
+    # MARK: HealthCheck
+    def health_check(self):
+        # Count the undelivered payloads
+        spool_count = 0
+        if os.path.isdir(self.spool_directory):
+            spool_count = len([name for name in os.listdir(self.spool_directory) if name.endswith('.json')])
+
+        return {
+            "base_url": self.base_url,
+            "audio_encoding": self.audio_encoding,
+            "queue_size": self.queue.qsize() if self.queue is not None else 0,
+            "queued_bytes": self.queued_bytes,
+            "delivered_count": self.delivered_count,
+            "failed_count": self.failed_count,
+            "spooled_count": self.spooled_count,
+            "spool_count": spool_count,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: Start
+    def start(self):
+        with self.lock:
+            # Start once per process, the threads and the connection pool are not copied after fork
+            if self.threads_pid == os.getpid():
+                return
+
+            # Define the persistent session with connection pool
+            self.session = requests.Session()
+            self.session.mount('https://', HTTPAdapter(pool_connections = 1, pool_maxsize = self.pool_size))
+            self.session.mount('http://', HTTPAdapter(pool_connections = 1, pool_maxsize = self.pool_size))
+
+            # Define the bounded delivery queue
+            self.queue = queue.Queue(maxsize = EvIELTSConfig.callback_queue_size)
+            self.queued_bytes = 0
+            self.spool_event = threading.Event()
+            self.next_retry_at = None
+            self.threads_pid = os.getpid()
+
+            # Start the delivery workers
+            for index in range(self.workers):
+                threading.Thread(
+                    target = self._run_worker,
+                    name = f'ev-callback-worker-{index}',
+                    daemon = True,
+                ).start()
+
+            # Start the spool replay
+            threading.Thread(
+                target = self._run_spool,
+                name = 'ev-callback-spool',
+                daemon = True,
+            ).start()
+
+    # MARK: Dispatch
+    def dispatch(self, path: str, data: dict, headers: dict = None, audio_buffer: EvAudioBufferModel = None):
+        '''
+        Custom function to send the data to the Englishvit API in the background. The
+        function return immediately, the failed delivery is saved to the spool directory
+        and replayed with backoff, so the delivery worker is not blocked while waiting.
+
+        Important: With the default `wav` encoding the `audio_buffer` is sent as the
+        streamed urlencoded `audio` form field, like the Englishvit API always received
+        it. The other `EvIELTSConfig.callback_audio_encoding` are sent as the `audio` file
+        field with streamed multipart upload, so the receiver must accept it. The audio
+        is encoded to the spool directory first and streamed from the file.
+
+        The audio of the queued payloads is limited by `EvIELTSConfig.callback_queue_max_bytes`,
+        the payload over the limit is saved to the spool directly.
+
+        Args:
+        - path: str: Path of the Englishvit API, relative to `EvIELTSConfig.callback_base_url`.
+        - data: dict: Form data of the request.
+        - headers: dict: Headers of the request, like the `Authorization`.
+        - audio_buffer: EvAudioBufferModel: Optional normalized audio to send.
+        '''
+        # Make sure the workers are running
+        self.start()
+
+        # Define the payload
+        payload = {
+            'id': uuid.uuid4().hex,
+            'path': path,
+            'data': data,
+            'headers': headers or {},
+            'audio': audio_buffer,
+            'audio_encoding': self.audio_encoding,
+            'attempt': 0,
+        }
+
+        # Reserve the memory of the audio, the queue don't hold more than the limit
+        audio_bytes = audio_buffer.samples.nbytes if audio_buffer is not None else 0
+        with self.lock:
+            if self.queued_bytes + audio_bytes <= self.queue_max_bytes:
+                self.queued_bytes += audio_bytes
+                payload['queued_bytes'] = audio_bytes
+
+        try:
+            # Queue the payload
+            if 'queued_bytes' not in payload:
+                raise queue.Full
+            self.queue.put_nowait(payload)
+
+        except queue.Full:
+            ev_logger.info(f"Callback queue is full, spool '{path}' x")
+
+            # Save the payload to the spool
+            self._release_memory(payload)
+            self._spool(payload)
+
+    # MARK: ReleaseMemory
+    def _release_memory(self, payload: dict):
+        # Free the reserved memory of the queued audio
+        with self.lock:
+            self.queued_bytes -= payload.pop('queued_bytes', 0)
+
+    # MARK: SpoolDirectory
+    def _spool_directory(self) -> str:
+        # Only the owner can read the spool, it has the `Authorization` header
+        os.makedirs(self.spool_directory, mode = 0o700, exist_ok = True)
+        os.chmod(self.spool_directory, 0o700)
+        return self.spool_directory
+
+    # MARK: AudioFile
+    def _audio_file(self, payload: dict) -> str:
+        '''
+        Custom function to encode the audio once to the spool directory. Every attempt
+        stream the file, so the encoded audio is never held in memory, and the audio
+        buffer is freed as soon as it is encoded.
+
+        Args:
+        - payload: dict: The payload with the `audio` buffer or the `audio_path`.
+
+        Returns:
+        - str: Path of the encoded audio file.
+        '''
+        # If the audio is already encoded
+        if payload.get('audio_path'):
+            return payload['audio_path']
+
+        audio_path = os.path.join(self._spool_directory(), f"{payload['id']}.{payload['audio_encoding']}")
+        try:
+            with open_atomic(audio_path, binary = True, permission = 0o600) as file:
+                if payload['audio_encoding'] == 'wav':
+                    for chunk in wav_chunks(payload['audio']):
+                        file.write(chunk)
+                else:
+                    audio_service.encode(payload['audio'], payload['audio_encoding'], output = file)
+
+        except Exception as error:
+            # If the wav can't be written
+            if payload['audio_encoding'] == 'wav':
+                raise error
+
+            ev_logger.info(f"Failed to encode callback audio, fallback to wav x")
+            ev_logger.info(f"Error: {error}")
+
+            # Fallback to wav
+            payload['audio_encoding'] = 'wav'
+            return self._audio_file(payload)
+
+        # Free the audio buffer, the next attempts read the file
+        payload['audio_path'] = audio_path
+        payload['audio'] = None
+        return audio_path
+
+    # MARK: ReadFile
+    def _read_file(self, file_path: str, chunk_size: int = 65536):
+        with open(file_path, 'rb') as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    # MARK: AudioBody
+    def _audio_body(self, payload: dict) -> EvMultipartStream | EvURLEncodedStream:
+        # Encode the audio first, the encoding may fallback to wav
+        audio_path = self._audio_file(payload)
+        fields = {key: value for key, value in payload['data'].items() if value is not None}
+
+        # Send the wav as the urlencoded form field, like the Englishvit API expect it
+        if payload['audio_encoding'] == 'wav':
+            return EvURLEncodedStream(
+                fields = fields,
+                file_name = 'audio',
+                file_path = audio_path,
+            )
+
+        # Send the compressed audio as the multipart file field
+        _, _, extension, content_type = audio_service.encodings[payload['audio_encoding']]
+        return EvMultipartStream(
+            fields = fields,
+            file_name = 'audio',
+            file_filename = f'audio.{extension}',
+            file_content_type = content_type,
+            file_chunks = self._read_file(audio_path),
+            file_length = os.path.getsize(audio_path),
+        )
+
+    # MARK: Send
+    def _send(self, payload: dict) -> bool:
+        # Define the request body, it is a new stream of the audio file on every attempt
+        data = payload['data']
+        headers = dict(payload['headers'])
+        if payload.get('audio') is not None or payload.get('audio_path'):
+            data = self._audio_body(payload)
+            headers['Content-Type'] = data.content_type
+
+        # Send the request to the Englishvit API
+        response = self.session.post(
+            f"{self.base_url}/{payload['path'].lstrip('/')}",
+            data = data,
+            headers = headers,
+            timeout = self.timeout,
+        )
+
+        # Check if the response is successful
+        if response.status_code == 200:
+            return True
+
+        # Client error can't be fixed by retry, except timeout and rate limit
+        if 400 <= response.status_code < 500 and response.status_code not in [408, 429]:
+            ev_logger.info(f"Callback '{payload['path']}' rejected with {response.status_code}: {response.text} x")
+            return None
+
+        ev_logger.info(f"Callback '{payload['path']}' failed with {response.status_code} x")
+        return False
+
+    # MARK: Deliver
+    def _deliver(self, payload: dict):
+        try:
+            delivered = self._send(payload)
+        except Exception as error:
+            ev_logger.info(f"Callback '{payload['path']}' failed: {error} x")
+            delivered = False
+
+        # If the payload is delivered
+        if delivered:
+            with self.lock:
+                self.delivered_count += 1
+            self._release(payload)
+            return
+
+        # If the payload is rejected
+        if delivered is None:
+            with self.lock:
+                self.failed_count += 1
+            self._release(payload)
+            return
+
+        # Retry with exponential backoff from the spool, so the worker deliver the next payload
+        payload['attempt'] += 1
+        if payload['attempt'] <= self.max_retries:
+            delay = self.backoff_seconds * (2 ** (payload['attempt'] - 1))
+        else:
+            # Replay the failed payload on the next spool interval
+            with self.lock:
+                self.failed_count += 1
+            payload['attempt'] = 0
+            delay = self.spool_interval
+
+        self._spool(payload, retry_at = time.time() + delay)
+
+    # MARK: ScheduleRetry
+    def _schedule_retry(self, retry_at: float):
+        # Wake the spool replay earlier if the retry is before its next run
+        with self.lock:
+            if self.next_retry_at is None or retry_at < self.next_retry_at:
+                self.next_retry_at = retry_at
+
+        if self.spool_event is not None:
+            self.spool_event.set()
+
+    # MARK: Release
+    def _release(self, payload: dict, keep_audio: bool = False):
+        # Remove the claimed spool file of the replayed payload
+        if payload.get('spool_path') and os.path.exists(payload['spool_path']):
+            os.remove(payload['spool_path'])
+
+        # Remove the spooled audio file
+        if not keep_audio and payload.get('audio_path') and os.path.exists(payload['audio_path']):
+            os.remove(payload['audio_path'])
+
+    # MARK: RunWorker
+    def _run_worker(self):
+        while True:
+            # Deliver the next payload
+            payload = self.queue.get()
+            try:
+                self._deliver(payload)
+            finally:
+                self._release_memory(payload)
+
+    # MARK: Spool
+    def _spool(self, payload: dict, retry_at: float = None):
+        try:
+            # Encode the bytes field like the audio
+            data = {}
+            for key, value in payload['data'].items():
+                if isinstance(value, bytes):
+                    data[key] = {'__bytes__': base64.b64encode(value).decode('ascii')}
+                else:
+                    data[key] = value
+
+            # Write the audio next to the spool file, so it is not encoded as base64
+            audio_path = payload.get('audio_path')
+            if payload.get('audio') is not None:
+                audio_path = self._audio_file(payload)
+
+            # Write the spool file atomically, after the audio is on the disk
+            write_atomic(
+                os.path.join(self._spool_directory(), f"{payload['id']}.json"),
+                json.dumps({
+                    'id': payload['id'],
+                    'path': payload['path'],
+                    'data': data,
+                    'headers': payload['headers'],
+                    'audio_path': audio_path,
+                    'audio_encoding': payload['audio_encoding'],
+                    'attempt': payload['attempt'],
+                    'retry_at': retry_at or 0,
+                }, default = str),
+                permission = 0o600,
+            )
+
+            # Remove the old claimed spool file
+            self._release(payload, keep_audio = True)
+
+            with self.lock:
+                self.spooled_count += 1
+
+            # Replay the payload when the retry is due
+            if retry_at is not None:
+                self._schedule_retry(retry_at)
+
+        except Exception as error:
+            ev_logger.info(f"Failed to spool callback '{payload['path']}', payload is lost x")
+            ev_logger.info(f"Error: {error}")
+
+    # MARK: LoadSpool
+    def _load_spool(self, file_path: str) -> dict:
+        # Read the spool file
+        with open(file_path, 'r') as file:
+            payload = json.load(file)
+
+        # Decode the bytes field
+        for key, value in payload['data'].items():
+            if isinstance(value, dict) and '__bytes__' in value:
+                payload['data'][key] = base64.b64decode(value['__bytes__'])
+
+        payload.setdefault('audio_path', None)
+        payload.setdefault('audio_encoding', self.audio_encoding)
+        payload.setdefault('attempt', 0)
+        payload.pop('retry_at', None)
+        return payload
+
+    # MARK: RetryAt
+    def _retry_at(self, file_path: str) -> float:
+        # Read the time of the next attempt, the old spool file is replayed immediately
+        try:
+            with open(file_path, 'r') as file:
+                return float(json.load(file).get('retry_at') or 0)
+        except (OSError, ValueError):
+            return 0.0
+
+    # MARK: SpoolTimeout
+    def _spool_timeout(self) -> float:
+        # Wait until the next retry, or the spool interval
+        with self.lock:
+            if self.next_retry_at is None:
+                return self.spool_interval
+            return min(max(self.next_retry_at - time.time(), 0), self.spool_interval)
+
+    # MARK: IsOrphan
+    def _is_orphan(self, name: str) -> bool:
+        # Get the process id of the claimed file
+        suffix = name.rsplit('.', 1)[-1]
+        if '.json.' not in name or not suffix.isdigit() or int(suffix) == os.getpid():
+            return False
+
+        try:
+            # Check if the process is still running
+            os.kill(int(suffix), 0)
+            return False
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+
+    # MARK: RunSpool
+    def _run_spool(self):
+        while True:
+            # Wait for the next replay, or the next retry
+            self.spool_event.wait(self._spool_timeout())
+            self.spool_event.clear()
+
+            # If nothing is spooled
+            if not os.path.isdir(self.spool_directory):
+                continue
+
+            now = time.time()
+            next_retry_at = None
+            for name in os.listdir(self.spool_directory):
+                # Only replay when the queue is empty, the new payload come first
+                if not self.queue.empty():
+                    next_retry_at = now + self.backoff_seconds
+                    break
+
+                # Only replay the spool file, or the file claimed by a dead process
+                if not name.endswith('.json') and not self._is_orphan(name):
+                    continue
+
+                # Keep the payload until its retry is due
+                if name.endswith('.json'):
+                    retry_at = self._retry_at(os.path.join(self.spool_directory, name))
+                    if retry_at > now:
+                        next_retry_at = retry_at if next_retry_at is None else min(next_retry_at, retry_at)
+                        continue
+
+                # Claim the file, so other worker process don't replay it too
+                file_path = os.path.join(self.spool_directory, name)
+                claimed_path = os.path.join(self.spool_directory, f"{name.split('.json')[0]}.json.{os.getpid()}")
+                try:
+                    os.rename(file_path, claimed_path)
+                except OSError:
+                    continue
+
+                try:
+                    # Deliver the payload again, it is spooled again if still failed
+                    payload = self._load_spool(claimed_path)
+                    payload['spool_path'] = claimed_path
+                    self.queue.put(payload)
+
+                except Exception as error:
+                    ev_logger.info(f"Failed to replay spooled callback '{name}' x")
+                    ev_logger.info(f"Error: {error}")
+
+            # Wait for the earliest retry that is not due yet
+            with self.lock:
+                self.next_retry_at = next_retry_at
+
+# MARK: EvCallbackServiceInstance
+# Define callback service instance
+callback_service = EvCallbackService()
\ No newline at end of file
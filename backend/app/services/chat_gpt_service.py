@@ -1,7 +1,6 @@
 # MARK: Import
 # Dependencies
 import datetime
-from openai import OpenAI
 
 # Modules
 from config import EvIELTSConfig
@@ -9,6 +8,7 @@ from app.utils.exception import EvException, EvAPIException
 from app.models.chat_gpt_evaluation_model import EvChatGPTEvaluationModel
 from app.models.chat_gpt_overall_evaluation_model import EvChatGPTOverallEvaluationModel
 from app.utils.logger import ev_logger
+from app.services.openai_client_service import openai_client_service
 
 # MARK: EvChatGPTService
 class EvChatGPTService:
@@ -58,6 +58,50 @@ class EvChatGPTService:
         - I also add "probability" for each word from WhisperAPI
         """
 
+        # Define the static overall prompt
+        self.overall_prompt = """
+        You are an IELTS Speaking examiner expert that have attention to the detail and precision, evaluate overall IELTS speaking simulation of this candidate based on speaking simulation history.
+
+        Provide feedback for each evaluation metrics  and the overall with
+        - Final IELTS band score from 0.0 to 9.0 (Don't forget use based on IELTS band rules like 6.5, 7.0, 7.5 don't use 6.1, 6.2, 6.3)
+        - 'readable_feedback' using HTML tags, make sure to have 2 <p> tags in the 'readable_feedback' and use <strong> to highlight key words.
+        - The first <p> tag is for overall feedback written with 1-2 sentences and the second <p> tag is for tips feedback written with 1 sentences.
+        - Make the 'readable_feedback' short and motivating, written in a style that's friendly for Gen Z learners.
+        - Use a conversational tone (like you're giving advice to a peer).
+        - Use emojis to make it fun and encouraging (e.g., 🔥, 💡, ✨, 🚀).
+        """
+        self.overall_prompt_cache_key = openai_client_service.prompt_cache_key('chatgpt-overall', self.overall_prompt)
+
+        # Build the evaluation prompt
+        self._build_prompt()
+
+    # MARK: BuildPrompt
+    def _build_prompt(self):
+        # Build the evaluation prompt once, so every request send the same prompt prefix
+        self.system_prompt = f"""
+        You are an IELTS Speaking examiner expert that have attention to the detail and precision, evaluate candidate answer based on the question for each evaluation metrics. 
+
+        {self.fluency_prompt}
+
+        {self.lexical_prompt}
+
+        {self.grammar_prompt}
+
+        {self.pronunciation_prompt}
+
+        Provide feedback for each evaluation metrics with
+        - Final IELTS band score from 0.0 to 9.0 (Don't forget use based on IELTS band rules like 6.5, 7.0, 7.5 don't use 6.1, 6.2, 6.3)
+        - 'candidate_answer' Write again the candidate answer but highlight the word with <span> color red if indicate wrong based on the criteria and color green if you want to highlight that candidate doing great
+        - 'feedback' 1-3 sentences, highlighting key words with <strong> if needed and wrapped with <p> HTML tag.
+        - Bullet point like 2 or 7 sentences, highlighting key words with <strong> if needed and wrapped with <p> HTML tag.
+        - Make the 'feedback' short and motivating, written in a style that's friendly for Gen Z learners.
+        - Use a conversational tone (like you're giving advice to a peer).
+        - Use emojis to make it fun and encouraging (e.g., 🔥, 💡, ✨, 🚀).
+        - Don't write same information in 'feedback' and 'points'.
+        - You can mention user answer in the 'feedback' or 'points' (like 'Yo still have 'uh' in your answer') if needed.
+        """
+        self.prompt_cache_key = openai_client_service.prompt_cache_key('chatgpt-evaluation', self.system_prompt)
+
     # MARK: HealthCheck
     def health_check(self):
         return {
@@ -67,6 +111,7 @@ class EvChatGPTService:
             "lexical_prompt": self.lexical_prompt,
             "grammar_prompt": self.grammar_prompt,
             "pronunciation_prompt": self.pronunciation_prompt,
+            "prompt_cache_key": self.prompt_cache_key,
             "timestamp": datetime.datetime.now()
         }
 
@@ -92,6 +137,9 @@ class EvChatGPTService:
         self.grammar_prompt = grammar_prompt if grammar_prompt is not None else self.grammar_prompt
         self.pronunciation_prompt = pronunciation_prompt if pronunciation_prompt is not None else self.pronunciation_prompt
 
+        # Build the evaluation prompt again
+        self._build_prompt()
+
         ev_logger.info(f"Successfully update prompt √")
 
     # MARK: GetPrompt
@@ -107,42 +155,20 @@ class EvChatGPTService:
     # MARK: Evaluate
     def evaluate(self, question: str, answer: str, confidence: str) -> EvChatGPTEvaluationModel:
         try:
-            # Define Client
-            client = OpenAI(
-              api_key = EvIELTSConfig.openai_api_key,
-            )
-            # Define Prompt
-            system_prompt = f"""
-            You are an IELTS Speaking examiner expert that have attention to the detail and precision, evaluate candidate answer based on the question for each evaluation metrics. 
-
-            {self.fluency_prompt}
-
-            {self.lexical_prompt}
-
-            {self.grammar_prompt}
-
-            {self.pronunciation_prompt}
-
-            Provide feedback for each evaluation metrics with
-            - Final IELTS band score from 0.0 to 9.0 (Don't forget use based on IELTS band rules like 6.5, 7.0, 7.5 don't use 6.1, 6.2, 6.3)
-            - 'candidate_answer' Write again the candidate answer but highlight the word with <span> color red if indicate wrong based on the criteria and color green if you want to highlight that candidate doing great
-            - 'feedback' 1-3 sentences, highlighting key words with <strong> if needed and wrapped with <p> HTML tag.
-            - Bullet point like 2 or 7 sentences, highlighting key words with <strong> if needed and wrapped with <p> HTML tag.
-            - Make the 'feedback' short and motivating, written in a style that's friendly for Gen Z learners.
-            - Use a conversational tone (like you're giving advice to a peer).
-            - Use emojis to make it fun and encouraging (e.g., 🔥, 💡, ✨, 🚀).
-            - Don't write same information in 'feedback' and 'points'.
-            - You can mention user answer in the 'feedback' or 'points' (like 'Yo still have 'uh' in your answer') if needed.
-            """
-
+            # Get the pooled Client
+            client = openai_client_service.get_client()
             # Evaluate process
             result = client.responses.parse(
                 model = self.model_name,
-                instructions = system_prompt,
+                instructions = self.system_prompt,
                 input = f"Interviewer question is '{question}' and candidate answer is '{answer}' and confidence is '{confidence}'",
                 text_format = EvChatGPTEvaluationModel,
+                prompt_cache_key = self.prompt_cache_key,
             )
 
+            # Record the token usage
+            openai_client_service.record_usage('chatgpt-evaluation', result)
+
             # Return model
             return result.output_parsed
 
@@ -161,31 +187,20 @@ class EvChatGPTService:
     # MARK: OverallFeedback
     def overall_feedback(self, histories: str) -> EvChatGPTOverallEvaluationModel:
         try:
-            # Define Client
-            client = OpenAI(
-              api_key = EvIELTSConfig.openai_api_key,
-            )
-            # Define Prompt
-            system_prompt = f"""
-            You are an IELTS Speaking examiner expert that have attention to the detail and precision, evaluate overall IELTS speaking simulation of this candidate based on speaking simulation history.
-
-            Provide feedback for each evaluation metrics  and the overall with
-            - Final IELTS band score from 0.0 to 9.0 (Don't forget use based on IELTS band rules like 6.5, 7.0, 7.5 don't use 6.1, 6.2, 6.3)
-            - 'readable_feedback' using HTML tags, make sure to have 2 <p> tags in the 'readable_feedback' and use <strong> to highlight key words.
-            - The first <p> tag is for overall feedback written with 1-2 sentences and the second <p> tag is for tips feedback written with 1 sentences.
-            - Make the 'readable_feedback' short and motivating, written in a style that's friendly for Gen Z learners.
-            - Use a conversational tone (like you're giving advice to a peer).
-            - Use emojis to make it fun and encouraging (e.g., 🔥, 💡, ✨, 🚀).
-            """
-
+            # Get the pooled Client
+            client = openai_client_service.get_client()
             # Evaluate process
             result = client.responses.parse(
                 model = self.model_name,
-                instructions = system_prompt,
+                instructions = self.overall_prompt,
                 input = f"Here is the candidate's speaking simulation history: {histories}",
                 text_format = EvChatGPTOverallEvaluationModel,
+                prompt_cache_key = self.overall_prompt_cache_key,
             )
 
+            # Record the token usage
+            openai_client_service.record_usage('chatgpt-overall', result)
+
             # Return model
             return result.output_parsed
 
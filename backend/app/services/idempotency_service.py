@@ -0,0 +1,220 @@
+# MARK: Import
+# Dependencies
+import time
+import hashlib
+import datetime
+import functools
+import sqlite3
+from flask import jsonify, make_response, request, Response
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.logger import ev_logger
+from app.utils.sqlite import connect_sqlite
+from app.models.response_model import EvResponseModel
+from app.models.response_metadata_model import EvResponseMetadataModel
+
+# MARK: EvIdempotencyService
+class EvIdempotencyService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.store_path = EvIELTSConfig.idempotency_store_path
+        self.ttl_seconds = EvIELTSConfig.idempotency_ttl_seconds
+        self.wait_timeout = EvIELTSConfig.idempotency_wait_timeout
+        self.poll_interval = EvIELTSConfig.idempotency_poll_interval
+        self.replayed_count = 0
+        self.coalesced_count = 0
+
+        # Create the idempotency table
+        with connect_sqlite(self.store_path) as connection:
+            connection.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS idempotency (
+                    key TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    status_code INTEGER,
+                    mimetype TEXT,
+                    body BLOB,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                '''
+            )
+
+    # MARK: HealthCheck
+    def health_check(self):
+        # Count the keys by status
+        with connect_sqlite(self.store_path) as connection:
+            rows = connection.execute('SELECT status, COUNT(*) AS total FROM idempotency GROUP BY status').fetchall()
+
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "keys": {row['status']: row['total'] for row in rows},
+            "replayed_count": self.replayed_count,
+            "coalesced_count": self.coalesced_count,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: MakeKey
+    def _make_key(self) -> str | None:
+        # Only the request with `test_id` is idempotent
+        test_id = request.form.get('test_id', '')
+        if test_id == '':
+            return None
+
+        # The client asked for a fresh result, like the cache of the pipeline
+        if 'no-cache' in request.headers.get('Cache-Control', ''):
+            return None
+
+        # Hash the authorization, so the response of one user is not replayed to another one
+        hasher = hashlib.sha256(request.path.encode('utf-8'))
+        authorization = request.headers.get('Authorization', '')
+        hasher.update(f'{len(authorization)}:{authorization};'.encode('utf-8'))
+
+        # Hash the form fields and the uploaded files
+        for key, value in sorted(request.form.items(multi = True)):
+            hasher.update(f'{len(key)}:{key}={len(value)}:{value};'.encode('utf-8'))
+
+        for key, file in sorted(request.files.items(multi = True), key = lambda item: item[0]):
+            hasher.update(f'{len(key)}:{key};'.encode('utf-8'))
+            while True:
+                chunk = file.stream.read(65536)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+
+            # Rewind the file, so the route can read it again
+            file.stream.seek(0)
+
+        return f'{test_id}:{hasher.hexdigest()}'
+
+    # MARK: Claim
+    def _claim(self, key: str) -> bool:
+        now = time.time()
+
+        with connect_sqlite(self.store_path) as connection:
+            # Delete the expired keys
+            connection.execute('DELETE FROM idempotency WHERE updated_at < ?', (now - self.ttl_seconds,))
+
+            # Take over the pending key of a request that never finished, like a killed worker
+            connection.execute(
+                'DELETE FROM idempotency WHERE key = ? AND status = ? AND updated_at < ?',
+                (key, 'pending', now - self.wait_timeout),
+            )
+
+            try:
+                # Claim the key, only one request can insert it
+                connection.execute(
+                    'INSERT INTO idempotency (key, status, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                    (key, 'pending', now, now),
+                )
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    # MARK: Get
+    def _get(self, key: str):
+        with connect_sqlite(self.store_path) as connection:
+            return connection.execute('SELECT * FROM idempotency WHERE key = ?', (key,)).fetchone()
+
+    # MARK: Complete
+    def _complete(self, key: str, response: Response):
+        with connect_sqlite(self.store_path) as connection:
+            # Only the successful response is replayed, the failed request can be retried
+            if 200 <= response.status_code < 300:
+                connection.execute(
+                    'UPDATE idempotency SET status = ?, status_code = ?, mimetype = ?, body = ?, updated_at = ? WHERE key = ?',
+                    ('done', response.status_code, response.mimetype, response.get_data(), time.time(), key),
+                )
+            else:
+                connection.execute('DELETE FROM idempotency WHERE key = ?', (key,))
+
+    # MARK: Replay
+    def _replay(self, row) -> Response:
+        # Return the stored response
+        response = Response(row['body'], status = row['status_code'], mimetype = row['mimetype'])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+    # MARK: Idempotent
+    def idempotent(self, route):
+        '''
+        Custom decorator to make the route idempotent for the same `test_id` and the
+        same content. The first request run the route, the duplicate request that
+        arrive while it is running wait for its response, and the duplicate request
+        that arrive after it is finished get the stored response. So the retry of the
+        client don't run the pipeline and send the Englishvit callback again.
+
+        Important: The state is saved in SQLite, so the duplicate request is coalesced
+        across the gunicorn workers. Only the successful response is stored, and it is
+        only replayed for the same `Authorization`. The request with `Cache-Control:
+        no-cache` is never replayed.
+
+        Args:
+        - route: function: The Flask route function.
+        '''
+        @functools.wraps(route)
+        def wrapper(*args, **kwargs):
+            try:
+                # Define the idempotency key
+                key = self._make_key()
+            except Exception as error:
+                ev_logger.info(f"Failed to define idempotency key x")
+                ev_logger.info(f"Error: {error}")
+                key = None
+
+            # If the request is not idempotent
+            if key is None:
+                return route(*args, **kwargs)
+
+            deadline = time.time() + self.wait_timeout
+            waiting = False
+            while time.time() < deadline:
+                # If this request is the first one
+                if self._claim(key):
+                    try:
+                        response = make_response(route(*args, **kwargs))
+                    except Exception:
+                        self._complete(key, Response(status = 500))
+                        raise
+
+                    # Save the response for the duplicate request
+                    self._complete(key, response)
+                    return response
+
+                # Wait for the first request
+                row = self._get(key)
+                if row is not None and row['status'] == 'done':
+                    self.replayed_count += 1
+                    ev_logger.info(f"Replay idempotent response of test '{key.split(':', 1)[0]}' √")
+                    return self._replay(row)
+
+                # Count the duplicate request once
+                if not waiting:
+                    waiting = True
+                    self.coalesced_count += 1
+
+                time.sleep(self.poll_interval)
+
+            # Define the response model data
+            response_data = EvResponseModel(
+                metadata = EvResponseMetadataModel(
+                    code = 409,
+                    status = 'Error',
+                    message = 'The same request is still in progress',
+                ),
+                data = {
+                    'message': 'The same request is still in progress',
+                    'information': {},
+                }
+            )
+
+            # Return the error message
+            return jsonify(response_data.model_dump()), 409, {'ContentType' : 'application/json'}
+
+        return wrapper
+
+# MARK: EvIdempotencyServiceInstance
+# Define idempotency service instance
+idempotency_service = EvIdempotencyService()
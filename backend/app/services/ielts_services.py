@@ -2,19 +2,28 @@
 # Dependencies
 import os
 import json
+import time
 import datetime
-from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import current_app
-from silero_vad import load_silero_vad, read_audio, get_speech_timestamps
 
 # Modules
 from config import EvIELTSConfig
 from app.utils.exception import EvException, EvAPIException, EvServerException
 from app.models.chat_gpt_evaluation_model import EvChatGPTEvaluationModel
+from app.models.chat_gpt_evaluation_data_model import EvChatGPTEvaluationDataModel
 from app.models.chat_gpt_overall_evaluation_model import EvChatGPTOverallEvaluationModel
 from app.models.evaluation_model import EvEvaluationModel
 from app.models.response_transcribe_model import EvResponseTranscribeModel
 from app.utils.logger import ev_logger
+from app.services.openai_client_service import openai_client_service
+from app.services.audio_service import audio_service
+from app.services.cache_service import cache_service
+from app.services.vad_service import vad_service
+from app.utils.audio import encode_wav, audio_duration, compress_silence, remap_time, split_on_pauses
+from app.utils.stream import EvJSONMemberParser
+from app.models.audio_buffer_model import EvAudioBufferModel
 
 # Get the JSON directory
 def get_json_dir():
@@ -27,15 +36,33 @@ class EvIELTSService:
         # Properties
         self.chatgpt_feedback_model_name = EvIELTSConfig.chatgpt_feedback_model
         self.chatgpt_whisper_model_name = EvIELTSConfig.chatgpt_whisper_model
-        self.silero_model = None
+        self.transcribe_pipeline = EvIELTSConfig.chatgpt_transcribe_pipeline
+        self.silence_compression = EvIELTSConfig.vad_silence_compression
+        self.max_silence = EvIELTSConfig.vad_max_silence
+        self.chunking = EvIELTSConfig.chunking_enabled
+        self.chunk_max_seconds = EvIELTSConfig.chunk_max_seconds
+        self.chunk_min_audio_seconds = EvIELTSConfig.chunk_min_audio_seconds
+        self.pipeline_workers = EvIELTSConfig.chatgpt_pipeline_workers
+        self.pipeline_executor = None
+        self.pipeline_lock = threading.Lock()
+        self.parallel_evaluation = EvIELTSConfig.chatgpt_parallel_evaluation
+        self.evaluation_workers = EvIELTSConfig.chatgpt_evaluation_workers
+        self.evaluation_executor = None
+        self.evaluation_fallback_count = 0
+        self.lock = threading.Lock()
+        self.evaluation_criteria = {
+            'fluency': 'Fluency and Coherence',
+            'lexical': 'Lexical Resource',
+            'grammar': 'Grammatical Range and Accuracy',
+            'pronunciation': 'Pronunciation',
+        }
         self.user_credit = 2
         self.evaluation_feedback_prompt = ""
         self.overall_feedback_prompt = ""
+        self.evaluation_prompt_cache_key = None
+        self.overall_prompt_cache_key = None
         self.initial_prompt = "I was like, was like, I'm like, you know what I mean, kind of, um, ah, huh, and so, so um, uh, and um, like um, so like, like it's, it's like, i mean, yeah, ok so, uh so, so uh, yeah so, you know, it's uh, uh and, and uh, like, kind"
 
-        # Get prompt
-        self._get_feedback_prompt()
-
     # MARK: GetFeedbackPrompt
     def _get_feedback_prompt(self):
         try:
@@ -43,7 +70,6 @@ class EvIELTSService:
             json_dir = get_json_dir()
             evaluation_path = os.path.join(json_dir, EvIELTSConfig.evaluation_feedback_prompt)
             overall_path = os.path.join(json_dir, EvIELTSConfig.overall_feedback_prompt)
-            self.silero_model = load_silero_vad()
 
             # Read evaluation feedback prompt
             with open(evaluation_path, 'r', encoding='utf-8') as file:
@@ -53,6 +79,10 @@ class EvIELTSService:
             with open(overall_path, 'r', encoding='utf-8') as file:
                 self.overall_feedback_prompt = file.read()
 
+            # Version the static prompts, the question and the answer are only sent after them
+            self.evaluation_prompt_cache_key = openai_client_service.prompt_cache_key('ielts-evaluation', self.evaluation_feedback_prompt)
+            self.overall_prompt_cache_key = openai_client_service.prompt_cache_key('ielts-overall', self.overall_feedback_prompt)
+
             ev_logger.info(f"Successfully update prompt √")
 
         except Exception as error:
@@ -66,7 +96,15 @@ class EvIELTSService:
             "chatgpt_whisper_model_name": self.chatgpt_whisper_model_name,
             "evaluation_feedback_prompt": self.evaluation_feedback_prompt,
             "overall_feedback_prompt": self.overall_feedback_prompt,
+            "evaluation_prompt_cache_key": self.evaluation_prompt_cache_key,
+            "overall_prompt_cache_key": self.overall_prompt_cache_key,
             "initial_prompt": self.initial_prompt,
+            "transcribe_pipeline": self.transcribe_pipeline,
+            "silence_compression": self.silence_compression,
+            "max_silence": self.max_silence,
+            "chunking": self.chunking,
+            "parallel_evaluation": self.parallel_evaluation,
+            "evaluation_fallback_count": self.evaluation_fallback_count,
             "timestamp": datetime.datetime.now()
         }
 
@@ -80,7 +118,7 @@ class EvIELTSService:
         self.chatgpt_feedback_model_name = chatgpt_feedback_model_name if chatgpt_feedback_model_name is not None else self.chatgpt_feedback_model_name
         self.chatgpt_whisper_model_name = chatgpt_whisper_model_name if chatgpt_whisper_model_name is not None else self.chatgpt_whisper_model_name
 
-        ev_logger.info(f"Successfully update model to '{self.model_name}' √")
+        ev_logger.info(f"Successfully update model to '{self.chatgpt_feedback_model_name}' and '{self.chatgpt_whisper_model_name}' √")
 
 
     # MARK: UpdatePrompt
@@ -116,8 +154,88 @@ class EvIELTSService:
             "initial_prompt": self.initial_prompt,
         }
 
+    # MARK: GetEvaluationExecutor
+    def _get_evaluation_executor(self) -> ThreadPoolExecutor:
+        # Start the criteria pool on the first request, so it is created in the worker process
+        with self.pipeline_lock:
+            if self.evaluation_executor is None:
+                self.evaluation_executor = ThreadPoolExecutor(
+                    max_workers = self.evaluation_workers,
+                    thread_name_prefix = 'ev-ielts-evaluation',
+                )
+
+        return self.evaluation_executor
+
+    # MARK: ParseCriterion
+    def _parse_criterion(self, client, input_text: str, criterion: str, operation: str) -> EvChatGPTEvaluationDataModel:
+        # Evaluate one criterion, the static prompt is the same prefix as the single request
+        result = client.responses.parse(
+            model = self.chatgpt_feedback_model_name,
+            instructions = self.evaluation_feedback_prompt,
+            input = f"{input_text}. Only provide the feedback for {self.evaluation_criteria[criterion]}.",
+            text_format = EvChatGPTEvaluationDataModel,
+            prompt_cache_key = self.evaluation_prompt_cache_key,
+        )
+
+        # Record the token usage
+        openai_client_service.record_usage(f"{operation}-{criterion}", result)
+
+        return result.output_parsed
+
+    # MARK: ParseEvaluation
+    def _parse_evaluation(self, client, input_text: str, operation: str) -> EvChatGPTEvaluationModel:
+        '''
+        Custom function to evaluate the answer with the feedback model. In the
+        parallel mode every criterion is evaluated by its own smaller request at the
+        same time, so the output is generated in parallel, and the single request is
+        used again if one of them failed.
+
+        Args:
+        - client: OpenAI: The pooled OpenAI client.
+        - input_text: str: The question and the answer of the candidate.
+        - operation: str: Name of the operation for the token usage.
+
+        Returns:
+        - EvChatGPTEvaluationModel: The evaluation of every criterion.
+        '''
+        if self.parallel_evaluation:
+            futures = {}
+            try:
+                # Evaluate every criterion at the same time
+                executor = self._get_evaluation_executor()
+                futures = {
+                    criterion: executor.submit(self._parse_criterion, client, input_text, criterion, operation)
+                    for criterion in self.evaluation_criteria
+                }
+
+                return EvChatGPTEvaluationModel(**{criterion: future.result() for criterion, future in futures.items()})
+
+            except Exception as error:
+                # Don't start the other criteria, the single request evaluate them again
+                for future in futures.values():
+                    future.cancel()
+
+                with self.lock:
+                    self.evaluation_fallback_count += 1
+                ev_logger.info(f"Failed to evaluate the criteria in parallel, use the single request x")
+                ev_logger.info(f"Error: {error}")
+
+        # Evaluate every criterion in a single request
+        result = client.responses.parse(
+            model = self.chatgpt_feedback_model_name,
+            instructions = self.evaluation_feedback_prompt,
+            input = input_text,
+            text_format = EvChatGPTEvaluationModel,
+            prompt_cache_key = self.evaluation_prompt_cache_key,
+        )
+
+        # Record the token usage
+        openai_client_service.record_usage(operation, result)
+
+        return result.output_parsed
+
     # MARK: Evaluate
-    def evaluate(self, audio_file_path: str, question: str) -> EvEvaluationModel:
+    def evaluate(self, audio_buffer: EvAudioBufferModel, question: str, use_cache: bool = True) -> EvEvaluationModel:
         try:
             # If the feedback model is empty
             if self.chatgpt_feedback_model_name is None:
@@ -150,13 +268,25 @@ class EvIELTSService:
                     # Get prompt
                     self._get_feedback_prompt()
 
-            # Define Chat GPT client
-            client = OpenAI(
-                api_key = EvIELTSConfig.openai_api_key,
+            # Get the cached evaluation of the same audio, question, models and prompts
+            cache_key = cache_service.make_key(
+                'evaluate',
+                audio_buffer.samples,
+                question,
+                self.chatgpt_feedback_model_name,
+                self.chatgpt_whisper_model_name,
+                self.evaluation_feedback_prompt,
+                self.initial_prompt,
             )
+            cached = cache_service.get(cache_key) if use_cache else None
+            if cached is not None:
+                return EvEvaluationModel(**cached)
+
+            # Get the pooled Chat GPT client
+            client = openai_client_service.get_client()
 
-            # Open audio file
-            audio_file = open(audio_file_path, "rb")
+            # Define in memory audio file
+            audio_file = (f"audio.{EvIELTSConfig.audio_clean_extension}", encode_wav(audio_buffer), "audio/wav")
 
             # Transcribe
             transcript = client.audio.transcriptions.create(
@@ -182,30 +312,35 @@ class EvIELTSService:
                 })
 
             # Evaluate process
-            result = client.responses.parse(
-                model = self.chatgpt_feedback_model_name,
-                instructions = self.evaluation_feedback_prompt,
-                input = f"Interviewer question is '{question}' and candidate answer is '{transcript_text}'",
-                text_format = EvChatGPTEvaluationModel,
+            evaluation = self._parse_evaluation(
+                client,
+                f"Interviewer question is '{question}' and candidate answer is '{transcript_text}'",
+                'ielts-evaluate',
             )
 
-            # Return evaluation data
-            return EvEvaluationModel(
-                evaluation = result.output_parsed,
+            # Define evaluation data
+            evaluation_data = EvEvaluationModel(
+                evaluation = evaluation,
                 transcript = transcript_text,
                 word_timestamp = json.dumps(word_timestamps),
             )
 
+            # Cache the evaluation data
+            cache_service.set(cache_key, evaluation_data.model_dump())
+
+            # Return evaluation data
+            return evaluation_data
+
         except EvException as error:
             # If the error is EvException
             raise error
 
         except Exception as error:
-            ev_logger.info(f"Failed to evaluate '{audio_file_path}' x")
+            ev_logger.info(f"Failed to evaluate audio with duration '{audio_duration(audio_buffer)}' seconds x")
 
             # If something went wrong
             raise EvAPIException(
-                message = f"Failed to evaluate '{audio_file_path}'",
+                message = f"Failed to evaluate audio with duration '{audio_duration(audio_buffer)}' seconds",
             )
 
     # MARK: OverallFeedback
@@ -231,10 +366,8 @@ class EvIELTSService:
                     # Get prompt
                     self._get_feedback_prompt()
 
-            # Define Chat GPT client
-            client = OpenAI(
-                api_key = EvIELTSConfig.openai_api_key,
-            )
+            # Get the pooled Chat GPT client
+            client = openai_client_service.get_client()
 
             # Evaluate process
             result = client.responses.parse(
@@ -242,8 +375,12 @@ class EvIELTSService:
                 instructions = self.overall_feedback_prompt,
                 input = f"Here is the candidate's speaking simulation history: {histories}",
                 text_format = EvChatGPTOverallEvaluationModel,
+                prompt_cache_key = self.overall_prompt_cache_key,
             )
 
+            # Record the token usage
+            openai_client_service.record_usage('ielts-overall', result)
+
             # Return evaluation data
             return result.output_parsed
 
@@ -259,37 +396,178 @@ class EvIELTSService:
                 message = f"Failed to overall feedback",
             )
 
-    # MARK: Transcribe
-    def transcribe(self, audio_file_path: str) -> EvResponseTranscribeModel:
-        try:
-            # If the whisper model is empty
-            if self.chatgpt_whisper_model_name is None:
+    # MARK: CheckWhisperModel
+    def _check_whisper_model(self):
+        # If the whisper model is empty
+        if self.chatgpt_whisper_model_name is None:
+            raise EvServerException(
+                message = f"Failed evaluate because whisper model is empty",
+            )
+        else:
+            if self.chatgpt_whisper_model_name == "":
                 raise EvServerException(
                     message = f"Failed evaluate because whisper model is empty",
                 )
-            else:
-                if self.chatgpt_whisper_model_name == "":
-                    raise EvServerException(
-                        message = f"Failed evaluate because whisper model is empty",
-                    )
-                
-            # If silero model is not loaded
-            if self.silero_model is None:
-                # Load silero model
-                self.silero_model = load_silero_vad()
-
-            # Define Chat GPT client
-            client = OpenAI(
-                api_key = EvIELTSConfig.openai_api_key,
+
+    # MARK: DetectSpeech
+    def _detect_speech(self, audio_buffer: EvAudioBufferModel) -> list:
+        # VAD process on the decoded audio
+        return vad_service.detect_speech(audio_buffer)
+
+    # MARK: CreateTranscription
+    def _create_transcription(self, audio_file: tuple) -> EvResponseTranscribeModel:
+        # Get the pooled Chat GPT client
+        client = openai_client_service.get_client()
+
+        # Transcribe
+        transcript = client.audio.transcriptions.create(
+            file = audio_file,
+            model = self.chatgpt_whisper_model_name,
+            language = "en",
+            prompt = self.initial_prompt,
+            response_format = "verbose_json",
+            temperature = 0.0,
+            timestamp_granularities = ["word"],
+        )
+
+        # Get word timestamps
+        word_timestamps = []
+        for word in transcript.words:
+            word_timestamps.append({
+                "word": word.word,
+                "start": word.start,
+                "end": word.end,
+            })
+
+        # Return transcribe data
+        return EvResponseTranscribeModel(
+            transcribe = transcript.text,
+            word_timestamp = json.dumps(word_timestamps),
+        )
+
+    # MARK: TranscribeSpeech
+    def _transcribe_speech(self, audio_buffer: EvAudioBufferModel, speech_timestamps: list) -> EvResponseTranscribeModel:
+        # If no speech detected, like the silent part of the long answer
+        if not speech_timestamps:
+            return EvResponseTranscribeModel(
+                transcribe = "",
+                word_timestamp = json.dumps([]),
             )
 
-            # VAD process
-            wav = read_audio(audio_file_path)
-            speech_timestamps = get_speech_timestamps(
-                wav,
-                self.silero_model,
-                return_seconds=True,
+        if not self.silence_compression:
+            # Define in memory audio file
+            audio_file = (f"audio.{EvIELTSConfig.audio_clean_extension}", encode_wav(audio_buffer), "audio/wav")
+
+            # Transcribe
+            return self._create_transcription(audio_file)
+
+        # Shorten the long silence before the upload
+        compressed_buffer, timeline = compress_silence(audio_buffer, speech_timestamps, self.max_silence)
+
+        ev_logger.info(f"Compress silence from '{audio_duration(audio_buffer):.2f}' to '{audio_duration(compressed_buffer):.2f}' seconds √")
+
+        # Define in memory audio file
+        audio_file = (f"audio.{EvIELTSConfig.audio_clean_extension}", encode_wav(compressed_buffer), "audio/wav")
+
+        # Transcribe
+        transcribe_data = self._create_transcription(audio_file)
+
+        # Move the word timestamps back to the original audio
+        word_timestamps = json.loads(transcribe_data.word_timestamp)
+        for word in word_timestamps:
+            word['start'] = remap_time(word['start'], timeline)
+            word['end'] = remap_time(word['end'], timeline)
+        transcribe_data.word_timestamp = json.dumps(word_timestamps)
+
+        return transcribe_data
+
+    # MARK: TranscribeChunked
+    def _transcribe_chunked(self, audio_buffer: EvAudioBufferModel, speech_timestamps: list) -> EvResponseTranscribeModel:
+        '''
+        Custom function to transcribe the long answer in parts. The audio is cut on
+        the VAD pauses into parts not longer than `EvIELTSConfig.chunk_max_seconds`,
+        the parts are uploaded at the same time, then the text and the word
+        timestamps are joined on the timeline of the whole audio.
+
+        Args:
+        - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+        - speech_timestamps: list: VAD speech timestamps of the whole audio in seconds.
+
+        Returns:
+        - EvResponseTranscribeModel: Transcribe data of the whole audio.
+        '''
+        sample_rate = float(audio_buffer.sample_rate)
+        parts = split_on_pauses(audio_buffer, speech_timestamps, self.chunk_max_seconds)
+
+        # Transcribe every part at the same time
+        executor = self._get_pipeline_executor()
+        futures = []
+        for start, end in parts:
+            # Define the speech of the part on the timeline of the part
+            part_speech_timestamps = [
+                {
+                    'start': max(speech['start'], start / sample_rate) - start / sample_rate,
+                    'end': min(speech['end'], end / sample_rate) - start / sample_rate,
+                }
+                for speech in speech_timestamps
+                if speech['end'] > start / sample_rate and speech['start'] < end / sample_rate
+            ]
+
+            futures.append(executor.submit(
+                self._transcribe_speech,
+                EvAudioBufferModel(samples = audio_buffer.samples[start:end], sample_rate = audio_buffer.sample_rate),
+                part_speech_timestamps,
+            ))
+
+        try:
+            # Join the parts, move the word timestamps to the timeline of the whole audio
+            texts = []
+            word_timestamps = []
+            for future, (start, _) in zip(futures, parts):
+                transcribe_data = future.result()
+                if transcribe_data.transcribe.strip() != "":
+                    texts.append(transcribe_data.transcribe.strip())
+
+                for word in json.loads(transcribe_data.word_timestamp):
+                    word['start'] = round(word['start'] + start / sample_rate, 3)
+                    word['end'] = round(word['end'] + start / sample_rate, 3)
+                    word_timestamps.append(word)
+
+        except Exception:
+            # Don't upload the rest of the failed audio
+            for future in futures:
+                future.cancel()
+            raise
+
+        ev_logger.info(f"Successfully transcribe '{audio_duration(audio_buffer):.2f}' seconds audio in '{len(parts)}' parts √")
+
+        # Return transcribe data
+        return EvResponseTranscribeModel(
+            transcribe = " ".join(texts),
+            word_timestamp = json.dumps(word_timestamps),
+        )
+
+    # MARK: Transcribe
+    def transcribe(self, audio_buffer: EvAudioBufferModel, use_cache: bool = True) -> EvResponseTranscribeModel:
+        try:
+            # Check the whisper model
+            self._check_whisper_model()
+
+            # Get the cached transcription of the same audio, model and prompt
+            cache_key = cache_service.make_key(
+                'transcribe',
+                audio_buffer.samples,
+                self.chatgpt_whisper_model_name,
+                self.initial_prompt,
+                self.max_silence if self.silence_compression else None,
+                self.chunk_max_seconds if self.chunking else None,
             )
+            cached = cache_service.get(cache_key) if use_cache else None
+            if cached is not None:
+                return EvResponseTranscribeModel(**cached)
+
+            # VAD process
+            speech_timestamps = self._detect_speech(audio_buffer)
 
             # If no speech detected
             if not speech_timestamps:
@@ -299,52 +577,180 @@ class EvIELTSService:
                     word_timestamp = json.dumps([]),
                 )
             else:
-                # Open audio file
-                audio_file = open(audio_file_path, "rb")
-
-                # Transcribe
-                transcript = client.audio.transcriptions.create(
-                    file = audio_file,
-                    model = self.chatgpt_whisper_model_name,
-                    language = "en",
-                    prompt = self.initial_prompt,
-                    response_format = "verbose_json",
-                    temperature = 0.0,
-                    timestamp_granularities = ["word"],
+                if self.chunking and audio_duration(audio_buffer) > self.chunk_min_audio_seconds:
+                    # Transcribe the parts of the long answer in parallel
+                    transcribe_data = self._transcribe_chunked(audio_buffer, speech_timestamps)
+                else:
+                    # Transcribe
+                    transcribe_data = self._transcribe_speech(audio_buffer, speech_timestamps)
+
+                # Cache the transcribe data
+                cache_service.set(cache_key, transcribe_data.model_dump())
+
+                # Return transcribe data
+                return transcribe_data
+
+        except EvException as error:
+            # If the error is EvException
+            raise error
+
+        except Exception as error:
+            ev_logger.info(f"Failed to transcribe audio with duration '{audio_duration(audio_buffer)}' seconds x")
+
+            # If something went wrong
+            raise EvAPIException(
+                message = f"Failed to transcribe audio with duration '{audio_duration(audio_buffer)}' seconds",
+            )
+
+    # MARK: GetPipelineExecutor
+    def _get_pipeline_executor(self) -> ThreadPoolExecutor:
+        # Start the upload pool on the first request, so it is created in the worker process
+        with self.pipeline_lock:
+            if self.pipeline_executor is None:
+                self.pipeline_executor = ThreadPoolExecutor(
+                    max_workers = self.pipeline_workers,
+                    thread_name_prefix = 'ev-ielts-pipeline',
                 )
 
-                # Get transcribe text
-                transcript_text = transcript.text
+        return self.pipeline_executor
+
+    # MARK: TimedTranscription
+    def _timed_transcription(self, audio_file: tuple) -> tuple[EvResponseTranscribeModel, float]:
+        # Transcribe and measure the upload stage
+        start = time.perf_counter()
+        transcribe_data = self._create_transcription(audio_file)
+        return transcribe_data, time.perf_counter() - start
+
+    # MARK: TranscribePipelined
+    def transcribe_pipelined(self, audio_data: bytes, audio_extension: str, use_cache: bool = True) -> tuple[EvResponseTranscribeModel, EvAudioBufferModel]:
+        '''
+        Custom function to transcribe the uploaded audio with the stages overlapped.
+        The original upload is sent to the OpenAI transcription speculatively, while
+        the audio is decoded and checked with VAD in the request thread. If VAD find
+        no speech the transcription is discarded, if the speculative upload failed
+        the clean wav is uploaded instead. Each stage is timed and logged.
+
+        Important: The speculative upload is cancelled on every error, but the cancel
+        only work while it is still waiting in the pipeline executor. Once the upload
+        is started, the OpenAI transcription is paid even if it is discarded.
+
+        Args:
+        - audio_data: bytes: Content of the uploaded audio file.
+        - audio_extension: str: Extension of the uploaded audio file.
+        - use_cache: bool: Use the cached transcription of the same upload.
+
+        Returns:
+        - tuple[EvResponseTranscribeModel, EvAudioBufferModel]: Transcribe data and the
+        normalized audio buffer, used for the callback.
+        '''
+        # The speculative upload send the original audio, compress or split it after the VAD instead
+        if self.silence_compression or self.chunking:
+            audio_buffer = audio_service.decode(
+                audio_data = audio_data,
+                audio_extension = audio_extension,
+            )
+            return self.transcribe(audio_buffer, use_cache = use_cache), audio_buffer
+
+        # Check the whisper model
+        self._check_whisper_model()
+
+        # Get the cached transcription of the same upload, only the decode is needed for the callback
+        cache_key = cache_service.make_key(
+            'transcribe',
+            audio_data,
+            self.chatgpt_whisper_model_name,
+            self.initial_prompt,
+        )
+        cached = cache_service.get(cache_key) if use_cache else None
+        if cached is not None:
+            audio_buffer = audio_service.decode(
+                audio_data = audio_data,
+                audio_extension = audio_extension,
+            )
+            return EvResponseTranscribeModel(**cached), audio_buffer
 
-                # Get word timestamps
-                word_timestamps = []
-                for word in transcript.words:
-                    word_timestamps.append({
-                        "word": word.word,
-                        "start": word.start,
-                        "end": word.end,
-                    })
+        # Start the speculative upload of the original audio
+        start = time.perf_counter()
+        content_types = {'wav': 'audio/wav', 'mp3': 'audio/mpeg', 'm4a': 'audio/mp4'}
+        future = self._get_pipeline_executor().submit(
+            self._timed_transcription,
+            (f"audio.{audio_extension}", audio_data, content_types.get(audio_extension, 'application/octet-stream')),
+        )
+        audio_buffer = None
 
-                # Return transcribe data
-                return EvResponseTranscribeModel(
-                    transcribe = transcript_text,
-                    word_timestamp = json.dumps(word_timestamps),
+        try:
+            # Decode the audio while uploading
+            audio_buffer = audio_service.decode(
+                audio_data = audio_data,
+                audio_extension = audio_extension,
+            )
+            decode_time = time.perf_counter() - start
+
+            # VAD process while uploading
+            speech_timestamps = self._detect_speech(audio_buffer)
+            vad_time = time.perf_counter() - start - decode_time
+
+            # If no speech detected, discard the speculative upload
+            if not speech_timestamps:
+                if not future.cancel():
+                    ev_logger.info("Speculative transcription already started, its cost is spent x")
+                ev_logger.info(f"Pipeline transcribe found no speech, discard transcription, decode {decode_time * 1000:.0f} ms, vad {vad_time * 1000:.0f} ms")
+
+                # Define transcribe data
+                transcribe_data = EvResponseTranscribeModel(
+                    transcribe = "",
+                    word_timestamp = json.dumps([]),
                 )
 
+                # Cache the transcribe data
+                cache_service.set(cache_key, transcribe_data.model_dump())
+
+                # Return transcribe data
+                return transcribe_data, audio_buffer
+
+            try:
+                # Wait for the speculative upload
+                transcribe_data, transcription_time = future.result()
+
+            except Exception as error:
+                ev_logger.info(f"Failed to transcribe original '{audio_extension}' audio, fallback to clean wav x")
+                ev_logger.info(f"Error: {error}")
+
+                # Upload the clean wav instead
+                audio_file = (f"audio.{EvIELTSConfig.audio_clean_extension}", encode_wav(audio_buffer), "audio/wav")
+                transcribe_data, transcription_time = self._timed_transcription(audio_file)
+
+            # Cache the transcribe data
+            cache_service.set(cache_key, transcribe_data.model_dump())
+
+            ev_logger.info(f"Pipeline transcribe decode {decode_time * 1000:.0f} ms, vad {vad_time * 1000:.0f} ms, transcription {transcription_time * 1000:.0f} ms, total {(time.perf_counter() - start) * 1000:.0f} ms √")
+
+            # Return transcribe data
+            return transcribe_data, audio_buffer
+
         except EvException as error:
+            # Discard the speculative upload
+            future.cancel()
+
             # If the error is EvException
             raise error
 
         except Exception as error:
-            ev_logger.info(f"Failed to transcribe '{audio_file_path}' x")
+            # Discard the speculative upload
+            future.cancel()
+
+            # The audio may fail before it is decoded
+            duration = audio_duration(audio_buffer) if audio_buffer is not None else 0
+            ev_logger.info(f"Failed to transcribe audio with duration '{duration}' seconds x")
+            ev_logger.info(f"Error: {error}")
 
             # If something went wrong
             raise EvAPIException(
-                message = f"Failed to transcribe '{audio_file_path}'",
+                message = f"Failed to transcribe audio with duration '{duration}' seconds",
             )
-        
+
     # MARK: Evaluation
-    def evaluation(self, answer: str, question: str) -> EvChatGPTEvaluationModel:
+    def evaluation(self, answer: str, question: str, use_cache: bool = True) -> EvChatGPTEvaluationModel:
         try:
             # If the feedback model is empty
             if self.chatgpt_feedback_model_name is None:
@@ -366,21 +772,33 @@ class EvIELTSService:
                     # Get prompt
                     self._get_feedback_prompt()
 
-            # Define Chat GPT client
-            client = OpenAI(
-                api_key = EvIELTSConfig.openai_api_key,
+            # Get the cached evaluation of the same answer, question, model and prompt
+            cache_key = cache_service.make_key(
+                'evaluation',
+                answer,
+                question,
+                self.chatgpt_feedback_model_name,
+                self.evaluation_feedback_prompt,
             )
+            cached = cache_service.get(cache_key) if use_cache else None
+            if cached is not None:
+                return EvChatGPTEvaluationModel(**cached)
+
+            # Get the pooled Chat GPT client
+            client = openai_client_service.get_client()
 
             # Evaluate process
-            result = client.responses.parse(
-                model = self.chatgpt_feedback_model_name,
-                instructions = self.evaluation_feedback_prompt,
-                input = f"Interviewer question is '{question}' and candidate answer is '{answer}'",
-                text_format = EvChatGPTEvaluationModel,
+            evaluation = self._parse_evaluation(
+                client,
+                f"Interviewer question is '{question}' and candidate answer is '{answer}'",
+                'ielts-evaluation',
             )
 
+            # Cache the evaluation data
+            cache_service.set(cache_key, evaluation.model_dump())
+
             # Return evaluation data
-            return result.output_parsed
+            return evaluation
 
         except EvException as error:
             # If the error is EvException
@@ -394,6 +812,120 @@ class EvIELTSService:
                 message = f"Failed to evaluation",
             )
         
+    # MARK: StreamEvaluation
+    def stream_evaluation(self, answer: str, question: str, use_cache: bool = True):
+        '''
+        Custom function to evaluate the answer and yield every criterion as soon as
+        it is completed. The structured output is streamed and parsed while it is
+        generated, or in the parallel mode every criterion is yielded when its own
+        request is finished. The full evaluation is cached like `evaluation`.
+
+        Args:
+        - answer: str: The answer of the candidate.
+        - question: str: The question of the interviewer.
+        - use_cache: bool: Use the cached evaluation of the same answer.
+
+        Returns:
+        - Iterator: The completed criteria as `(criterion, EvChatGPTEvaluationDataModel)`.
+        '''
+        # If the feedback model is empty
+        if self.chatgpt_feedback_model_name is None or self.chatgpt_feedback_model_name == "":
+            raise EvServerException(
+                message = f"Failed evaluate because feedback model is empty",
+            )
+
+        # If the evaluation prompt is empty
+        if self.evaluation_feedback_prompt is None or self.evaluation_feedback_prompt == "":
+            # Get prompt
+            self._get_feedback_prompt()
+
+        # Get the cached evaluation, the key is the same as `evaluation`
+        cache_key = cache_service.make_key(
+            'evaluation',
+            answer,
+            question,
+            self.chatgpt_feedback_model_name,
+            self.evaluation_feedback_prompt,
+        )
+        cached = cache_service.get(cache_key) if use_cache else None
+        if cached is not None:
+            for criterion, data in EvChatGPTEvaluationModel(**cached):
+                yield criterion, data
+            return
+
+        # Get the pooled Chat GPT client
+        client = openai_client_service.get_client()
+        input_text = f"Interviewer question is '{question}' and candidate answer is '{answer}'"
+        results = {}
+
+        try:
+            if self.parallel_evaluation:
+                futures = {}
+                try:
+                    # Evaluate every criterion at the same time and yield them in the finish order
+                    executor = self._get_evaluation_executor()
+                    futures = {
+                        executor.submit(self._parse_criterion, client, input_text, criterion, 'ielts-stream-evaluation'): criterion
+                        for criterion in self.evaluation_criteria
+                    }
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                        yield futures[future], results[futures[future]]
+
+                except Exception as error:
+                    # The other criteria are ignored, the single request evaluate them again
+                    with self.lock:
+                        self.evaluation_fallback_count += 1
+                    ev_logger.info(f"Failed to stream the criteria in parallel, use the single request x")
+                    ev_logger.info(f"Error: {error}")
+
+                finally:
+                    # Don't start the other criteria of the failed or closed stream, like the disconnected client
+                    for future in futures:
+                        future.cancel()
+
+            if len(results) < len(self.evaluation_criteria):
+                # Stream the structured output and parse every completed criterion
+                parser = EvJSONMemberParser()
+                with client.responses.stream(
+                    model = self.chatgpt_feedback_model_name,
+                    instructions = self.evaluation_feedback_prompt,
+                    input = input_text,
+                    text_format = EvChatGPTEvaluationModel,
+                    prompt_cache_key = self.evaluation_prompt_cache_key,
+                ) as stream:
+                    for event in stream:
+                        if event.type != 'response.output_text.delta':
+                            continue
+
+                        for criterion, value in parser.feed(event.delta):
+                            # Skip the criterion already yielded by the parallel mode
+                            if criterion not in self.evaluation_criteria or criterion in results:
+                                continue
+
+                            results[criterion] = EvChatGPTEvaluationDataModel(**value)
+                            yield criterion, results[criterion]
+
+                    # Record the token usage
+                    openai_client_service.record_usage('ielts-stream-evaluation', stream.get_final_response())
+
+            # Cache the evaluation data
+            evaluation = EvChatGPTEvaluationModel(**results)
+            cache_service.set(cache_key, evaluation.model_dump())
+
+        except EvException as error:
+            # If the error is EvException
+            raise error
+
+        except Exception as error:
+            ev_logger.info(f"Failed to stream evaluation x")
+            ev_logger.info(f"Error: {error}")
+
+            # If something went wrong
+            raise EvAPIException(
+                message = f"Failed to stream evaluation",
+            )
+
 # MARK: EvIELTSServiceInstance
 # Define Ev IELTS Service instance
 ielts_service = EvIELTSService()
\ No newline at end of file
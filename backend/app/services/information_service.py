@@ -0,0 +1,159 @@
+# MARK: Import
+# Dependencies
+import os
+import json
+import hashlib
+import datetime
+import threading
+from flask import jsonify, request, Response
+
+# Modules
+from app.utils.exception import EvServerException
+from app.utils.file import write_atomic
+from app.utils.logger import ev_logger
+from app.models.response_model import EvResponseModel
+from app.models.response_metadata_model import EvResponseMetadataModel
+
+# MARK: EvInformationService
+class EvInformationService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.cache = {}
+        self.versions = {}
+        self.hit_count = 0
+        self.miss_count = 0
+        self.not_modified_count = 0
+        self.lock = threading.Lock()
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "files": {os.path.basename(file_path): entry['etag'] for file_path, entry in self.cache.items()},
+            "versions": self.versions,
+            "hit_count": self.hit_count,
+            "miss_count": self.miss_count,
+            "not_modified_count": self.not_modified_count,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: Load
+    def _load(self, file_path: str, file_stat: os.stat_result) -> dict:
+        # Read the file
+        with open(file_path, 'r') as file:
+            data = json.load(file)
+
+        # Define the response model data
+        response_data = EvResponseModel(
+            metadata = EvResponseMetadataModel(
+                code = 200,
+                status = 'Success',
+                message = 'Information retrieved successfully',
+            ),
+            data = {
+                'information': data,
+            }
+        )
+
+        # Serialize the response once
+        body = jsonify(response_data.model_dump()).get_data()
+
+        return {
+            'mtime_ns': file_stat.st_mtime_ns,
+            'size': file_stat.st_size,
+            'body': body,
+            'etag': hashlib.sha1(body).hexdigest(),
+        }
+
+    # MARK: Get
+    def _get(self, file_path: str) -> dict:
+        # Check if the file exists
+        if not os.path.exists(file_path):
+            raise EvServerException(
+                message = "File not found",
+            )
+
+        # Use the cache if the file is not changed
+        file_stat = os.stat(file_path)
+        entry = self.cache.get(file_path)
+        if entry is not None and entry['mtime_ns'] == file_stat.st_mtime_ns and entry['size'] == file_stat.st_size:
+            with self.lock:
+                self.hit_count += 1
+            return entry
+
+        # Read the file again
+        entry = self._load(file_path, file_stat)
+        with self.lock:
+            self.cache[file_path] = entry
+            self.miss_count += 1
+
+        ev_logger.info(f"Successfully cache information '{os.path.basename(file_path)}' √")
+
+        return entry
+
+    # MARK: Response
+    def response(self, file_path: str) -> Response:
+        '''
+        Custom function to return the information file as the response. The parsed
+        and serialized response is cached until the file is changed, and the client
+        with the same `If-None-Match` get `304 Not Modified` without the body.
+
+        Args:
+        - file_path: str: Path to the information JSON file.
+
+        Returns:
+        - Response: The information response.
+        '''
+        entry = self._get(file_path)
+
+        # If the client already have the same information
+        if entry['etag'] in request.if_none_match:
+            with self.lock:
+                self.not_modified_count += 1
+            response = Response(status = 304)
+        else:
+            response = Response(entry['body'], status = 200, mimetype = 'application/json')
+
+        # Ask the client to check the ETag every time
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['ContentType'] = 'application/json'
+        return response
+
+    # MARK: Write
+    def write(self, file_path: str, data) -> int:
+        '''
+        Custom function to update the information file. The file is replaced
+        atomically, so the reader never see a partial file, then the version of the
+        file is increased in the shared settings, so every worker drop the cache.
+
+        Args:
+        - file_path: str: Path to the information JSON file.
+        - data: Any: The new JSON data.
+
+        Returns:
+        - int: The new version of the information file.
+        '''
+        # Import here, the settings service apply the version to this service
+        from app.services.settings_service import settings_service
+
+        # Replace the file
+        write_atomic(file_path, json.dumps(data, indent = 4))
+
+        # Increase the version atomically, the settings watcher invalidate the cache of the other workers
+        file_name = os.path.basename(file_path)
+        return settings_service.increment(f'information:{file_name}')
+
+    # MARK: Invalidate
+    def invalidate(self, file_name: str, version: int = None):
+        # Remove the cached information of the file
+        with self.lock:
+            for file_path in [file_path for file_path in self.cache if os.path.basename(file_path) == file_name]:
+                self.cache.pop(file_path, None)
+
+            if version is not None:
+                self.versions[file_name] = version
+
+# MARK: EvInformationServiceInstance
+# Define information service instance
+information_service = EvInformationService()
@@ -0,0 +1,359 @@
+# MARK: Import
+# Dependencies
+import json
+import time
+import uuid
+import socket
+import datetime
+import ipaddress
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvException, EvClientException, EvServiceUnavailableException
+from app.utils.logger import ev_logger
+from app.utils.sqlite import connect_sqlite
+from app.models.job_model import EvJobModel
+
+# MARK: EvPinnedHostAdapter
+class EvPinnedHostAdapter(HTTPAdapter):
+    '''
+    Custom adapter for the request sent to the validated address instead of the
+    host. The TLS still use the host for the SNI and the certificate check.
+
+    Args:
+    - hostname: str: The host of the original URL.
+    '''
+    # MARK: Properties
+    def __init__(self, hostname: str, **kwargs):
+        # The parent constructor create the pool manager, so the host must be set before
+        self.hostname = hostname
+        super().__init__(**kwargs)
+
+    # MARK: InitPoolManager
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['server_hostname'] = self.hostname
+        kwargs['assert_hostname'] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+# MARK: EvJobService
+class EvJobService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.store_path = EvIELTSConfig.job_store_path
+        self.workers = EvIELTSConfig.job_workers
+        self.ttl_seconds = EvIELTSConfig.job_ttl_seconds
+        self.callback_timeout = EvIELTSConfig.job_callback_timeout
+        self.callback_allowed_hosts = EvIELTSConfig.job_callback_allowed_hosts
+        self.queue_size = EvIELTSConfig.job_queue_size
+        self.executor = None
+        self.pending_count = 0
+        self.lock = threading.Lock()
+
+        # Create the job table
+        with connect_sqlite(self.store_path) as connection:
+            connection.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    callback_url TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                '''
+            )
+
+    # MARK: HealthCheck
+    def health_check(self):
+        # Count the jobs by status
+        with connect_sqlite(self.store_path) as connection:
+            rows = connection.execute('SELECT status, COUNT(*) AS total FROM jobs GROUP BY status').fetchall()
+
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending_count": self.pending_count,
+            "jobs": {row['status']: row['total'] for row in rows},
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: GetExecutor
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Start the worker pool on the first job, so it is created in the worker process
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers = self.workers,
+                    thread_name_prefix = 'ev-job-worker',
+                )
+
+        return self.executor
+
+    # MARK: UpdateJob
+    def _update_job(self, job_id: str, status: str, current_status: str, result: dict = None, error: dict = None) -> bool:
+        '''
+        Custom function to move the job from `current_status` to `status`. The job
+        in another status is not changed, so the job failed by `fail_stale_jobs` is
+        not overwritten by its worker.
+
+        Args:
+        - job_id: str: The job ID.
+        - status: str: The new status.
+        - current_status: str: The status the job must have.
+        - result: dict: The result of the finished job.
+        - error: dict: The error of the failed job.
+
+        Returns:
+        - bool: True if the job is updated.
+        '''
+        with connect_sqlite(self.store_path) as connection:
+            cursor = connection.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ? AND status = ?',
+                (
+                    status,
+                    json.dumps(result, default = str) if result is not None else None,
+                    json.dumps(error, default = str) if error is not None else None,
+                    time.time(),
+                    job_id,
+                    current_status,
+                ),
+            )
+
+        return cursor.rowcount > 0
+
+    # MARK: CleanJobs
+    def _clean_jobs(self):
+        # Delete the expired jobs
+        with connect_sqlite(self.store_path) as connection:
+            connection.execute(
+                'DELETE FROM jobs WHERE updated_at < ?',
+                (time.time() - self.ttl_seconds,),
+            )
+
+    # MARK: FailStaleJobs
+    def fail_stale_jobs(self):
+        '''
+        Custom function to mark the jobs left pending or running by the stopped server
+        as failed, so the client polling them don't wait forever. It must run once
+        before the workers start, like in the gunicorn `on_starting` hook, because the
+        running jobs of the other workers look the same.
+        '''
+        with connect_sqlite(self.store_path) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE status IN ('pending', 'running')",
+                (
+                    json.dumps({
+                        'code': 500,
+                        'message': 'Internal server error',
+                        'information': 'The server was restarted before the job finished',
+                    }),
+                    time.time(),
+                ),
+            )
+
+        if cursor.rowcount:
+            ev_logger.info(f"Mark '{cursor.rowcount}' stale jobs as failed √")
+
+    # MARK: ValidateCallbackURL
+    def validate_callback_url(self, callback_url: str):
+        '''
+        Custom function to check the callback URL before the job is sent to it. The
+        host must be in `EvIELTSConfig.job_callback_allowed_hosts`, and every address
+        it resolve to must be public, so the callback can't reach the internal network.
+
+        Args:
+        - callback_url: str: The callback URL of the job.
+
+        Returns:
+        - str: The checked address, the callback must be sent to it.
+        '''
+        url = urlparse(callback_url)
+
+        # Check the scheme and the host
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise EvClientException(
+                message = 'Invalid callback_url, only http and https are allowed',
+            )
+
+        if url.hostname.lower() not in self.callback_allowed_hosts:
+            raise EvClientException(
+                message = f"Invalid callback_url, host '{url.hostname}' is not allowed",
+            )
+
+        # Check every resolved address
+        try:
+            addresses = socket.getaddrinfo(url.hostname, url.port or (443 if url.scheme == 'https' else 80), proto = socket.IPPROTO_TCP)
+        except socket.gaierror:
+            raise EvClientException(
+                message = f"Invalid callback_url, host '{url.hostname}' can't be resolved",
+            )
+
+        for address in addresses:
+            ip = ipaddress.ip_address(address[4][0].split('%')[0])
+            if not ip.is_global or ip.is_multicast:
+                raise EvClientException(
+                    message = f"Invalid callback_url, host '{url.hostname}' resolve to a private address",
+                )
+
+        return addresses[0][4][0].split('%')[0]
+
+    # MARK: SendCallback
+    def _send_callback(self, job_id: str, callback_url: str):
+        try:
+            # Check the callback URL again, the DNS may be changed after the submit
+            address = self.validate_callback_url(callback_url)
+
+            # Get the finished job
+            job = self.get(job_id)
+
+            # Connect to the checked address, so the DNS can't change between the check and the request
+            url = urlparse(callback_url)
+            host = url.netloc.rsplit('@', 1)[-1]
+            pinned_host = f"[{address}]" if ':' in address else address
+            pinned_url = url._replace(netloc = f"{pinned_host}:{url.port}" if url.port else pinned_host).geturl()
+
+            # Send the job to the callback URL, without following the redirect to another host
+            with requests.Session() as session:
+                session.mount('https://', EvPinnedHostAdapter(url.hostname))
+                session.post(
+                    pinned_url,
+                    data = job.model_dump_json(),
+                    headers = {
+                        'Content-Type': 'application/json',
+                        'Host': host,
+                    },
+                    timeout = self.callback_timeout,
+                    allow_redirects = False,
+                )
+
+        except Exception as error:
+            ev_logger.info(f"Failed to send callback of job '{job_id}' to '{callback_url}' x")
+            ev_logger.info(f"Error: {error}")
+
+    # MARK: RunJob
+    def _run_job(self, job_id: str, job_function, job_arguments: dict, callback_url: str = None):
+        try:
+            self._execute_job(job_id, job_function, job_arguments, callback_url)
+
+        finally:
+            # Free the place in the queue
+            with self.lock:
+                self.pending_count -= 1
+
+    # MARK: ExecuteJob
+    def _execute_job(self, job_id: str, job_function, job_arguments: dict, callback_url: str = None):
+        # Mark the job as running, the job failed by `fail_stale_jobs` is not run
+        if not self._update_job(job_id, 'running', current_status = 'pending'):
+            ev_logger.info(f"Skip job '{job_id}', it is not pending anymore x")
+            return
+
+        try:
+            # Run the job
+            result = job_function(**job_arguments)
+
+            # Mark the job as finished
+            self._update_job(job_id, 'finished', current_status = 'running', result = result)
+
+        except EvException as error:
+            ev_logger.info(f"Failed to run job '{job_id}' x")
+
+            # Mark the job as failed
+            self._update_job(job_id, 'failed', current_status = 'running', error = {
+                'code': error.status_code,
+                'message': error.message,
+                'information': error.information,
+            })
+
+        except Exception as error:
+            ev_logger.info(f"Failed to run job '{job_id}' x")
+
+            # Mark the job as failed
+            self._update_job(job_id, 'failed', current_status = 'running', error = {
+                'code': 500,
+                'message': 'Internal server error',
+                'information': str(error),
+            })
+
+        # Send the completion callback
+        if callback_url:
+            self._send_callback(job_id, callback_url)
+
+    # MARK: Submit
+    def submit(self, job_type: str, job_function, job_arguments: dict, callback_url: str = None) -> EvJobModel:
+        # Check the callback URL
+        if callback_url:
+            self.validate_callback_url(callback_url)
+
+        # Reserve a place in the queue, the job is rejected if the workers are too busy
+        with self.lock:
+            if self.pending_count >= self.queue_size:
+                raise EvServiceUnavailableException(
+                    message = 'Too many jobs in the queue, please retry later',
+                    information = {
+                        'queue_size': self.queue_size,
+                    },
+                )
+            self.pending_count += 1
+
+        try:
+            # Clean the expired jobs
+            self._clean_jobs()
+
+            # Define the job
+            job_id = uuid.uuid4().hex
+            now = time.time()
+
+            # Save the job
+            with connect_sqlite(self.store_path) as connection:
+                connection.execute(
+                    'INSERT INTO jobs (job_id, job_type, status, callback_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (job_id, job_type, 'pending', callback_url, now, now),
+                )
+
+            # Run the job in the background worker, it free the place when it is finished
+            self._get_executor().submit(self._run_job, job_id, job_function, job_arguments, callback_url)
+
+        except Exception:
+            # Free the place of the job that is not submitted
+            with self.lock:
+                self.pending_count -= 1
+            raise
+
+        ev_logger.info(f"Successfully submit '{job_type}' job '{job_id}' √")
+
+        # Return the job
+        return self.get(job_id)
+
+    # MARK: Get
+    def get(self, job_id: str) -> EvJobModel | None:
+        # Get the job
+        with connect_sqlite(self.store_path) as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+
+        # If the job is not found
+        if row is None:
+            return None
+
+        # Return the job
+        return EvJobModel(
+            job_id = row['job_id'],
+            job_type = row['job_type'],
+            status = row['status'],
+            result = json.loads(row['result']) if row['result'] else None,
+            error = json.loads(row['error']) if row['error'] else None,
+            created_at = datetime.datetime.fromtimestamp(row['created_at']),
+            updated_at = datetime.datetime.fromtimestamp(row['updated_at']),
+        )
+
+# MARK: EvJobServiceInstance
+# Define job service instance
+job_service = EvJobService()
\ No newline at end of file
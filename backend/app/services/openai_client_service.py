@@ -0,0 +1,143 @@
+# MARK: Import
+# Dependencies
+import os
+import hashlib
+import datetime
+import threading
+import httpx
+from openai import OpenAI
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.logger import ev_logger
+
+# MARK: EvOpenAIClientService
+class EvOpenAIClientService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.max_connections = EvIELTSConfig.openai_max_connections
+        self.max_keepalive_connections = EvIELTSConfig.openai_max_keepalive_connections
+        self.keepalive_expiry = EvIELTSConfig.openai_keepalive_expiry
+        self.timeout = EvIELTSConfig.openai_timeout
+        self.connect_timeout = EvIELTSConfig.openai_connect_timeout
+        self.max_retries = EvIELTSConfig.openai_max_retries
+        self.client = None
+        self.client_pid = None
+        self.request_count = 0
+        self.connection_count = 0
+        self.input_token_count = 0
+        self.cached_token_count = 0
+        self.output_token_count = 0
+        self.lock = threading.Lock()
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "request_count": self.request_count,
+            "connection_count": self.connection_count,
+            "reused_connection_count": max(self.request_count - self.connection_count, 0),
+            "input_token_count": self.input_token_count,
+            "cached_token_count": self.cached_token_count,
+            "output_token_count": self.output_token_count,
+            "cached_token_ratio": self.cached_token_count / self.input_token_count if self.input_token_count else 0.0,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: Trace
+    def _trace(self, event_name: str, info: dict):
+        # Count every new TCP connection opened by the pool
+        if event_name == 'connection.connect_tcp.complete':
+            with self.lock:
+                self.connection_count += 1
+
+    # MARK: OnRequest
+    def _on_request(self, request: httpx.Request):
+        # Count the request and trace the connection
+        with self.lock:
+            self.request_count += 1
+        request.extensions['trace'] = self._trace
+
+    # MARK: CreateClient
+    def _create_client(self) -> OpenAI:
+        # Define the pooled HTTP client with keep alive
+        http_client = httpx.Client(
+            limits = httpx.Limits(
+                max_connections = self.max_connections,
+                max_keepalive_connections = self.max_keepalive_connections,
+                keepalive_expiry = self.keepalive_expiry,
+            ),
+            timeout = httpx.Timeout(
+                self.timeout,
+                connect = self.connect_timeout,
+            ),
+            event_hooks = {
+                'request': [self._on_request],
+            },
+        )
+
+        ev_logger.info(f"Successfully create OpenAI client for process '{os.getpid()}' √")
+
+        # Return the OpenAI client
+        return OpenAI(
+            api_key = EvIELTSConfig.openai_api_key,
+            http_client = http_client,
+            max_retries = self.max_retries,
+        )
+
+    # MARK: PromptCacheKey
+    def prompt_cache_key(self, name: str, prompt: str) -> str:
+        '''
+        Custom function to define the versioned key of the static prompt. The key is
+        sent as `prompt_cache_key`, so the requests with the same prompt prefix are
+        routed to the same prompt cache, and the key is changed with the prompt.
+
+        Args:
+        - name: str: Name of the prompt, like `evaluation`.
+        - prompt: str: The static prompt.
+
+        Returns:
+        - str: The prompt cache key.
+        '''
+        return f"ev-{name}-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]}"
+
+    # MARK: RecordUsage
+    def record_usage(self, operation: str, response):
+        # Get the token usage of the response
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+
+        input_tokens = usage.input_tokens or 0
+        output_tokens = usage.output_tokens or 0
+        cached_tokens = 0
+        if usage.input_tokens_details is not None:
+            cached_tokens = usage.input_tokens_details.cached_tokens or 0
+
+        with self.lock:
+            self.input_token_count += input_tokens
+            self.cached_token_count += cached_tokens
+            self.output_token_count += output_tokens
+
+        ev_logger.info(f"OpenAI '{operation}' usage input '{input_tokens}' cached '{cached_tokens}' output '{output_tokens}' tokens √")
+
+    # MARK: GetClient
+    def get_client(self) -> OpenAI:
+        with self.lock:
+            # Create the client once per process, the connection pool can't be shared after fork
+            if self.client is None or self.client_pid != os.getpid():
+                self.client = self._create_client()
+                self.client_pid = os.getpid()
+                self.request_count = 0
+                self.connection_count = 0
+                self.input_token_count = 0
+                self.cached_token_count = 0
+                self.output_token_count = 0
+
+            return self.client
+
+# MARK: EvOpenAIClientServiceInstance
+# Define OpenAI client service instance
+openai_client_service = EvOpenAIClientService()
\ No newline at end of file
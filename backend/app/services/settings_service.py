@@ -0,0 +1,241 @@
+# MARK: Import
+# Dependencies
+import os
+import json
+import time
+import datetime
+import threading
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvClientException
+from app.utils.logger import ev_logger
+from app.utils.sqlite import connect_sqlite
+
+# MARK: EvSettingsService
+class EvSettingsService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.store_path = EvIELTSConfig.settings_store_path
+        self.poll_interval = EvIELTSConfig.settings_poll_interval
+        self.app = None
+        self.version = 0
+        self.versions = {}
+        self.applied_count = 0
+        self.thread_pid = None
+        self.lock = threading.Lock()
+
+        # Create the settings table
+        with connect_sqlite(self.store_path) as connection:
+            connection.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                '''
+            )
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "version": self.version,
+            "versions": self.versions,
+            "applied_count": self.applied_count,
+            "poll_interval": self.poll_interval,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: Apply
+    def _apply(self, key: str, value):
+        # Import the services here, so the store is created without loading the models
+        from app.services.asr_service import asr_service
+        from app.services.chat_gpt_service import chatgpt_service
+        from app.services.ielts_services import ielts_service
+        from app.services.information_service import information_service
+
+        # Apply the setting to the service
+        if key == 'asr_model':
+            asr_service.update_model(model_name = value)
+        elif key == 'asr_initial_prompt':
+            asr_service.update_initial_prompt(initial_prompt = value)
+        elif key == 'chatgpt_model':
+            chatgpt_service.update_model(model_name = value)
+        elif key == 'chatgpt_prompt':
+            chatgpt_service.update_prompt(**value)
+        elif key == 'ielts_model':
+            ielts_service.update_model(**value)
+        elif key == 'ielts_initial_prompt':
+            ielts_service.update_initial_prompt(initial_prompt = value)
+        elif key == 'ielts_prompt':
+            # The prompt is saved in the prompt file, read it again
+            if self.app is None:
+                ielts_service.update_prompt()
+            else:
+                with self.app.app_context():
+                    ielts_service.update_prompt()
+        elif key == 'user_credit':
+            ielts_service.update_credit(user_credit = int(value))
+        elif key.startswith('information:'):
+            information_service.invalidate(key.split(':', 1)[1], version = int(value))
+        else:
+            raise EvClientException(
+                message = f"Invalid setting '{key}'",
+            )
+
+    # MARK: Get
+    def get(self, key: str, default = None):
+        # Get the saved setting
+        with connect_sqlite(self.store_path) as connection:
+            row = connection.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+
+        return json.loads(row['value']) if row is not None else default
+
+    # MARK: Set
+    def set(self, key: str, value):
+        '''
+        Custom function to change the setting for every gunicorn worker. The setting
+        is applied to this worker first, so an invalid value is rejected before it is
+        saved, then saved with a new version. The other workers apply it on the next
+        poll of `EvIELTSConfig.settings_poll_interval`.
+
+        The dict setting is a partial update, like `chatgpt_prompt`, its None fields
+        keep the saved value. It is merged in the write transaction, so a new worker
+        get every field of the earlier updates.
+
+        Args:
+        - key: str: Name of the setting, like `asr_model`.
+        - value: Any: JSON value of the setting.
+        '''
+        # Apply to this worker
+        self._apply(key, value)
+
+        # Save the setting, merge the dict setting into the saved one
+        if isinstance(value, dict):
+            self._save(key, lambda current: {**(current or {}), **{field: field_value for field, field_value in value.items() if field_value is not None}})
+        else:
+            self._save(key, lambda current: value)
+
+    # MARK: Increment
+    def increment(self, key: str) -> int:
+        '''
+        Custom function to increase the integer setting for every gunicorn worker. The
+        new value is read and saved in the same write transaction, so the concurrent
+        increments of the workers never get the same value.
+
+        Args:
+        - key: str: Name of the setting, like `information:<file_name>`.
+
+        Returns:
+        - int: The new value of the setting.
+        '''
+        # Save the next value, then apply it to this worker
+        value = self._save(key, lambda current: int(current or 0) + 1)
+        self._apply(key, value)
+
+        return value
+
+    # MARK: Save
+    def _save(self, key: str, update):
+        with connect_sqlite(self.store_path) as connection:
+            # Save with the next version, the write lock make the version and the value unique
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+                value = update(json.loads(row['value']) if row is not None else None)
+                version = connection.execute('SELECT COALESCE(MAX(version), 0) + 1 AS version FROM settings').fetchone()['version']
+                connection.execute(
+                    'INSERT OR REPLACE INTO settings (key, value, version, updated_at) VALUES (?, ?, ?, ?)',
+                    (key, json.dumps(value), version, time.time()),
+                )
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+        # Don't apply it again on the next poll
+        with self.lock:
+            self.versions[key] = version
+
+        ev_logger.info(f"Successfully save setting '{key}' version '{version}' √")
+
+        return value
+
+    # MARK: Sync
+    def _sync(self):
+        with connect_sqlite(self.store_path) as connection:
+            # Check the latest version, it is the only query if nothing is changed
+            latest_version = connection.execute('SELECT COALESCE(MAX(version), 0) AS version FROM settings').fetchone()['version']
+            if latest_version <= self.version:
+                return
+
+            # Get the changed settings
+            rows = connection.execute(
+                'SELECT key, value, version FROM settings WHERE version > ? ORDER BY version',
+                (self.version,),
+            ).fetchall()
+
+        for row in rows:
+            # Skip the setting already applied by this worker
+            if row['version'] <= self.versions.get(row['key'], 0):
+                continue
+
+            try:
+                self._apply(row['key'], json.loads(row['value']))
+                with self.lock:
+                    self.applied_count += 1
+            except Exception as error:
+                ev_logger.info(f"Failed to apply setting '{row['key']}' version '{row['version']}' x")
+                ev_logger.info(f"Error: {error}")
+
+            with self.lock:
+                self.versions[row['key']] = row['version']
+
+        self.version = latest_version
+
+    # MARK: RunWatcher
+    def _run_watcher(self):
+        while True:
+            # Wait for the next poll
+            time.sleep(self.poll_interval)
+
+            try:
+                self._sync()
+            except Exception as error:
+                ev_logger.info(f"Failed to sync settings x")
+                ev_logger.info(f"Error: {error}")
+
+    # MARK: Start
+    def start(self, app):
+        '''
+        Custom function to apply the saved settings and start the watcher of this
+        worker. The watcher only compare the latest version on every poll, the
+        changed settings are read and applied when the version is increased.
+
+        Args:
+        - app: Flask: The Flask app, used for the app context of the watcher.
+        '''
+        with self.lock:
+            # Start once per process, the thread is not copied after fork
+            if self.thread_pid == os.getpid():
+                return
+
+            self.app = app
+            self.thread_pid = os.getpid()
+
+        # Apply the saved settings
+        self._sync()
+
+        # Start the watcher
+        threading.Thread(
+            target = self._run_watcher,
+            name = 'ev-settings-watcher',
+            daemon = True,
+        ).start()
+
+# MARK: EvSettingsServiceInstance
+# Define settings service instance
+settings_service = EvSettingsService()
@@ -0,0 +1,281 @@
+# MARK: Import
+# Dependencies
+import time
+import datetime
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvClientException
+from app.utils.logger import ev_logger
+from app.utils.audio import audio_duration
+from app.utils.transcript import shift_transcription, merge_transcriptions
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.services.asr_service import asr_service
+from app.services.vad_service import vad_service
+
+# MARK: EvStreamSession
+class EvStreamSession:
+    '''
+    Custom session of one streamed recording. The PCM audio is appended while it
+    is uploaded, the VAD only run on the new audio with a short context before it,
+    and every finished utterance is transcribed in the background, so only the last
+    one is left when the recording is stopped.
+
+    Args:
+    - service: EvStreamService: The stream service.
+    - initial_prompt: str: The initial prompt of the ASR model.
+    '''
+    # MARK: Properties
+    def __init__(self, service, initial_prompt: str = None):
+        # Properties
+        self.service = service
+        self.initial_prompt = initial_prompt
+        self.sample_rate = EvIELTSConfig.audio_clean_sample_rate
+        self.vad_interval = int(EvIELTSConfig.stream_vad_interval * self.sample_rate)
+        self.min_silence = int(EvIELTSConfig.stream_min_silence * self.sample_rate)
+        self.max_segment = int(EvIELTSConfig.stream_max_segment * self.sample_rate)
+        self.vad_context = self.min_silence + self.sample_rate
+        self.samples = np.zeros(self.sample_rate * 60, dtype = np.float32)
+        self.length = 0
+        self.pending_start = 0
+        self.checked_length = 0
+        self.vad_start = 0
+        self.speech_timestamps = []
+        self.remainder = b''
+        self.futures = []
+
+    # MARK: Feed
+    def feed(self, data: bytes):
+        # Keep the odd byte for the next chunk
+        data = self.remainder + data
+        usable = len(data) - len(data) % 2
+        self.remainder = data[usable:]
+        if usable == 0:
+            return
+
+        # Convert the PCM 16 bit little endian to float
+        samples = np.frombuffer(data[:usable], dtype = '<i2').astype(np.float32) / 32768.0
+
+        # Grow the buffer
+        if self.length + len(samples) > len(self.samples):
+            buffer = np.zeros(max(len(self.samples) * 2, self.length + len(samples)), dtype = np.float32)
+            buffer[:self.length] = self.samples[:self.length]
+            self.samples = buffer
+
+        self.samples[self.length:self.length + len(samples)] = samples
+        self.length += len(samples)
+
+        # Check the new audio on every VAD interval
+        if self.length - self.checked_length >= self.vad_interval:
+            self.checked_length = self.length
+            self._segment(final = False)
+
+    # MARK: DetectSpeech
+    def _detect_speech(self):
+        # Run the VAD on the new audio and the context before it, the older speech is already detected
+        start = max(self.pending_start, self.vad_start)
+        speech_timestamps = [
+            {'start': start + speech['start'], 'end': start + speech['end']}
+            for speech in vad_service.detect_speech(
+                EvAudioBufferModel(samples = self.samples[start:self.length], sample_rate = self.sample_rate),
+                return_seconds = False,
+            )
+        ]
+
+        # Keep the older speech before the context, the speech cut by the context is joined again
+        kept = [
+            {'start': speech['start'], 'end': min(speech['end'], start)}
+            for speech in self.speech_timestamps
+            if speech['start'] < start
+        ]
+        if kept and speech_timestamps and speech_timestamps[0]['start'] - kept[-1]['end'] <= vad_service.speech_pad_samples * 2:
+            kept[-1]['end'] = speech_timestamps.pop(0)['end']
+
+        self.speech_timestamps = kept + speech_timestamps
+        self.vad_start = max(self.pending_start, self.length - self.vad_context)
+
+    # MARK: Segment
+    def _segment(self, final: bool):
+        # Get the speech of the audio that is not transcribed yet
+        pending_length = self.length - self.pending_start
+        if pending_length == 0:
+            return
+
+        self._detect_speech()
+        speech_timestamps = [
+            {'start': max(speech['start'] - self.pending_start, 0), 'end': speech['end'] - self.pending_start}
+            for speech in self.speech_timestamps
+            if speech['end'] > self.pending_start
+        ]
+
+        # If no speech detected, drop the silence but keep the end for the next utterance
+        if not speech_timestamps:
+            self.pending_start = self.length if final else max(self.pending_start, self.length - self.min_silence)
+            return
+
+        # Start the segment just before the speech
+        start = self.pending_start + max(speech_timestamps[0]['start'] - self.min_silence // 2, 0)
+
+        if final:
+            # Transcribe the rest of the recording
+            end = self.length
+        elif pending_length - speech_timestamps[-1]['end'] >= self.min_silence:
+            # The utterance is finished, cut in the middle of the pause
+            end = self.pending_start + speech_timestamps[-1]['end'] + self.min_silence // 2
+        elif pending_length >= self.max_segment:
+            # The utterance is too long, cut on the longest pause
+            if len(speech_timestamps) > 1:
+                index = max(
+                    range(len(speech_timestamps) - 1),
+                    key = lambda index: speech_timestamps[index + 1]['start'] - speech_timestamps[index]['end'],
+                )
+                end = self.pending_start + (speech_timestamps[index]['end'] + speech_timestamps[index + 1]['start']) // 2
+            else:
+                end = self.length
+        else:
+            # Wait for more audio
+            return
+
+        self._submit(start, end)
+
+    # MARK: Submit
+    def _submit(self, start: int, end: int):
+        # Transcribe the segment in the background
+        audio_buffer = EvAudioBufferModel(
+            samples = self.samples[start:end].copy(),
+            sample_rate = self.sample_rate,
+        )
+        self.futures.append(self.service.get_executor().submit(
+            self.service.transcribe_segment,
+            audio_buffer,
+            start / float(self.sample_rate),
+            self.initial_prompt,
+        ))
+        self.pending_start = end
+
+        # Forget the speech of the submitted segment
+        self.speech_timestamps = [speech for speech in self.speech_timestamps if speech['end'] > end]
+
+    # MARK: Cancel
+    def cancel(self):
+        # Don't transcribe the rest of the failed recording
+        for future in self.futures:
+            future.cancel()
+
+    # MARK: Finish
+    def finish(self) -> tuple[dict, EvAudioBufferModel]:
+        try:
+            # Transcribe the last utterance and wait for every segment
+            self._segment(final = True)
+            results = [future.result() for future in self.futures]
+
+        except Exception:
+            self.cancel()
+            raise
+
+        # Return the whole transcription and the whole audio
+        return merge_transcriptions(results), EvAudioBufferModel(
+            samples = self.samples[:self.length].copy(),
+            sample_rate = self.sample_rate,
+        )
+
+# MARK: EvStreamService
+class EvStreamService:
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.max_bytes = EvIELTSConfig.stream_max_bytes
+        self.read_size = EvIELTSConfig.stream_read_size
+        self.workers = EvIELTSConfig.stream_workers
+        self.executor = None
+        self.stream_count = 0
+        self.segment_count = 0
+        self.lock = threading.Lock()
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "workers": self.workers,
+            "stream_count": self.stream_count,
+            "segment_count": self.segment_count,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: GetExecutor
+    def get_executor(self) -> ThreadPoolExecutor:
+        # Start the transcription pool on the first stream, so it is created in the worker process
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers = self.workers,
+                    thread_name_prefix = 'ev-stream',
+                )
+
+        return self.executor
+
+    # MARK: TranscribeSegment
+    def transcribe_segment(self, audio_buffer: EvAudioBufferModel, offset: float, initial_prompt: str = None) -> dict:
+        # Transcribe the segment and move it to the recording timeline
+        result = asr_service.transcribe(audio_buffer, initial_prompt = initial_prompt)
+
+        with self.lock:
+            self.segment_count += 1
+
+        return shift_transcription(result, offset)
+
+    # MARK: Transcribe
+    def transcribe(self, stream, initial_prompt: str = None) -> tuple[dict, EvAudioBufferModel]:
+        '''
+        Custom function to transcribe the recording while it is uploaded. The body
+        is the mono PCM 16 bit little endian audio with the sample rate of
+        `EvIELTSConfig.audio_clean_sample_rate`, sent with chunked transfer encoding.
+
+        Args:
+        - stream: file: The request body stream.
+        - initial_prompt: str: The initial prompt of the ASR model.
+
+        Returns:
+        - dict: The whisper transcription result of the whole recording.
+        - EvAudioBufferModel: The whole recording.
+        '''
+        session = EvStreamSession(self, initial_prompt = initial_prompt)
+        received = 0
+
+        try:
+            # Read the audio while it is uploaded
+            while True:
+                data = stream.read(self.read_size)
+                if not data:
+                    break
+
+                # Check if the audio size is greater than the limit
+                received += len(data)
+                if received > self.max_bytes:
+                    raise EvClientException(
+                        message = f"Audio size exceeds the limit of {self.max_bytes // (1024 * 1024)}MB",
+                    )
+
+                session.feed(data)
+
+        except Exception:
+            # Cancel the utterances already submitted, like the upload that is too big or disconnected
+            session.cancel()
+            raise
+
+        # Finish the last utterance
+        start = time.perf_counter()
+        result, audio_buffer = session.finish()
+
+        with self.lock:
+            self.stream_count += 1
+
+        ev_logger.info(f"Stream transcribe '{len(session.futures)}' segments of '{audio_duration(audio_buffer):.2f}' seconds, finished {(time.perf_counter() - start) * 1000:.0f} ms after the upload √")
+
+        return result, audio_buffer
+
+# MARK: EvStreamServiceInstance
+# Define stream service instance
+stream_service = EvStreamService()
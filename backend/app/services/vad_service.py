@@ -0,0 +1,284 @@
+# MARK: Import
+# Dependencies
+import os
+import time
+import queue
+import datetime
+import threading
+import numpy as np
+import torch
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from silero_vad import load_silero_vad
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvServerException
+from app.utils.logger import ev_logger
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: EvVADService
+class EvVADService:
+    '''
+    Custom Silero VAD on the decoded audio buffer. The model is loaded once per
+    worker process, and its state is reset before every audio. The requests that
+    arrive at the same time are batched, so one forward pass per window run the
+    frames of every request in the batch.
+    '''
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.model = None
+        self.model_pid = None
+        self.sample_rate = EvIELTSConfig.audio_clean_sample_rate
+        self.window_size = 512 if self.sample_rate == 16000 else 256
+        self.threshold = EvIELTSConfig.vad_threshold
+        self.min_speech_samples = int(self.sample_rate * EvIELTSConfig.vad_min_speech_ms / 1000)
+        self.min_silence_samples = int(self.sample_rate * EvIELTSConfig.vad_min_silence_ms / 1000)
+        self.speech_pad_samples = int(self.sample_rate * EvIELTSConfig.vad_speech_pad_ms / 1000)
+        self.torch_threads = EvIELTSConfig.vad_torch_threads
+        self.max_batch_size = EvIELTSConfig.vad_batch_max_size
+        self.max_wait = EvIELTSConfig.vad_batch_max_wait_ms / 1000.0
+        self.timeout = EvIELTSConfig.vad_batch_timeout
+        self.batch_count = 0
+        self.item_count = 0
+        self.total_time = 0.0
+        self.queue = queue.Queue()
+        self.thread = None
+        self.thread_pid = None
+        self.lock = threading.Lock()
+        self.model_lock = threading.Lock()
+
+    # MARK: HealthCheck
+    def health_check(self):
+        return {
+            "model_loaded": self.model is not None and self.model_pid == os.getpid(),
+            "torch_threads": torch.get_num_threads(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": int(self.max_wait * 1000),
+            "batch_count": self.batch_count,
+            "item_count": self.item_count,
+            "average_batch_size": (self.item_count / self.batch_count) if self.batch_count else 0.0,
+            "average_batch_ms": (self.total_time * 1000 / self.batch_count) if self.batch_count else 0.0,
+            "timestamp": datetime.datetime.now()
+        }
+
+    # MARK: Load
+    def load(self):
+        with self.model_lock:
+            # Load the model once per process, the state must not be shared after fork
+            if self.model is not None and self.model_pid == os.getpid():
+                return
+
+            # Limit the torch threads of the worker, it is shared by every torch model of the process
+            if self.torch_threads > 0:
+                torch.set_num_threads(self.torch_threads)
+
+            self.model = load_silero_vad()
+            self.model_pid = os.getpid()
+
+            ev_logger.info(f"Successfully load silero VAD for process '{os.getpid()}' √")
+
+    # MARK: EnsureStarted
+    def _ensure_started(self):
+        with self.lock:
+            # Start the batch thread, again after fork because threads are not copied
+            if self.thread is None or self.thread_pid != os.getpid() or not self.thread.is_alive():
+                self.queue = queue.Queue()
+                self.thread = threading.Thread(
+                    target = self._run,
+                    name = 'ev-vad-batch-scheduler',
+                    daemon = True,
+                )
+                self.thread_pid = os.getpid()
+                self.thread.start()
+
+    # MARK: DetectSpeech
+    def detect_speech(self, audio_buffer: EvAudioBufferModel, return_seconds: bool = True) -> list:
+        '''
+        Custom function to get the speech timestamps of the audio buffer, like the
+        Silero `get_speech_timestamps` with its default options.
+
+        Args:
+        - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+        - return_seconds: bool: Return the timestamps in seconds instead of samples.
+
+        Returns:
+        - list: The speech timestamps, like `[{'start': 0.5, 'end': 1.2}]`.
+        '''
+        # Get the speech probability of every window
+        if self.max_batch_size > 1:
+            self._ensure_started()
+            future = Future()
+            self.queue.put((audio_buffer.samples, future))
+            try:
+                probabilities = future.result(timeout = self.timeout)
+            except FutureTimeoutError:
+                # Don't run the audio if it is still waiting in the queue
+                future.cancel()
+                raise EvServerException(
+                    message = f"Speech detection exceeds {self.timeout:.0f} seconds",
+                )
+        else:
+            probabilities = self._probabilities([audio_buffer.samples])[0]
+
+        # Define the speech timestamps
+        speech_timestamps = self._speech_timestamps(probabilities, len(audio_buffer.samples))
+        if return_seconds:
+            return [
+                {
+                    'start': round(speech['start'] / float(self.sample_rate), 3),
+                    'end': round(speech['end'] / float(self.sample_rate), 3),
+                }
+                for speech in speech_timestamps
+            ]
+
+        return speech_timestamps
+
+    # MARK: Run
+    def _run(self):
+        batch = []
+        try:
+            while True:
+                # Wait for the first audio
+                batch = [self.queue.get()]
+
+                # Collect more audio until the batch is full or the window is closed
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout = remaining))
+                    except queue.Empty:
+                        break
+
+                # Skip the audio cancelled by the timeout of its request
+                batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+
+                try:
+                    # Run the batch
+                    results = self._probabilities([item[0] for item in batch])
+
+                    # Split the results back to every audio
+                    for item, result in zip(batch, results):
+                        item[1].set_result(result)
+
+                except Exception as error:
+                    ev_logger.info(f"Failed to detect speech of batch of {len(batch)} audio x")
+                    ev_logger.info(f"Error: {error}")
+
+                    # Fail every audio in the batch
+                    for item in batch:
+                        if not item[1].done():
+                            item[1].set_exception(error)
+
+        except BaseException as error:
+            ev_logger.info(f"VAD batch scheduler stopped x")
+            ev_logger.info(f"Error: {error}")
+
+            # Fail the running and the queued audio, the next audio start a new thread
+            items = list(batch)
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for item in items:
+                if not item[1].done():
+                    item[1].set_exception(EvServerException(message = f"VAD batch scheduler stopped: {error}"))
+            raise
+
+    # MARK: Probabilities
+    def _probabilities(self, samples_list: list) -> list:
+        # If silero model is not loaded
+        self.load()
+
+        start = time.perf_counter()
+
+        # Pad every audio to the windows of the longest one
+        window_counts = [(len(samples) + self.window_size - 1) // self.window_size for samples in samples_list]
+        frames = np.zeros((len(samples_list), max(max(window_counts), 1) * self.window_size), dtype = np.float32)
+        for index, samples in enumerate(samples_list):
+            frames[index, :len(samples)] = samples
+        frames = torch.from_numpy(frames)
+
+        # Run every window of the batch in one forward pass, the state is reset for the new audio
+        outputs = []
+        with self.model_lock, torch.inference_mode():
+            self.model.reset_states()
+            for position in range(0, frames.shape[1], self.window_size):
+                outputs.append(self.model(frames[:, position:position + self.window_size], self.sample_rate))
+
+        probabilities = torch.cat(outputs, dim = 1).numpy() if outputs else np.zeros((len(samples_list), 0))
+
+        # Update the counter
+        self.batch_count += 1
+        self.item_count += len(samples_list)
+        self.total_time += time.perf_counter() - start
+
+        # Return only the windows of every audio
+        return [probabilities[index, :window_counts[index]] for index in range(len(samples_list))]
+
+    # MARK: SpeechTimestamps
+    def _speech_timestamps(self, probabilities: np.ndarray, total_samples: int) -> list:
+        # Find the speech with the same hysteresis as `get_speech_timestamps`
+        negative_threshold = max(self.threshold - 0.15, 0.01)
+        speeches = []
+        current = None
+        temporary_end = 0
+
+        for index, probability in enumerate(probabilities):
+            position = index * self.window_size
+
+            # The speech continue
+            if probability >= self.threshold and temporary_end:
+                temporary_end = 0
+
+            # The speech start
+            if probability >= self.threshold and current is None:
+                current = {'start': position}
+                continue
+
+            # The speech end after the minimum silence
+            if probability < negative_threshold and current is not None:
+                if not temporary_end:
+                    temporary_end = position
+                if position - temporary_end < self.min_silence_samples:
+                    continue
+
+                current['end'] = temporary_end
+                if current['end'] - current['start'] > self.min_speech_samples:
+                    speeches.append(current)
+                current = None
+                temporary_end = 0
+
+        # The speech continue until the end of the audio
+        if current is not None and total_samples - current['start'] > self.min_speech_samples:
+            current['end'] = total_samples
+            speeches.append(current)
+
+        # Pad the speech, the close speech share the silence between them
+        for index, speech in enumerate(speeches):
+            if index == 0:
+                speech['start'] = max(0, speech['start'] - self.speech_pad_samples)
+
+            if index != len(speeches) - 1:
+                silence = speeches[index + 1]['start'] - speech['end']
+                if silence < 2 * self.speech_pad_samples:
+                    speech['end'] += silence // 2
+                    speeches[index + 1]['start'] = max(0, speeches[index + 1]['start'] - silence // 2)
+                else:
+                    speech['end'] = min(total_samples, speech['end'] + self.speech_pad_samples)
+                    speeches[index + 1]['start'] = max(0, speeches[index + 1]['start'] - self.speech_pad_samples)
+            else:
+                speech['end'] = min(total_samples, speech['end'] + self.speech_pad_samples)
+
+        return speeches
+
+# MARK: EvVADServiceInstance
+# Define VAD service instance
+vad_service = EvVADService()
@@ -0,0 +1,358 @@
+# MARK: Import
+# Dependencies
+import io
+import bisect
+import wave
+import struct
+import subprocess
+import numpy as np
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvServerException, EvException
+from app.models.audio_buffer_model import EvAudioBufferModel
+
+# MARK: NormalizeAudio
+def normalize_audio(audio_data: bytes, audio_extension: str, timeout: float = None) -> EvAudioBufferModel:
+    '''
+    Custom function to normalize the uploaded audio in memory. Build using `ffmpeg`
+    reading the uploaded bytes from stdin and writing raw 16-bit PCM to stdout, so
+    no file is written to the disk.
+
+    Important: The audio will be resampled to `EvIELTSConfig.audio_clean_sample_rate`
+    and converted to `EvIELTSConfig.audio_clean_channels` channel. The returned buffer
+    contains float32 samples in range [-1.0, 1.0], which can be used directly by
+    Whisper, Silero VAD and encoded back to wav for the Englishvit API.
+
+    Args:
+    - audio_data: bytes: Content of the uploaded audio file.
+    - audio_extension: str: Extension of the uploaded audio file.
+    - timeout: float: Optional time limit in seconds, the ffmpeg process is killed after it.
+
+    Returns:
+    - EvAudioBufferModel: Normalized audio buffer.
+    '''
+    try:
+        # Check if the audio data is empty
+        if not audio_data:
+            # Define the error message
+            message = f'Audio data is empty while normalize the {audio_extension} audio'
+
+            # Throw an exception
+            raise EvServerException(
+                message = message,
+                information = {
+                    'message': message,
+                }
+            )
+
+        # Define the ffmpeg command, `cache:` make the pipe seekable for m4a files
+        command = [
+            'ffmpeg',
+            '-nostdin',
+            '-hide_banner',
+            '-loglevel', 'error',
+            '-i', 'cache:pipe:0',
+            '-f', 's16le',
+            '-acodec', 'pcm_s16le',
+            '-ac', str(EvIELTSConfig.audio_clean_channels),
+            '-ar', str(EvIELTSConfig.audio_clean_sample_rate),
+            'pipe:1',
+        ]
+
+        # Decode the audio
+        process = subprocess.run(
+            command,
+            input = audio_data,
+            capture_output = True,
+            timeout = timeout,
+        )
+
+        # Check if the decode is failed
+        if process.returncode != 0 or not process.stdout:
+            # Define the error message
+            message = f'Failed to normalize {audio_extension} audio: {process.stderr.decode("utf-8", errors = "ignore").strip()}'
+
+            # Throw an exception
+            raise EvServerException(
+                message = message,
+                information = {
+                    'message': message,
+                }
+            )
+
+        # Convert the PCM to float32 samples
+        samples = np.frombuffer(process.stdout, dtype = np.int16).astype(np.float32) / 32768.0
+
+        # Return the audio buffer
+        return EvAudioBufferModel(
+            samples = samples,
+            sample_rate = EvIELTSConfig.audio_clean_sample_rate,
+        )
+
+    except EvException as error:
+        # Re-raise the error
+        raise error
+
+    except Exception as error:
+        # Define the error message
+        message = f'Failed to normalize audio: {str(error)}'
+
+        # Throw an exception
+        raise EvServerException(
+            message = message,
+            information = {
+                'message': message,
+            }
+        )
+
+# MARK: ReadPCMWav
+def read_pcm_wav(audio_data: bytes) -> EvAudioBufferModel | None:
+    '''
+    Custom function to read an uploaded wav directly with `wave` and NumPy, without
+    ffmpeg. Only plain PCM wav with 8, 16 or 32 bit samples is supported, the header
+    is inspected and the audio is downmixed and resampled with NumPy if needed.
+
+    Args:
+    - audio_data: bytes: Content of the uploaded audio file.
+
+    Returns:
+    - EvAudioBufferModel | None: Normalized audio buffer, or `None` if the wav is not
+    supported and must be decoded by the decoder.
+    '''
+    # Check the RIFF header before open the wav
+    if len(audio_data) < 44 or audio_data[0:4] != b'RIFF' or audio_data[8:12] != b'WAVE':
+        return None
+
+    try:
+        # Read the header and the frames, `wave` only accept PCM format
+        with wave.open(io.BytesIO(audio_data), 'rb') as wav_file:
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            sample_rate = wav_file.getframerate()
+            frames = wav_file.readframes(wav_file.getnframes())
+
+    except (wave.Error, EOFError):
+        return None
+
+    # Convert the frames to float32 samples
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype = np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype = np.int16).astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype = np.int32).astype(np.float32) / 2147483648.0
+    else:
+        return None
+
+    # If the wav is empty
+    if samples.size == 0:
+        return None
+
+    # Downmix to the clean channels
+    if channels != EvIELTSConfig.audio_clean_channels:
+        # Only downmix to mono is supported
+        if EvIELTSConfig.audio_clean_channels != 1:
+            return None
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis = 1)
+
+    # Resample to the clean sample rate
+    if sample_rate != EvIELTSConfig.audio_clean_sample_rate:
+        samples = _resample(
+            samples = samples,
+            original_sample_rate = sample_rate,
+            target_sample_rate = EvIELTSConfig.audio_clean_sample_rate,
+        )
+
+    # Return the audio buffer
+    return EvAudioBufferModel(
+        samples = np.ascontiguousarray(samples, dtype = np.float32),
+        sample_rate = EvIELTSConfig.audio_clean_sample_rate,
+    )
+
+# MARK: Resample
+def _resample(samples: np.ndarray, original_sample_rate: int, target_sample_rate: int) -> np.ndarray:
+    '''
+    Custom function to resample the audio with FFT. The spectrum is truncated (or
+    padded) to the target length, which also act as the anti aliasing filter.
+
+    Args:
+    - samples: np.ndarray: Float32 samples.
+    - original_sample_rate: int: Sample rate of the samples.
+    - target_sample_rate: int: Sample rate of the output.
+
+    Returns:
+    - np.ndarray: Resampled float32 samples.
+    '''
+    # Define the target length
+    target_length = int(round(len(samples) * target_sample_rate / float(original_sample_rate)))
+
+    # Resample in the frequency domain
+    spectrum = np.fft.rfft(samples)
+    resampled = np.fft.irfft(spectrum, n = target_length) * (target_length / float(len(samples)))
+
+    # Return the resampled samples
+    return resampled.astype(np.float32)
+
+# MARK: WavChunks
+def wav_chunks(audio_buffer: EvAudioBufferModel, chunk_size: int = 32768):
+    '''
+    Custom function to encode the normalized audio buffer to wav lazily. The header
+    is yielded first, then the 16-bit PCM is converted chunk by chunk, so only one
+    chunk is held in memory while it is streamed.
+
+    Args:
+    - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+    - chunk_size: int: Number of samples per chunk.
+
+    Returns:
+    - Iterator[bytes]: Content of the wav file.
+    '''
+    # Define the header of 16-bit PCM wav
+    channels = EvIELTSConfig.audio_clean_channels
+    data_length = len(audio_buffer.samples) * 2
+    yield struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_length, b'WAVE',
+        b'fmt ', 16, 1, channels, audio_buffer.sample_rate, audio_buffer.sample_rate * channels * 2, channels * 2, 16,
+        b'data', data_length,
+    )
+
+    # Convert float32 samples to 16-bit PCM chunk by chunk
+    for start in range(0, len(audio_buffer.samples), chunk_size):
+        chunk = audio_buffer.samples[start:start + chunk_size]
+        yield (np.clip(chunk, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+
+# MARK: EncodeWav
+def encode_wav(audio_buffer: EvAudioBufferModel) -> bytes:
+    '''
+    Custom function to encode the normalized audio buffer to wav bytes in memory.
+    Used for the APIs that need a file, like OpenAI transcription.
+
+    Args:
+    - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+
+    Returns:
+    - bytes: Content of the wav file.
+    '''
+    return b''.join(wav_chunks(audio_buffer))
+
+# MARK: AudioDuration
+def audio_duration(audio_buffer: EvAudioBufferModel) -> float:
+    '''
+    Custom function to get the duration of the audio buffer in seconds.
+
+    Args:
+    - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+
+    Returns:
+    - float: Duration in seconds.
+    '''
+    return len(audio_buffer.samples) / float(audio_buffer.sample_rate)
+
+# MARK: CompressSilence
+def compress_silence(audio_buffer: EvAudioBufferModel, speech_timestamps: list, max_silence: float) -> tuple[EvAudioBufferModel, list]:
+    '''
+    Custom function to shorten every silence longer than `max_silence`, including
+    the leading and the trailing silence. Half of `max_silence` is kept on each
+    side of the speech, so the words are not cut and the pauses still sound like
+    pauses. The timeline is used to move the timestamps back with `remap_time`.
+
+    Args:
+    - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+    - speech_timestamps: list: VAD speech timestamps in seconds, like `[{'start': 0.5, 'end': 1.2}]`.
+    - max_silence: float: The longest silence kept in seconds.
+
+    Returns:
+    - EvAudioBufferModel: The compressed audio buffer.
+    - list: The timeline as `(compressed_start, original_start)` of every kept part in seconds.
+    '''
+    sample_rate = audio_buffer.sample_rate
+    total = len(audio_buffer.samples)
+    padding = int(max_silence * sample_rate / 2)
+
+    # Define the kept parts, the close speech is merged with the silence between them
+    parts = []
+    for speech in speech_timestamps:
+        start = max(int(speech['start'] * sample_rate) - padding, 0)
+        end = min(int(speech['end'] * sample_rate) + padding, total)
+        if parts and start <= parts[-1][1]:
+            parts[-1][1] = max(parts[-1][1], end)
+        else:
+            parts.append([start, end])
+
+    # Join the kept parts
+    timeline = []
+    position = 0
+    for start, end in parts:
+        timeline.append((position / float(sample_rate), start / float(sample_rate)))
+        position += end - start
+
+    samples = np.concatenate([audio_buffer.samples[start:end] for start, end in parts]) if parts else audio_buffer.samples[:0]
+
+    return EvAudioBufferModel(samples = samples, sample_rate = sample_rate), timeline
+
+# MARK: RemapTime
+def remap_time(time: float, timeline: list) -> float:
+    '''
+    Custom function to move the timestamp of the compressed audio to the original
+    audio.
+
+    Args:
+    - time: float: Timestamp in the compressed audio in seconds.
+    - timeline: list: The timeline from `compress_silence`.
+
+    Returns:
+    - float: Timestamp in the original audio in seconds.
+    '''
+    # Find the kept part of the timestamp
+    index = max(bisect.bisect_right([compressed_start for compressed_start, _ in timeline], time) - 1, 0)
+    compressed_start, original_start = timeline[index]
+
+    return round(original_start + time - compressed_start, 3)
+
+# MARK: SplitOnPauses
+def split_on_pauses(audio_buffer: EvAudioBufferModel, speech_timestamps: list, max_duration: float) -> list:
+    '''
+    Custom function to split the long audio into parts not longer than
+    `max_duration`. Every part is cut in the middle of the last pause that fit in
+    it, so no word is cut, the audio is only cut inside a speech if the speech is
+    longer than `max_duration`.
+
+    Args:
+    - audio_buffer: EvAudioBufferModel: Normalized audio buffer.
+    - speech_timestamps: list: VAD speech timestamps in seconds, like `[{'start': 0.5, 'end': 1.2}]`.
+    - max_duration: float: The longest part in seconds.
+
+    Returns:
+    - list: The parts as `(start, end)` in samples.
+    '''
+    sample_rate = audio_buffer.sample_rate
+    total = len(audio_buffer.samples)
+    max_samples = int(max_duration * sample_rate)
+
+    # Define the middle of every pause
+    pauses = [
+        int((speech['end'] + next_speech['start']) / 2 * sample_rate)
+        for speech, next_speech in zip(speech_timestamps, speech_timestamps[1:])
+    ]
+
+    parts = []
+    start = 0
+    candidate = None
+    for pause in pauses + [total]:
+        # Cut on the last pause before the part is too long
+        while pause - start > max_samples:
+            end = candidate if candidate is not None else start + max_samples
+            parts.append((start, end))
+            start = end
+            candidate = None
+
+        if pause > start:
+            candidate = pause
+
+    # Add the last part
+    if start < total:
+        parts.append((start, total))
+
+    return parts
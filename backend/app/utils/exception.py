@@ -35,4 +35,22 @@ class EvAPIException(EvException):
     '''
     # MARK: Properties
     def __init__(self, message: str, information: dict = None):
-        super().__init__(message, 510, information)
\ No newline at end of file
+        super().__init__(message, 510, information)
+
+# MARK: EvNotFoundException
+class EvNotFoundException(EvException):
+    '''
+    Custom exception class for not found resources.
+    '''
+    # MARK: Properties
+    def __init__(self, message: str, information: dict = None):
+        super().__init__(message, 404, information)
+
+# MARK: EvServiceUnavailableException
+class EvServiceUnavailableException(EvException):
+    '''
+    Custom exception class for the server that is too busy.
+    '''
+    # MARK: Properties
+    def __init__(self, message: str, information: dict = None):
+        super().__init__(message, 503, information)
\ No newline at end of file
@@ -0,0 +1,62 @@
+# MARK: Import
+# Dependency
+import os
+import tempfile
+from contextlib import contextmanager
+
+# MARK: OpenAtomic
+@contextmanager
+def open_atomic(file_path: str, binary: bool = False, permission: int = None):
+    '''
+    Custom function to replace the file content atomically. The content is written
+    to a temporary file in the same directory, flushed to the disk, then renamed to
+    the file, so the reader see the old or the new content but never a partial one.
+
+    Args:
+    - file_path: str: Path to the file.
+    - binary: bool: Open the temporary file in binary mode.
+    - permission: int: Permission of the file, default to the permission of the replaced file or 0o644.
+
+    Returns:
+    - Iterator[IO]: The temporary file to write the content to.
+    '''
+    # Write to the temporary file in the same file system
+    directory = os.path.dirname(os.path.abspath(file_path))
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        prefix = f'.{os.path.basename(file_path)}.',
+        suffix = '.tmp',
+        dir = directory,
+    )
+
+    try:
+        with os.fdopen(file_descriptor, 'wb' if binary else 'w', encoding = None if binary else 'utf-8') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+
+        # Keep the permission of the replaced file, the temporary file is only readable by the owner
+        if permission is None:
+            permission = os.stat(file_path).st_mode & 0o777 if os.path.exists(file_path) else 0o644
+        os.chmod(temporary_path, permission)
+
+        # Replace the file
+        os.replace(temporary_path, file_path)
+
+    except BaseException:
+        # Remove the temporary file
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+# MARK: WriteAtomic
+def write_atomic(file_path: str, content: str, permission: int = None):
+    '''
+    Custom function to replace the file content atomically, see `open_atomic`.
+
+    Args:
+    - file_path: str: Path to the file.
+    - content: str: The new content of the file.
+    - permission: int: Permission of the file, default to the permission of the replaced file or 0o644.
+    '''
+    with open_atomic(file_path, permission = permission) as file:
+        file.write(content)
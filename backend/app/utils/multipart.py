@@ -0,0 +1,131 @@
+# MARK: Import
+# Dependency
+import uuid
+import numpy as np
+from urllib.parse import quote_plus, urlencode
+
+# MARK: Constants
+# Length of every byte in the urlencoded body, like `quote_plus`
+URLENCODED_LENGTH = np.full(256, 3, dtype = np.int64)
+URLENCODED_LENGTH[list(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~ ')] = 1
+
+# MARK: EvMultipartStream
+class EvMultipartStream:
+    '''
+    Custom multipart/form-data body that is generated while it is sent. The file
+    content is read from a chunk iterator, so the whole file is never copied into
+    the request body. The length is known before sending, so `requests` send it
+    with `Content-Length` instead of chunked transfer encoding.
+
+    Args:
+    - fields: dict: Text fields of the form.
+    - file_name: str: Name of the file field.
+    - file_filename: str: File name of the file.
+    - file_content_type: str: Content type of the file.
+    - file_chunks: iterator: Iterator of the file content bytes.
+    - file_length: int: Length of the file content in bytes.
+    '''
+    # MARK: Properties
+    def __init__(self, fields: dict, file_name: str, file_filename: str, file_content_type: str, file_chunks, file_length: int):
+        # Properties
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.buffer = b''
+
+        # Define the text fields
+        head = b''
+        for key, value in fields.items():
+            head += (
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{key}"\r\n\r\n'
+                f'{value}\r\n'
+            ).encode('utf-8')
+
+        # Define the file header
+        head += (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_name}"; filename="{file_filename}"\r\n'
+            f'Content-Type: {file_content_type}\r\n\r\n'
+        ).encode('utf-8')
+
+        # Define the closing boundary
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        # Properties
+        self.length = len(head) + file_length + len(tail)
+        self.parts = self._iterate(head, file_chunks, tail)
+
+    # MARK: Iterate
+    def _iterate(self, head: bytes, file_chunks, tail: bytes):
+        yield head
+        for chunk in file_chunks:
+            yield chunk
+        yield tail
+
+    # MARK: Length
+    def __len__(self):
+        return self.length
+
+    # MARK: Iter
+    def __iter__(self):
+        # Yield the remaining buffer first
+        if self.buffer:
+            buffer, self.buffer = self.buffer, b''
+            yield buffer
+        yield from self.parts
+
+    # MARK: Read
+    def read(self, size: int = -1) -> bytes:
+        # Fill the buffer until the size is reached
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.parts)
+            except StopIteration:
+                break
+
+        # Return the requested bytes
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+# MARK: EvURLEncodedStream
+class EvURLEncodedStream(EvMultipartStream):
+    '''
+    Custom application/x-www-form-urlencoded body that is generated while it is sent,
+    like `requests` encode the dict body. The file is percent-encoded chunk by chunk
+    as the last field, its encoded length is counted from the file before sending.
+
+    Args:
+    - fields: dict: Text fields of the form.
+    - file_name: str: Name of the file field.
+    - file_path: str: Path of the file content.
+    - chunk_size: int: Number of bytes read per chunk.
+    '''
+    # MARK: Properties
+    def __init__(self, fields: dict, file_name: str, file_path: str, chunk_size: int = 65536):
+        # Properties
+        self.content_type = 'application/x-www-form-urlencoded'
+        self.buffer = b''
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+
+        # Define the text fields, then the name of the file field
+        head = urlencode([(key, value) for key, value in fields.items() if value is not None], doseq = True)
+        head = f"{head}&{quote_plus(file_name)}=" if head else f"{quote_plus(file_name)}="
+
+        # Count the encoded length, the safe byte and the space are one character, the others are three
+        file_length = sum(int(URLENCODED_LENGTH[np.frombuffer(chunk, dtype = np.uint8)].sum()) for chunk in self._read_file())
+
+        # Properties
+        self.length = len(head) + file_length
+        self.parts = self._iterate(head.encode('ascii'), (quote_plus(chunk).encode('ascii') for chunk in self._read_file()), b'')
+
+    # MARK: ReadFile
+    def _read_file(self):
+        with open(self.file_path, 'rb') as file:
+            while True:
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
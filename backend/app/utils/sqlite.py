@@ -0,0 +1,39 @@
+# MARK: Import
+# Dependency
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# MARK: ConnectSQLite
+@contextmanager
+def connect_sqlite(path: str):
+    '''
+    Custom function to open a SQLite connection shared by the gunicorn workers. The
+    database use WAL journal, so the readers are not blocked by the writer, and wait
+    for the lock instead of failing when another worker is writing. The connection
+    is in autocommit mode and closed when the context is exited.
+
+    Args:
+    - path: str: Path to the SQLite database.
+
+    Returns:
+    - sqlite3.Connection: The SQLite connection.
+    '''
+    # Make sure the directory exists
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+
+    # Open the connection
+    connection = sqlite3.connect(path, timeout = 30, isolation_level = None)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute('PRAGMA busy_timeout=30000')
+
+    try:
+        # Use the connection
+        yield connection
+    finally:
+        # Close the connection
+        connection.close()
@@ -0,0 +1,97 @@
+# MARK: Import
+# Dependency
+import json
+
+# MARK: SSEEvent
+def sse_event(event: str, data) -> str:
+    '''
+    Custom function to format a Server-Sent Event.
+
+    Args:
+    - event: str: Name of the event.
+    - data: Any: JSON data of the event.
+
+    Returns:
+    - str: The event text.
+    '''
+    return f"event: {event}\ndata: {json.dumps(data, default = str)}\n\n"
+
+# MARK: EvJSONMemberParser
+class EvJSONMemberParser:
+    '''
+    Custom incremental parser of a streamed JSON object. The text is fed while it
+    is generated, and every top level member is returned as soon as its value is
+    complete, so the caller don't wait for the whole object.
+
+    Example: Feeding `{"a": {"b": 1}, "c"` return `[('a', {'b': 1})]`.
+    '''
+    # MARK: Properties
+    def __init__(self):
+        # Properties
+        self.text = ''
+        self.position = 0
+        self.depth = 0
+        self.member_start = None
+        self.in_string = False
+        self.escaped = False
+
+    # MARK: Feed
+    def feed(self, delta: str) -> list:
+        '''
+        Custom function to parse the next part of the JSON text.
+
+        Args:
+        - delta: str: The next part of the JSON text.
+
+        Returns:
+        - list: The completed top level members as `(key, value)`.
+        '''
+        self.text += delta
+        members = []
+
+        while self.position < len(self.text):
+            character = self.text[self.position]
+
+            # Skip the content of the string
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif character == '\\':
+                    self.escaped = True
+                elif character == '"':
+                    self.in_string = False
+
+            elif character == '"':
+                self.in_string = True
+
+            elif character in '{[':
+                self.depth += 1
+
+                # The first member start after the top level object
+                if self.depth == 1:
+                    self.member_start = self.position + 1
+
+            elif character in '}]':
+                # The top level object is closed
+                if self.depth == 1:
+                    members.extend(self._parse_member(self.position))
+                    self.member_start = None
+                self.depth -= 1
+
+            elif character == ',' and self.depth == 1:
+                # The top level member is completed
+                members.extend(self._parse_member(self.position))
+                self.member_start = self.position + 1
+
+            self.position += 1
+
+        return members
+
+    # MARK: ParseMember
+    def _parse_member(self, end: int) -> list:
+        # Parse the text of the member as an object
+        member = self.text[self.member_start:end].strip()
+        if member == '':
+            return []
+
+        return list(json.loads('{' + member + '}').items())
@@ -0,0 +1,50 @@
+# MARK: Import
+# Dependency
+import copy
+
+# MARK: ShiftTranscription
+def shift_transcription(result: dict, offset: float) -> dict:
+    '''
+    Custom function to move the timestamps of the transcription, so the transcription
+    of a part of the audio follow the timeline of the whole audio.
+
+    Args:
+    - result: dict: The whisper transcription result of the part.
+    - offset: float: Start of the part in the whole audio in seconds.
+
+    Returns:
+    - dict: The transcription result with the moved timestamps.
+    '''
+    result = copy.deepcopy(result)
+
+    for segment in result.get('segments', []):
+        segment['start'] += offset
+        segment['end'] += offset
+        for word in segment.get('words', []):
+            word['start'] += offset
+            word['end'] += offset
+
+    return result
+
+# MARK: MergeTranscriptions
+def merge_transcriptions(results: list) -> dict:
+    '''
+    Custom function to join the transcriptions of the parts of the audio in their
+    order. The timestamps must already follow the timeline of the whole audio.
+
+    Args:
+    - results: list: The whisper transcription results of the parts.
+
+    Returns:
+    - dict: The whisper transcription result of the whole audio.
+    '''
+    segments = []
+    for result in results:
+        for segment in result.get('segments', []):
+            segments.append({**segment, 'id': len(segments)})
+
+    return {
+        'text': ''.join(result.get('text', '') for result in results),
+        'segments': segments,
+        'language': next((result['language'] for result in results if result.get('language')), 'en'),
+    }
@@ -0,0 +1,8 @@
+# MARK: Import
+from app.services.asr_inference_service import run_inference_server
+
+# MARK: Main
+# Main entry point for the ASR inference server, run next to the gunicorn
+# workers with `ASR_INFERENCE_MODE=server` to share the Whisper weights
+if __name__ == '__main__':
+    run_inference_server()
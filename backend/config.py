@@ -16,10 +16,37 @@ class EvIELTSConfig:
 
     # MARK: AI
     whisper_model = os.getenv('WHISPER_MODEL')
+    asr_backend = os.getenv('ASR_BACKEND', 'whisper')
+    asr_compute_type = os.getenv('ASR_COMPUTE_TYPE', 'int8')
+    asr_cpu_threads = int(os.getenv('ASR_CPU_THREADS', 0))
+    asr_lazy_load = os.getenv('ASR_LAZY_LOAD', '0') == '1'
     chatgpt_model = os.getenv('CHATGPT_MODEL')
     openai_api_key = os.getenv('OPENAI_API_KEY')
     chatgpt_feedback_model = os.getenv('CHATGPT_FEEDBACK_MODEL')
     chatgpt_whisper_model = os.getenv('CHATGPT_WHISPER_MODEL')
+    chatgpt_transcribe_pipeline = os.getenv('CHATGPT_TRANSCRIBE_PIPELINE', '1') == '1'
+    chatgpt_pipeline_workers = int(os.getenv('CHATGPT_PIPELINE_WORKERS', 4))
+    chatgpt_parallel_evaluation = os.getenv('CHATGPT_PARALLEL_EVALUATION', '0') == '1'
+    chatgpt_evaluation_workers = int(os.getenv('CHATGPT_EVALUATION_WORKERS', 16))
+    
+    # MARK: OpenAI Client
+    openai_max_connections = int(os.getenv('OPENAI_MAX_CONNECTIONS', 20))
+    openai_max_keepalive_connections = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10))
+    openai_keepalive_expiry = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60))
+    openai_timeout = float(os.getenv('OPENAI_TIMEOUT', 120))
+    openai_connect_timeout = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 10))
+    openai_max_retries = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+
+    # MARK: ASR Inference
+    asr_inference_mode = os.getenv('ASR_INFERENCE_MODE', 'local')
+    asr_inference_address = os.getenv('ASR_INFERENCE_ADDRESS', '/tmp/ev_asr.sock')
+    asr_inference_hosts = int(os.getenv('ASR_INFERENCE_HOSTS', 1))
+    asr_inference_authkey = os.getenv('ASR_INFERENCE_AUTHKEY', '')
+    asr_inference_timeout = int(os.getenv('ASR_INFERENCE_TIMEOUT', 300))
+    asr_batch_enabled = os.getenv('ASR_BATCH_ENABLED', '0') == '1'
+    asr_batch_max_size = int(os.getenv('ASR_BATCH_MAX_SIZE', 8))
+    asr_batch_max_wait_ms = int(os.getenv('ASR_BATCH_MAX_WAIT_MS', 50))
+    asr_batch_timeout = float(os.getenv('ASR_BATCH_TIMEOUT', 300))
     
     # MARK: Prompt
     evaluation_feedback_prompt = os.getenv('EVALUATION_FEEDBACK_PROMPT')
@@ -29,6 +56,80 @@ class EvIELTSConfig:
     audio_clean_extension = 'wav'
     audio_clean_sample_rate = 16000
     audio_clean_channels = 1
+    audio_decoder_workers = int(os.getenv('AUDIO_DECODER_WORKERS', 2))
+    audio_decode_timeout = int(os.getenv('AUDIO_DECODE_TIMEOUT', 60))
+    audio_pyav_max_bytes = int(os.getenv('AUDIO_PYAV_MAX_BYTES', 20 * 1024 * 1024))
+
+    # MARK: VAD
+    vad_threshold = float(os.getenv('VAD_THRESHOLD', 0.5))
+    vad_min_speech_ms = int(os.getenv('VAD_MIN_SPEECH_MS', 250))
+    vad_min_silence_ms = int(os.getenv('VAD_MIN_SILENCE_MS', 100))
+    vad_speech_pad_ms = int(os.getenv('VAD_SPEECH_PAD_MS', 30))
+    vad_torch_threads = int(os.getenv('VAD_TORCH_THREADS', 0))
+    vad_batch_max_size = int(os.getenv('VAD_BATCH_MAX_SIZE', 8))
+    vad_batch_max_wait_ms = int(os.getenv('VAD_BATCH_MAX_WAIT_MS', 5))
+    vad_batch_timeout = float(os.getenv('VAD_BATCH_TIMEOUT', 60))
+    vad_silence_compression = os.getenv('VAD_SILENCE_COMPRESSION', '0') == '1'
+    vad_max_silence = float(os.getenv('VAD_MAX_SILENCE', 1.0))
+
+    # MARK: Chunking
+    chunking_enabled = os.getenv('CHUNKING_ENABLED', '0') == '1'
+    chunk_max_seconds = float(os.getenv('CHUNK_MAX_SECONDS', 28))
+    chunk_min_audio_seconds = float(os.getenv('CHUNK_MIN_AUDIO_SECONDS', 40))
+    chunk_workers = int(os.getenv('CHUNK_WORKERS', 4))
+
+    # MARK: Stream
+    stream_max_bytes = int(os.getenv('STREAM_MAX_BYTES', 50 * 1024 * 1024))
+    stream_read_size = int(os.getenv('STREAM_READ_SIZE', 16384))
+    stream_vad_interval = float(os.getenv('STREAM_VAD_INTERVAL', 0.5))
+    stream_min_silence = float(os.getenv('STREAM_MIN_SILENCE', 0.7))
+    stream_max_segment = float(os.getenv('STREAM_MAX_SEGMENT', 28))
+    stream_workers = int(os.getenv('STREAM_WORKERS', 2))
+
+    # MARK: Storage
+    storage_directory = os.getenv('STORAGE_DIRECTORY', '/tmp/ev_ielts')
+
+    # MARK: Job
+    job_store_path = os.getenv('JOB_STORE_PATH', os.path.join(storage_directory, 'jobs.sqlite3'))
+    job_workers = int(os.getenv('JOB_WORKERS', 4))
+    job_ttl_seconds = int(os.getenv('JOB_TTL_SECONDS', 86400))
+    job_callback_timeout = int(os.getenv('JOB_CALLBACK_TIMEOUT', 10))
+    job_callback_allowed_hosts = [host.strip().lower() for host in os.getenv('JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()]
+    # The queue is per gunicorn worker, the server accept up to `workers * job_queue_size` jobs
+    job_queue_size = int(os.getenv('JOB_QUEUE_SIZE', 64))
+
+    # MARK: Cache
+    cache_enabled = os.getenv('CACHE_ENABLED', '1') == '1'
+    cache_store_path = os.getenv('CACHE_STORE_PATH', os.path.join(storage_directory, 'cache.sqlite3'))
+    cache_ttl_seconds = int(os.getenv('CACHE_TTL_SECONDS', 86400))
+    cache_max_entries = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+
+    # MARK: Settings
+    settings_store_path = os.getenv('SETTINGS_STORE_PATH', os.path.join(storage_directory, 'settings.sqlite3'))
+    settings_poll_interval = float(os.getenv('SETTINGS_POLL_INTERVAL', 2))
+
+    # MARK: Idempotency
+    idempotency_store_path = os.getenv('IDEMPOTENCY_STORE_PATH', os.path.join(storage_directory, 'idempotency.sqlite3'))
+    idempotency_ttl_seconds = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+    idempotency_wait_timeout = int(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 300))
+    idempotency_poll_interval = float(os.getenv('IDEMPOTENCY_POLL_INTERVAL', 0.2))
+
+    # MARK: Callback
+    callback_base_url = os.getenv('CALLBACK_BASE_URL', 'https://englishvit.com/api/user/ielts-ai')
+    callback_workers = int(os.getenv('CALLBACK_WORKERS', 2))
+    callback_pool_size = int(os.getenv('CALLBACK_POOL_SIZE', 10))
+    callback_queue_size = int(os.getenv('CALLBACK_QUEUE_SIZE', 1000))
+    callback_queue_max_bytes = int(os.getenv('CALLBACK_QUEUE_MAX_BYTES', 256 * 1024 * 1024))
+    callback_timeout = float(os.getenv('CALLBACK_TIMEOUT', 30))
+    callback_max_retries = int(os.getenv('CALLBACK_MAX_RETRIES', 5))
+    callback_backoff_seconds = float(os.getenv('CALLBACK_BACKOFF_SECONDS', 1))
+    callback_spool_directory = os.getenv('CALLBACK_SPOOL_DIRECTORY', os.path.join(storage_directory, 'callback_spool'))
+    callback_spool_interval = int(os.getenv('CALLBACK_SPOOL_INTERVAL', 60))
+    callback_audio_encoding = os.getenv('CALLBACK_AUDIO_ENCODING', 'wav')
+    callback_audio_bitrate = int(os.getenv('CALLBACK_AUDIO_BITRATE', 32000))
+
+    # MARK: Startup
+    startup_parallel = os.getenv('STARTUP_PARALLEL', '1') == '1'
 
     # MARK: Logging
     log_level = os.getenv('LOG_LEVEL')
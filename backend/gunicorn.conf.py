@@ -0,0 +1,30 @@
+# MARK: Import
+# Dependencies
+import os
+
+# MARK: Server
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+
+# Load the app once in the master, the workers share the model weights with copy on write
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+# MARK: OnStarting
+def on_starting(server):
+    # Fail the jobs left by the previous server once, before the workers run new jobs
+    from app.services.job_service import job_service
+
+    job_service.fail_stale_jobs()
+
+# MARK: PostFork
+def post_fork(server, worker):
+    # Restart the background threads, the threads of the master are not copied by fork
+    from app.services.callback_service import callback_service
+    from app.services.settings_service import settings_service
+
+    callback_service.start()
+
+    # The settings are applied by `create_app` if the app is not preloaded
+    if settings_service.app is not None:
+        settings_service.start(settings_service.app)
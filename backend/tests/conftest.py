@@ -0,0 +1,12 @@
+# MARK: Import
+# Dependencies
+import os
+import sys
+import tempfile
+
+# Keep the SQLite stores of the services out of the real storage directory,
+# the services create them when they are imported
+os.environ.setdefault('STORAGE_DIRECTORY', tempfile.mkdtemp(prefix = 'ev_ielts_test_'))
+
+# Import the app modules from the backend directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,52 @@
+# MARK: Import
+# Dependencies
+import threading
+import numpy as np
+import pytest
+
+# Modules
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.services.asr_batch_scheduler import EvASRBatchScheduler
+from app.utils.exception import EvServerException
+
+# MARK: Fixtures
+@pytest.fixture
+def scheduler():
+    return EvASRBatchScheduler(
+        model_provider = lambda: None,
+        model_lock = threading.Lock(),
+        fallback_transcribe = lambda model, audio_buffer, initial_prompt: None,
+    )
+
+@pytest.fixture
+def audio_buffer():
+    return EvAudioBufferModel(samples = np.zeros(16000, dtype = np.float32), sample_rate = 16000)
+
+# MARK: Tests
+def test_hung_batch_time_out(scheduler, audio_buffer, monkeypatch):
+    # The batch never finish, the request must not wait forever
+    released = threading.Event()
+    monkeypatch.setattr(scheduler, 'timeout', 0.2)
+    monkeypatch.setattr(scheduler, '_run_batch', lambda initial_prompt, items: released.wait(5))
+
+    with pytest.raises(EvServerException):
+        scheduler.transcribe(audio_buffer = audio_buffer, initial_prompt = None)
+
+    released.set()
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_stopped_thread_fail_pending_jobs(scheduler, audio_buffer, monkeypatch):
+    # The thread stop in the batch, the job is failed instead of waiting for the timeout
+    def stop(initial_prompt, items):
+        raise SystemExit()
+
+    monkeypatch.setattr(scheduler, '_run_batch', stop)
+
+    future = scheduler.submit(audio_buffer = audio_buffer, initial_prompt = None)
+    with pytest.raises(EvServerException):
+        future.result(timeout = 5)
+
+    # The next job start a new thread
+    scheduler.thread.join(5)
+    monkeypatch.setattr(scheduler, '_run_batch', lambda initial_prompt, items: [item[2].set_result({"text": " ok"}) for item in items])
+    assert scheduler.transcribe(audio_buffer = audio_buffer, initial_prompt = None) == {"text": " ok"}
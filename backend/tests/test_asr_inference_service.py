@@ -0,0 +1,89 @@
+# MARK: Import
+# Dependencies
+import threading
+import numpy as np
+import pytest
+from multiprocessing.connection import Listener
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvServerException
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.services import asr_inference_service
+from app.services.asr_backend import EvASRBackend
+
+# MARK: EvCountingBackend
+class EvCountingBackend(EvASRBackend):
+    # Properties
+    name = "counting"
+
+    def __init__(self):
+        self.load_count = 0
+        self.transcribe_count = 0
+
+    def load(self, model_name: str):
+        self.load_count += 1
+        return object()
+
+    def transcribe(self, model, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        self.transcribe_count += 1
+        return {
+            "text": f" {len(audio_buffer.samples)} samples",
+            "segments": [],
+            "language": "en",
+        }
+
+# MARK: Fixtures
+@pytest.fixture
+def server_config(tmp_path, monkeypatch):
+    # Same config as `asr_server.py` next to the workers in the server mode
+    monkeypatch.setattr(EvIELTSConfig, 'asr_inference_mode', 'server')
+    monkeypatch.setattr(EvIELTSConfig, 'asr_inference_address', str(tmp_path / 'asr.sock'))
+    monkeypatch.setattr(EvIELTSConfig, 'asr_inference_hosts', 1)
+    monkeypatch.setattr(EvIELTSConfig, 'asr_inference_authkey', 'test-authkey')
+    monkeypatch.setattr(EvIELTSConfig, 'asr_inference_timeout', 10)
+
+# MARK: Tests
+def test_host_service_is_local(server_config):
+    host_service = asr_inference_service._create_host_service()
+
+    assert host_service.inference_mode == 'local'
+    assert host_service.inference_client is None
+
+def test_host_transcribe_job(server_config):
+    # Start one model host with the local service
+    host_service = asr_inference_service._create_host_service()
+    host_service.backend = EvCountingBackend()
+    host_service.batch_scheduler = None
+    host_service.load()
+
+    listener = Listener(asr_inference_service.get_host_address(0), authkey = asr_inference_service.get_authkey())
+    threading.Thread(
+        target = asr_inference_service._serve,
+        args = (listener, host_service),
+        daemon = True,
+    ).start()
+
+    try:
+        # Send one job like a gunicorn worker
+        client = asr_inference_service.EvASRInferenceClient()
+        result = client.transcribe(
+            audio_buffer = EvAudioBufferModel(samples = np.zeros(16000, dtype = np.float32), sample_rate = 16000),
+            initial_prompt = "",
+        )
+    finally:
+        listener.close()
+
+    # The host transcribe with its own weights instead of sending the job back
+    assert result["text"] == " 16000 samples"
+    assert host_service.backend.load_count == 1
+    assert host_service.backend.transcribe_count == 1
+
+def test_authkey_is_required(server_config, monkeypatch):
+    monkeypatch.setattr(EvIELTSConfig, 'asr_inference_authkey', '')
+
+    with pytest.raises(EvServerException):
+        asr_inference_service.EvASRInferenceClient()
+
+    with pytest.raises(EvServerException):
+        asr_inference_service.run_inference_server()
@@ -0,0 +1,77 @@
+# MARK: Import
+# Dependencies
+import numpy as np
+import pytest
+
+# Modules
+from config import EvIELTSConfig
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.services.asr_backend import EvASRBackend
+from app.services.asr_service import EvASRService
+from app.services.vad_service import vad_service
+
+# MARK: EvNamedBackend
+class EvNamedBackend(EvASRBackend):
+    # Properties
+    name = "named"
+    available_models = ["tiny", "base"]
+
+    def __init__(self):
+        self.loaded_models = []
+
+    def load(self, model_name: str):
+        self.loaded_models.append(model_name)
+        return model_name
+
+    def transcribe(self, model, audio_buffer: EvAudioBufferModel, initial_prompt: str) -> dict:
+        return {"text": f" {model}", "segments": [], "language": "en"}
+
+# MARK: Fixtures
+@pytest.fixture
+def service(monkeypatch):
+    # Local service with the lazy load and without batching
+    monkeypatch.setattr(EvIELTSConfig, 'whisper_model', 'tiny')
+    monkeypatch.setattr(EvIELTSConfig, 'asr_batch_enabled', False)
+
+    service = EvASRService(inference_mode = 'local')
+    service.backend = EvNamedBackend()
+    service.batch_scheduler = None
+    return service
+
+# MARK: Tests
+def test_update_model_before_load_is_lazy(service):
+    # The saved setting is applied before the first request
+    service.update_model(model_name = 'base')
+
+    assert service.backend.loaded_models == []
+    assert service.model_name == 'base'
+
+    # The first load use the saved model only
+    service.load()
+    assert service.backend.loaded_models == ['base']
+
+def test_chunk_is_transcribed_once(service, monkeypatch):
+    # The parts are shorter than the chunked audio, they must not be split again
+    monkeypatch.setattr(service, 'chunking', True)
+    monkeypatch.setattr(service, 'chunk_min_audio_seconds', 10.0)
+    monkeypatch.setattr(service, 'chunk_max_seconds', 28.0)
+    monkeypatch.setattr(service, 'batch_scheduler', type('Scheduler', (), {'can_batch': lambda self, audio_buffer: False})())
+    monkeypatch.setattr(vad_service, 'detect_speech', lambda audio_buffer: [{'start': start + 1.0, 'end': start + 8.0} for start in range(0, 60, 10)])
+
+    transcribed = []
+    monkeypatch.setattr(service.backend, 'transcribe', lambda model, audio_buffer, initial_prompt: transcribed.append(len(audio_buffer.samples)) or {
+        "text": " part",
+        "segments": [],
+        "language": "en",
+    })
+
+    result = service.transcribe(EvAudioBufferModel(samples = np.zeros(60 * 16000, dtype = np.float32), sample_rate = 16000))
+
+    assert sorted(transcribed) == sorted([int(19.5 * 16000), 20 * 16000, int(20.5 * 16000)])
+    assert result["text"] == " part part part"
+
+def test_local_chunking_require_batching(service, monkeypatch):
+    # Without batching the parts would wait for the model lock one by one
+    monkeypatch.setattr(service, 'chunking', True)
+
+    assert service._can_chunk() is False
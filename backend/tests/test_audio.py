@@ -0,0 +1,97 @@
+# MARK: Import
+# Dependencies
+import numpy as np
+import pytest
+
+# Modules
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.utils.audio import compress_silence, remap_time, split_on_pauses
+
+# MARK: Constants
+SAMPLE_RATE = 16000
+
+# MARK: Fixtures
+@pytest.fixture
+def audio_buffer():
+    # Every sample is its own position, so the kept parts can be checked
+    samples = np.arange(10 * SAMPLE_RATE, dtype = np.float32)
+    return EvAudioBufferModel(samples = samples, sample_rate = SAMPLE_RATE)
+
+# MARK: CompressSilence
+def test_compress_silence_keep_padded_speech(audio_buffer):
+    speech_timestamps = [{'start': 1.0, 'end': 2.0}, {'start': 7.0, 'end': 8.0}]
+
+    compressed_buffer, timeline = compress_silence(audio_buffer, speech_timestamps, 1.0)
+
+    # Half of the longest silence is kept on each side of the speech
+    assert len(compressed_buffer.samples) == 4 * SAMPLE_RATE
+    assert timeline == [(0.0, 0.5), (2.0, 6.5)]
+    assert compressed_buffer.samples[0] == 0.5 * SAMPLE_RATE
+    assert compressed_buffer.samples[2 * SAMPLE_RATE] == 6.5 * SAMPLE_RATE
+
+def test_compress_silence_merge_close_speech(audio_buffer):
+    speech_timestamps = [{'start': 1.0, 'end': 2.0}, {'start': 2.6, 'end': 3.0}]
+
+    compressed_buffer, timeline = compress_silence(audio_buffer, speech_timestamps, 1.0)
+
+    assert timeline == [(0.0, 0.5)]
+    assert len(compressed_buffer.samples) == 3 * SAMPLE_RATE
+
+def test_compress_silence_without_speech(audio_buffer):
+    compressed_buffer, timeline = compress_silence(audio_buffer, [], 1.0)
+
+    assert len(compressed_buffer.samples) == 0
+    assert timeline == []
+
+# MARK: RemapTime
+def test_remap_time():
+    timeline = [(0.0, 0.5), (2.0, 6.5)]
+
+    assert remap_time(0.0, timeline) == 0.5
+    assert remap_time(0.7, timeline) == 1.2
+    assert remap_time(2.0, timeline) == 6.5
+    assert remap_time(2.5, timeline) == 7.0
+
+def test_remap_time_follow_compress_silence(audio_buffer):
+    speech_timestamps = [{'start': 1.0, 'end': 2.0}, {'start': 7.0, 'end': 8.0}]
+    compressed_buffer, timeline = compress_silence(audio_buffer, speech_timestamps, 1.0)
+
+    # The sample of the compressed audio is the sample of the original audio at the remapped time
+    for time in [0.25, 1.5, 2.75, 3.9]:
+        sample = compressed_buffer.samples[int(time * SAMPLE_RATE)]
+        assert remap_time(time, timeline) == pytest.approx(sample / SAMPLE_RATE, abs = 1e-3)
+
+# MARK: SplitOnPauses
+def _speech_every_ten_seconds(seconds: int) -> list:
+    # One 7 seconds speech in every 10 seconds
+    return [{'start': start + 1.0, 'end': start + 8.0} for start in range(0, seconds, 10)]
+
+def test_split_on_pauses_cut_in_the_last_pause():
+    audio_buffer = EvAudioBufferModel(samples = np.zeros(60 * SAMPLE_RATE, dtype = np.float32), sample_rate = SAMPLE_RATE)
+
+    parts = split_on_pauses(audio_buffer, _speech_every_ten_seconds(60), 28)
+
+    # The pauses are in the middle of 8 and 11 seconds, like 9.5 and 19.5 seconds
+    assert parts == [(0, int(19.5 * SAMPLE_RATE)), (int(19.5 * SAMPLE_RATE), int(39.5 * SAMPLE_RATE)), (int(39.5 * SAMPLE_RATE), 60 * SAMPLE_RATE)]
+
+def test_split_on_pauses_cover_the_whole_audio():
+    audio_buffer = EvAudioBufferModel(samples = np.zeros(95 * SAMPLE_RATE, dtype = np.float32), sample_rate = SAMPLE_RATE)
+
+    parts = split_on_pauses(audio_buffer, _speech_every_ten_seconds(95), 28)
+
+    assert parts[0][0] == 0
+    assert parts[-1][1] == 95 * SAMPLE_RATE
+    assert all(end == next_start for (_, end), (next_start, _) in zip(parts, parts[1:]))
+    assert all(end - start <= 28 * SAMPLE_RATE for start, end in parts)
+
+def test_split_on_pauses_cut_the_long_speech():
+    audio_buffer = EvAudioBufferModel(samples = np.zeros(40 * SAMPLE_RATE, dtype = np.float32), sample_rate = SAMPLE_RATE)
+
+    parts = split_on_pauses(audio_buffer, [{'start': 0.0, 'end': 40.0}], 28)
+
+    assert parts == [(0, 28 * SAMPLE_RATE), (28 * SAMPLE_RATE, 40 * SAMPLE_RATE)]
+
+def test_split_on_pauses_short_audio():
+    audio_buffer = EvAudioBufferModel(samples = np.zeros(10 * SAMPLE_RATE, dtype = np.float32), sample_rate = SAMPLE_RATE)
+
+    assert split_on_pauses(audio_buffer, _speech_every_ten_seconds(10), 28) == [(0, 10 * SAMPLE_RATE)]
@@ -0,0 +1,27 @@
+# MARK: Import
+# Dependencies
+import time
+import pytest
+
+# Modules
+from app.utils.exception import EvServerException
+from app.services import audio_service as audio_service_module
+from app.services.audio_service import audio_service
+
+# MARK: Tests
+def test_decode_stop_at_the_deadline(monkeypatch):
+    # The ffmpeg fallback must not start when the time limit is spent
+    monkeypatch.setattr(audio_service_module, 'normalize_audio', lambda **kwargs: pytest.fail('ffmpeg started after the deadline'))
+
+    with pytest.raises(EvServerException):
+        audio_service._decode_worker(b'not an audio file', 'mp3', time.monotonic() - 1)
+
+def test_oversized_audio_use_ffmpeg_with_timeout(monkeypatch):
+    # The oversized upload skip PyAV and the ffmpeg process get the rest of the time limit
+    calls = []
+    monkeypatch.setattr(audio_service, 'pyav_max_bytes', 4)
+    monkeypatch.setattr(audio_service, '_decode_with_pyav', lambda audio_data, deadline: pytest.fail('PyAV used for oversized audio'))
+    monkeypatch.setattr(audio_service_module, 'normalize_audio', lambda **kwargs: calls.append(kwargs) or 'audio_buffer')
+
+    assert audio_service._decode_worker(b'oversized', 'mp3', time.monotonic() + 10) == 'audio_buffer'
+    assert 0 < calls[0]['timeout'] <= 10
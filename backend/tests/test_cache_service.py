@@ -0,0 +1,54 @@
+# MARK: Import
+# Dependencies
+import numpy as np
+import pytest
+
+# Modules
+from app.services.cache_service import cache_service
+
+# MARK: Tests
+def test_make_key_with_request_parts():
+    samples = np.linspace(-1, 1, 16000, dtype = np.float32)
+
+    # The same parts as `ielts_service.transcribe` with the silence compression and the chunking
+    key = cache_service.make_key('transcribe', samples, 'whisper-1', 'prompt', 1.0, 28.0)
+
+    assert key.startswith('transcribe:')
+    assert key == cache_service.make_key('transcribe', samples.copy(), 'whisper-1', 'prompt', 1.0, 28.0)
+
+@pytest.mark.parametrize('part', ['text', b'bytes', np.zeros(4, dtype = np.float32), None, 1, 1.5, True])
+def test_make_key_accept_every_part_type(part):
+    assert cache_service.make_key('test', part) == cache_service.make_key('test', part)
+
+def test_make_key_parts_are_different():
+    keys = {
+        cache_service.make_key('test', 1),
+        cache_service.make_key('test', 1.0),
+        cache_service.make_key('test', '1'),
+        cache_service.make_key('test', None),
+        cache_service.make_key('test', ''),
+        cache_service.make_key('test', 'ab', 'c'),
+        cache_service.make_key('test', 'a', 'bc'),
+        cache_service.make_key('other', 1),
+    }
+
+    # The empty text and None are the same part, like before
+    assert len(keys) == 7
+
+def test_make_key_with_strided_array():
+    samples = np.linspace(-1, 1, 32000, dtype = np.float32)
+
+    # The strided view is hashed like its contiguous copy
+    assert cache_service.make_key('test', samples[::2]) == cache_service.make_key('test', samples[::2].copy())
+
+def test_make_key_array_dtype_and_shape_change_the_key():
+    samples = np.zeros(16, dtype = np.float32)
+
+    assert cache_service.make_key('test', samples) != cache_service.make_key('test', samples.view(np.int32))
+    assert cache_service.make_key('test', samples) != cache_service.make_key('test', samples.reshape(4, 4))
+
+def test_make_key_option_change_the_key():
+    samples = np.zeros(16000, dtype = np.float32)
+
+    assert cache_service.make_key('transcribe', samples, 1.0) != cache_service.make_key('transcribe', samples, 2.0)
+    assert cache_service.make_key('transcribe', samples, 1.0) != cache_service.make_key('transcribe', samples, None)
@@ -0,0 +1,133 @@
+# MARK: Import
+# Dependencies
+import os
+import time
+import queue
+from urllib.parse import parse_qs
+import numpy as np
+import pytest
+
+# Modules
+from config import EvIELTSConfig
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.services.callback_service import EvCallbackService
+
+# MARK: EvRecordingSession
+class EvRecordingSession:
+    # Properties
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.requests = []
+
+    def post(self, url, data = None, headers = None, timeout = None):
+        self.requests.append({'url': url, 'data': data, 'headers': headers})
+        return type('Response', (), {'status_code': self.status_code, 'text': ''})()
+
+# MARK: Fixtures
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Callback service with its own spool, the threads are not started
+    monkeypatch.setattr(EvIELTSConfig, 'callback_spool_directory', str(tmp_path / 'spool'))
+    monkeypatch.setattr(EvIELTSConfig, 'callback_audio_encoding', 'wav')
+    monkeypatch.setattr(EvIELTSConfig, 'callback_backoff_seconds', 5)
+
+    return EvCallbackService()
+
+def _payload(service: EvCallbackService) -> dict:
+    return {
+        'id': 'test',
+        'path': 'test/update/1',
+        'data': {'finished': 1, 'transcribe': 'hello'},
+        'headers': {'Authorization': 'Bearer token'},
+        'audio': EvAudioBufferModel(samples = np.zeros(1600, dtype = np.float32), sample_rate = 16000),
+        'audio_encoding': service.audio_encoding,
+        'attempt': 0,
+    }
+
+# MARK: Tests
+def test_wav_is_sent_as_form_field(service):
+    # Read the streamed body while it is sent, the audio file is removed after the delivery
+    service.session = EvRecordingSession(200)
+    service.session.post = lambda url, data = None, headers = None, timeout = None: service.session.requests.append({
+        'url': url,
+        'data': b''.join(data),
+        'length': len(data),
+        'headers': headers,
+    }) or type('Response', (), {'status_code': 200, 'text': ''})()
+
+    payload = _payload(service)
+    service._deliver(payload)
+
+    # The body is the same as the urlencoded dict body
+    request = service.session.requests[0]
+    form = parse_qs(request['data'].decode('ascii'), encoding = 'latin-1')
+    assert form['audio'][0].encode('latin-1')[:4] == b'RIFF'
+    assert form['finished'] == ['1']
+    assert request['length'] == len(request['data'])
+    assert request['headers']['Content-Type'] == 'application/x-www-form-urlencoded'
+    assert service.delivered_count == 1
+
+    # The audio is only on the disk while it is sent
+    assert payload['audio'] is None
+    assert not os.path.exists(payload['audio_path'])
+
+def test_compressed_audio_is_streamed_from_file(service, monkeypatch):
+    monkeypatch.setattr(service, 'audio_encoding', 'flac')
+    service.session = EvRecordingSession(503)
+
+    payload = _payload(service)
+    body = service._audio_body(payload)
+
+    # The multipart body read the encoded file
+    assert payload['audio_path'].endswith('.flac')
+    assert len(body) == len(b''.join(body))
+    assert body.content_type.startswith('multipart/form-data')
+
+def test_failed_delivery_is_spooled_for_retry(service):
+    service.session = EvRecordingSession(503)
+
+    start = time.time()
+    service._deliver(_payload(service))
+
+    # The worker don't wait for the backoff
+    assert time.time() - start < 1
+
+    # The payload is waiting in the spool until the retry is due
+    spool_path = os.path.join(service.spool_directory, 'test.json')
+    assert service._retry_at(spool_path) >= start + 5
+    assert service.next_retry_at == service._retry_at(spool_path)
+
+    payload = service._load_spool(spool_path)
+    assert payload['attempt'] == 1
+    assert payload['audio_path'].endswith('.wav')
+
+def test_spool_is_only_readable_by_owner(service):
+    service.session = EvRecordingSession(503)
+    service._deliver(_payload(service))
+
+    # The spool has the `Authorization` header
+    assert os.stat(service.spool_directory).st_mode & 0o777 == 0o700
+    for name in os.listdir(service.spool_directory):
+        assert os.stat(os.path.join(service.spool_directory, name)).st_mode & 0o777 == 0o600
+
+def test_queue_is_limited_by_audio_bytes(service, monkeypatch):
+    # Queue without the workers, the limit fit one audio only
+    monkeypatch.setattr(service, 'threads_pid', os.getpid())
+    monkeypatch.setattr(service, 'queue', queue.Queue())
+    monkeypatch.setattr(service, 'queue_max_bytes', 1600 * 4)
+
+    audio_buffer = EvAudioBufferModel(samples = np.zeros(1600, dtype = np.float32), sample_rate = 16000)
+    service.dispatch('test/update/1', {'finished': 1}, audio_buffer = audio_buffer)
+    service.dispatch('test/update/2', {'finished': 1}, audio_buffer = audio_buffer)
+
+    # The second audio is spooled instead of held in memory
+    assert service.queue.qsize() == 1
+    assert service.queued_bytes == 1600 * 4
+    assert len([name for name in os.listdir(service.spool_directory) if name.endswith('.json')]) == 1
+
+    # The memory is free after the delivery
+    service.session = EvRecordingSession(200)
+    payload = service.queue.get()
+    service._deliver(payload)
+    service._release_memory(payload)
+    assert service.queued_bytes == 0
@@ -0,0 +1,60 @@
+# MARK: Import
+# Dependencies
+import io
+import pytest
+from flask import Flask, jsonify
+
+# Modules
+from config import EvIELTSConfig
+from app.services.idempotency_service import EvIdempotencyService
+
+# MARK: Fixtures
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Idempotency service with its own store
+    monkeypatch.setattr(EvIELTSConfig, 'idempotency_store_path', str(tmp_path / 'idempotency.sqlite3'))
+    service = EvIdempotencyService()
+
+    app = Flask(__name__)
+    app.run_count = 0
+
+    @app.route('/evaluation', methods = ['POST'])
+    @service.idempotent
+    def evaluation():
+        app.run_count += 1
+        return jsonify({'run': app.run_count}), 200
+
+    client = app.test_client()
+    client.application = app
+    return client
+
+def _post(client, headers: dict = None):
+    return client.post(
+        '/evaluation',
+        data = {'test_id': '1', 'question': 'Question', 'file': (io.BytesIO(b'audio'), 'audio.wav')},
+        headers = headers or {},
+        content_type = 'multipart/form-data',
+    )
+
+# MARK: Tests
+def test_duplicate_request_is_replayed(client):
+    first = _post(client, {'Authorization': 'Bearer a'})
+    second = _post(client, {'Authorization': 'Bearer a'})
+
+    assert second.get_json() == first.get_json()
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert client.application.run_count == 1
+
+def test_other_authorization_is_not_replayed(client):
+    _post(client, {'Authorization': 'Bearer a'})
+    response = _post(client, {'Authorization': 'Bearer b'})
+
+    assert 'Idempotent-Replayed' not in response.headers
+    assert client.application.run_count == 2
+
+def test_no_cache_is_not_replayed(client):
+    _post(client, {'Authorization': 'Bearer a'})
+    response = _post(client, {'Authorization': 'Bearer a', 'Cache-Control': 'no-cache'})
+
+    assert 'Idempotent-Replayed' not in response.headers
+    assert client.application.run_count == 2
@@ -0,0 +1,68 @@
+# MARK: Import
+# Dependencies
+import json
+import numpy as np
+import pytest
+
+# Modules
+from app.models.audio_buffer_model import EvAudioBufferModel
+from app.models.response_transcribe_model import EvResponseTranscribeModel
+from app.services.ielts_services import ielts_service
+
+# MARK: Constants
+SAMPLE_RATE = 16000
+
+# MARK: Fixtures
+@pytest.fixture
+def uploads(monkeypatch):
+    # Transcription of the uploaded wav instead of OpenAI, the words are on the compressed timeline
+    uploads = []
+
+    def create_transcription(audio_file):
+        uploads.append(audio_file)
+        return EvResponseTranscribeModel(
+            transcribe = "hello world",
+            word_timestamp = json.dumps([
+                {'word': 'hello', 'start': 0.6, 'end': 0.9},
+                {'word': 'world', 'start': 2.2, 'end': 2.5},
+            ]),
+        )
+
+    monkeypatch.setattr(ielts_service, 'chatgpt_whisper_model_name', 'whisper-1')
+    monkeypatch.setattr(ielts_service, '_create_transcription', create_transcription)
+    monkeypatch.setattr(ielts_service, '_detect_speech', lambda audio_buffer: [{'start': 1.0, 'end': 2.0}, {'start': 7.0, 'end': 8.0}])
+    return uploads
+
+@pytest.fixture
+def audio_buffer():
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, 10 * SAMPLE_RATE).astype(np.float32)
+    return EvAudioBufferModel(samples = samples, sample_rate = SAMPLE_RATE)
+
+# MARK: Tests
+def test_transcribe_with_silence_compression(monkeypatch, uploads, audio_buffer):
+    monkeypatch.setattr(ielts_service, 'silence_compression', True)
+    monkeypatch.setattr(ielts_service, 'max_silence', 1.0)
+    monkeypatch.setattr(ielts_service, 'chunking', False)
+
+    transcribe_data = ielts_service.transcribe(audio_buffer, use_cache = False)
+
+    # Only 4 seconds are uploaded, the words are moved back to the original audio
+    assert len(uploads) == 1
+    assert len(uploads[0][1]) == 44 + 4 * SAMPLE_RATE * 2
+    assert transcribe_data.transcribe == "hello world"
+    assert [(word['start'], word['end']) for word in json.loads(transcribe_data.word_timestamp)] == [(1.1, 1.4), (6.7, 7.0)]
+
+def test_transcribe_with_chunking(monkeypatch, uploads):
+    monkeypatch.setattr(ielts_service, 'silence_compression', False)
+    monkeypatch.setattr(ielts_service, 'chunking', True)
+    monkeypatch.setattr(ielts_service, 'chunk_max_seconds', 28.0)
+    monkeypatch.setattr(ielts_service, 'chunk_min_audio_seconds', 40.0)
+    monkeypatch.setattr(ielts_service, '_detect_speech', lambda audio_buffer: [{'start': start + 1.0, 'end': start + 8.0} for start in range(0, 60, 10)])
+    audio_buffer = EvAudioBufferModel(samples = np.zeros(60 * SAMPLE_RATE, dtype = np.float32), sample_rate = SAMPLE_RATE)
+
+    transcribe_data = ielts_service.transcribe(audio_buffer, use_cache = False)
+
+    # The parts are cut on the pauses at 19.5 and 39.5 seconds, the words follow the whole audio
+    assert len(uploads) == 3
+    assert transcribe_data.transcribe == "hello world hello world hello world"
+    assert [word['start'] for word in json.loads(transcribe_data.word_timestamp)] == [0.6, 2.2, 20.1, 21.7, 40.1, 41.7]
@@ -0,0 +1,113 @@
+# MARK: Import
+# Dependencies
+import time
+import socket
+import threading
+import pytest
+import requests
+
+# Modules
+from config import EvIELTSConfig
+from app.utils.exception import EvClientException, EvServiceUnavailableException
+from app.utils.sqlite import connect_sqlite
+from app.services.job_service import EvJobService
+
+# MARK: Fixtures
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Job service with its own store and one allowed callback host
+    monkeypatch.setattr(EvIELTSConfig, 'job_store_path', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr(EvIELTSConfig, 'job_callback_allowed_hosts', ['hooks.example.com'])
+    monkeypatch.setattr(EvIELTSConfig, 'job_queue_size', 1)
+    monkeypatch.setattr(EvIELTSConfig, 'job_workers', 1)
+
+    return EvJobService()
+
+def _resolve_to(monkeypatch, address: str):
+    # Resolve every host to the address
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (address, port))]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+
+def _wait_job(event: threading.Event) -> dict:
+    # Run until the test release the job
+    event.wait(10)
+    return {'released': True}
+
+# MARK: Tests
+def test_callback_host_must_be_allowed(service, monkeypatch):
+    _resolve_to(monkeypatch, '93.184.216.34')
+
+    with pytest.raises(EvClientException):
+        service.validate_callback_url('https://attacker.example.net/hook')
+
+    service.validate_callback_url('https://hooks.example.com/hook')
+
+@pytest.mark.parametrize('address', ['127.0.0.1', '10.0.0.5', '169.254.169.254', '192.168.1.1'])
+def test_callback_private_address_is_rejected(service, monkeypatch, address):
+    _resolve_to(monkeypatch, address)
+
+    with pytest.raises(EvClientException):
+        service.validate_callback_url('http://hooks.example.com/hook')
+
+def test_callback_scheme_is_checked(service):
+    with pytest.raises(EvClientException):
+        service.validate_callback_url('file:///etc/passwd')
+
+def test_full_queue_is_rejected(service):
+    # Block the only place in the queue
+    release = threading.Event()
+    job = service.submit('test', _wait_job, {'event': release})
+
+    with pytest.raises(EvServiceUnavailableException) as error:
+        service.submit('test', _wait_job, {'event': release})
+
+    assert error.value.status_code == 503
+
+    release.set()
+    service.executor.shutdown(wait = True)
+    assert service.get(job.job_id).status == 'finished'
+    assert service.pending_count == 0
+
+def test_stale_jobs_are_failed(service):
+    # Leave a job running, like a stopped server
+    with connect_sqlite(service.store_path) as connection:
+        connection.execute(
+            'INSERT INTO jobs (job_id, job_type, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            ('stale', 'test', 'running', time.time(), time.time()),
+        )
+
+    service.fail_stale_jobs()
+
+    failed = service.get('stale')
+    assert failed.status == 'failed'
+    assert failed.error['code'] == 500
+
+def test_failed_job_is_not_overwritten(service):
+    # The job is failed before its worker start, the worker must not run it
+    with connect_sqlite(service.store_path) as connection:
+        connection.execute(
+            'INSERT INTO jobs (job_id, job_type, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            ('stale', 'test', 'pending', time.time(), time.time()),
+        )
+
+    service.fail_stale_jobs()
+    service._execute_job('stale', lambda: {'released': True}, {})
+
+    assert service.get('stale').status == 'failed'
+
+def test_callback_is_sent_to_checked_address(service, monkeypatch):
+    # The request connect to the checked address, with the original host
+    _resolve_to(monkeypatch, '93.184.216.34')
+    monkeypatch.setattr(service, 'get', lambda job_id: type('Job', (), {'model_dump_json': lambda self: '{}'})())
+
+    requests_sent = []
+    monkeypatch.setattr(requests.Session, 'post', lambda self, url, **kwargs: requests_sent.append((url, kwargs['headers']['Host'], self.get_adapter(url).hostname)))
+
+    service._send_callback('job', 'https://hooks.example.com:8443/hook?id=1')
+
+    assert requests_sent == [('https://93.184.216.34:8443/hook?id=1', 'hooks.example.com:8443', 'hooks.example.com')]
+
+def test_unknown_job_is_none(service):
+    assert service.get('unknown') is None
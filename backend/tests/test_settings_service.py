@@ -0,0 +1,74 @@
+# MARK: Import
+# Dependencies
+import multiprocessing
+import pytest
+
+# Modules
+from config import EvIELTSConfig
+from app.services.settings_service import EvSettingsService
+
+# MARK: Fixtures
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Settings service with its own store, the settings are recorded instead of applied to the models
+    monkeypatch.setattr(EvIELTSConfig, 'settings_store_path', str(tmp_path / 'settings.sqlite3'))
+
+    service = EvSettingsService()
+    service.applied = []
+    monkeypatch.setattr(service, '_apply', lambda key, value: service.applied.append((key, value)))
+    return service
+
+def _run_worker(function, *args):
+    # Run the function in another process, like another gunicorn worker
+    process = multiprocessing.get_context('fork').Process(target = function, args = args)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+def _increment(service: EvSettingsService, key: str, count: int):
+    for _ in range(count):
+        service.increment(key)
+
+# MARK: Tests
+def test_setting_is_synced_to_other_worker(service):
+    _run_worker(service.set, 'user_credit', 5)
+
+    service._sync()
+
+    assert service.applied == [('user_credit', 5)]
+    assert service.get('user_credit') == 5
+
+    # Nothing is applied again if nothing is changed
+    service._sync()
+    assert service.applied == [('user_credit', 5)]
+
+def test_own_setting_is_not_applied_again(service):
+    service.set('user_credit', 5)
+    service._sync()
+
+    assert service.applied == [('user_credit', 5)]
+
+def test_partial_updates_are_merged(service):
+    # Two workers update a different prompt
+    service.set('chatgpt_prompt', {'fluency_prompt': 'fluency', 'lexical_prompt': None})
+    _run_worker(service.set, 'chatgpt_prompt', {'fluency_prompt': None, 'lexical_prompt': 'lexical'})
+
+    # A new worker get both prompts
+    worker = EvSettingsService()
+    worker.applied = []
+    worker._apply = lambda key, value: worker.applied.append((key, value))
+    worker._sync()
+
+    assert worker.applied == [('chatgpt_prompt', {'fluency_prompt': 'fluency', 'lexical_prompt': 'lexical'})]
+
+def test_concurrent_increments_are_unique(service):
+    # Two workers increase the same information version at the same time
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target = _increment, args = (service, 'information:test.json', 20)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    assert service.get('information:test.json') == 40
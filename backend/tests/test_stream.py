@@ -0,0 +1,39 @@
+# MARK: Import
+# Dependencies
+import json
+
+# Modules
+from app.utils.stream import sse_event, EvJSONMemberParser
+
+# MARK: Tests
+def test_member_is_returned_when_complete():
+    parser = EvJSONMemberParser()
+
+    assert parser.feed('{"fluency": {"band": 6, "feed') == []
+    assert parser.feed('back": "Good"}, "lex') == [('fluency', {'band': 6, 'feedback': 'Good'})]
+    assert parser.feed('ical": {"band": 7}}') == [('lexical', {'band': 7})]
+
+def test_member_is_returned_per_character():
+    data = {
+        'fluency': {'band': 6, 'feedback': 'Use "linking" words, like {first}, [then].'},
+        'grammar': {'band': 5, 'errors': ['a, b', 'c\\\\d']},
+        'pronunciation': None,
+    }
+
+    parser = EvJSONMemberParser()
+    members = []
+    for character in json.dumps(data):
+        members.extend(parser.feed(character))
+
+    assert members == list(data.items())
+
+def test_escaped_quote_in_string():
+    parser = EvJSONMemberParser()
+
+    assert parser.feed('{"a": "say \\"hi\\", then }", "b": 1}') == [('a', 'say "hi", then }'), ('b', 1)]
+
+def test_empty_object():
+    assert EvJSONMemberParser().feed('{}') == []
+
+def test_sse_event():
+    assert sse_event('criterion', {'band': 6}) == 'event: criterion\ndata: {"band": 6}\n\n'
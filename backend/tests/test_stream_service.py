@@ -0,0 +1,83 @@
+# MARK: Import
+# Dependencies
+import io
+import numpy as np
+import pytest
+
+# Modules
+from app.utils.exception import EvClientException
+from app.services.stream_service import EvStreamService
+from app.services.vad_service import vad_service
+
+# MARK: Constants
+SAMPLE_RATE = 16000
+WINDOW_SIZE = 512
+
+# MARK: Fixtures
+@pytest.fixture
+def windows(monkeypatch):
+    # Energy VAD instead of Silero, it record the length of every checked audio
+    windows = []
+
+    def detect_speech(audio_buffer, return_seconds = True):
+        windows.append(len(audio_buffer.samples))
+        speech_timestamps = []
+        for position in range(0, len(audio_buffer.samples), WINDOW_SIZE):
+            if np.abs(audio_buffer.samples[position:position + WINDOW_SIZE]).mean() < 0.1:
+                continue
+            end = min(position + WINDOW_SIZE, len(audio_buffer.samples))
+            if speech_timestamps and speech_timestamps[-1]['end'] == position:
+                speech_timestamps[-1]['end'] = end
+            else:
+                speech_timestamps.append({'start': position, 'end': end})
+        return speech_timestamps
+
+    monkeypatch.setattr(vad_service, 'detect_speech', detect_speech)
+    return windows
+
+@pytest.fixture
+def service(monkeypatch):
+    # The segment is transcribed as its start in the recording
+    service = EvStreamService()
+    monkeypatch.setattr(service, 'transcribe_segment', lambda audio_buffer, offset, initial_prompt = None: {
+        'text': f' {offset:.1f}',
+        'segments': [],
+        'language': 'en',
+    })
+    return service
+
+def _recording(parts: list) -> bytes:
+    # Build the PCM 16 bit recording of the tone and the silence parts
+    samples = []
+    for seconds, speech in parts:
+        time = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        samples.append(0.5 * np.sin(2 * np.pi * 220 * time) if speech else np.zeros(len(time)))
+
+    return (np.concatenate(samples) * 32767).astype('<i2').tobytes()
+
+# MARK: Tests
+def test_utterances_are_transcribed_while_uploaded(service, windows):
+    recording = _recording([(0.5, False), (2, True), (1.5, False), (2, True), (1.5, False), (2, True), (0.5, False)])
+
+    result, audio_buffer = service.transcribe(io.BytesIO(recording))
+
+    # Every utterance is its own segment, in the recording order
+    assert len(result['text'].split()) == 3
+    assert [float(offset) for offset in result['text'].split()] == sorted(float(offset) for offset in result['text'].split())
+    assert len(audio_buffer.samples) == len(recording) // 2
+
+def test_vad_only_run_on_new_audio(service, windows):
+    # A long recording without pause, the VAD must not run on the whole pending audio
+    recording = _recording([(20, True)])
+
+    service.transcribe(io.BytesIO(recording))
+
+    session_context = int((0.7 + 1) * SAMPLE_RATE)
+    new_audio = service.read_size // 2 + int(0.5 * SAMPLE_RATE)
+    assert max(windows) <= session_context + new_audio
+
+def test_too_big_upload_cancel_the_segments(service, windows, monkeypatch):
+    monkeypatch.setattr(service, 'max_bytes', 8 * SAMPLE_RATE)
+
+    with pytest.raises(EvClientException):
+        service.transcribe(io.BytesIO(_recording([(2, True), (1.5, False), (2, True), (1.5, False)])))
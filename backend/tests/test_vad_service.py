@@ -0,0 +1,60 @@
+# MARK: Import
+# Dependencies
+import numpy as np
+import pytest
+import torch
+from silero_vad import get_speech_timestamps
+
+# Modules
+from app.services.vad_service import EvVADService
+
+# MARK: EvReplayModel
+class EvReplayModel:
+    '''
+    Silero model that return the given probability of every window, so
+    `get_speech_timestamps` and the service run on the same probabilities.
+    '''
+    # Properties
+    def __init__(self, probabilities: np.ndarray):
+        self.probabilities = probabilities
+        self.index = 0
+
+    def reset_states(self):
+        self.index = 0
+
+    def __call__(self, chunk, sample_rate):
+        probability = self.probabilities[self.index]
+        self.index += 1
+        return torch.tensor([[probability]])
+
+# MARK: Helpers
+def _probabilities(seed: int, window_count: int) -> np.ndarray:
+    # Blocks of speech and silence, with the noise around the thresholds
+    rng = np.random.default_rng(seed)
+    probabilities = []
+    while len(probabilities) < window_count:
+        level = rng.choice([0.05, 0.4, 0.9])
+        probabilities.extend(np.clip(level + rng.normal(0, 0.15, rng.integers(1, 40)), 0, 1))
+
+    return np.array(probabilities[:window_count], dtype = np.float32)
+
+# MARK: Tests
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('extra_samples', [0, 100])
+def test_speech_timestamps_match_silero(seed, extra_samples):
+    service = EvVADService()
+    window_count = 400
+    total_samples = (window_count - 1) * service.window_size + (extra_samples or service.window_size)
+    probabilities = _probabilities(seed, window_count)
+
+    expected = get_speech_timestamps(
+        torch.zeros(total_samples),
+        EvReplayModel(probabilities),
+        threshold = service.threshold,
+        sampling_rate = service.sample_rate,
+        min_speech_duration_ms = service.min_speech_samples * 1000 // service.sample_rate,
+        min_silence_duration_ms = service.min_silence_samples * 1000 // service.sample_rate,
+        speech_pad_ms = service.speech_pad_samples * 1000 // service.sample_rate,
+    )
+
+    assert service._speech_timestamps(probabilities, total_samples) == expected
@@ -8,6 +8,10 @@ app = create_app()
 # MARK: Main
 # Main entry point for the application
 if __name__ == '__main__':
+    # Fail the jobs left by the previous server, gunicorn do it in `on_starting`
+    from app.services.job_service import job_service
+    job_service.fail_stale_jobs()
+
     app.run(
         host = '0.0.0.0',
         port = EvIELTSConfig.flask_run_port,